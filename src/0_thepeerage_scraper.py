@@ -1,17 +1,46 @@
 import os
 import csv
-import requests
-import time
 import re
+import heapq
+import argparse
+import functools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup, UnicodeDammit
 from tqdm import tqdm
 import logging
 
+from fetch_engine import FetchEngine, fetch_with_retries
+import metrics
+from metrics import FetchStats, url_class
+from crawl_manifest import CrawlManifest
+from page_cache import PageCache
+from table_io import tsv_to_parquet, RAW_PERSON_SCHEMA, PEER_SCHEMA, SOURCE_SCHEMA
+
 # --- Global Constants ---
-GLOBAL_SLEEP = 0.5       # Global sleep time in seconds after each successful fetch.
+GLOBAL_SLEEP = 0.5       # Minimum spacing in seconds between requests, enforced across all workers.
 MAX_RETRIES = 10         # Maximum number of retries for each fetch.
 BACKOFF_FACTOR = 60      # Base time (in seconds) for exponential backoff.
+CONCURRENCY = 4          # Number of pages fetched concurrently.
+MANIFEST_FILE = 'crawl_manifest.sqlite'  # Per-page crawl record, kept next to the raw TSVs.
+CACHE_DIR = 'page_cache'                 # Compressed raw pages, kept next to the raw TSVs.
+PARSE_BATCH_SIZE = 200   # Cached pages handed to a parsing process at a time.
+PROBE_MISSES = 20        # Missing pages in a row that mark the end of the site when probing for new pages.
+
+PERSON_FIELDS = ['Page', 'ID', 'fullname', 'title', 'gender', 'born', 'died',
+                 'narr', 'clarendon', 'oxbridge', 'child', 'lastedit', 'sources']
+PEER_FIELDS = ['type', 'id']
+SOURCE_FIELDS = ['Page', 'SourceID', 'Source']
+LASTEDIT_COLUMN = PERSON_FIELDS.index('lastedit')
+TYPES_OF_LORD = [
+    'marquess', 'duke', 'earl', 'viscount', 'baron',
+    'baron_by_writ', 'life_peer', 'law_lord',
+    'scot_law_lord', 'baronet', 'jacobite', 'feudal',
+    'clan_chief'
+]
 
 # --- Logger Configuration ---
 log_dir = '../logging'
@@ -41,20 +70,67 @@ def fetch_page(session, url, headers, max_retries=MAX_RETRIES, backoff_factor=BA
     Returns:
         bytes or None: The content of the page if successful, otherwise None.
     """
-    for attempt in range(max_retries):
-        try:
-            response = session.get(url, headers=headers)
-            if response.status_code == 200:
-                return response.content
-            else:
-                logging.warning("Status code %s for URL %s. Retrying after delay.", response.status_code, url)
-        except Exception as e:
-            logging.error("Exception fetching %s: %s", url, e)
-        time.sleep(backoff_factor * (attempt + 1))
-    return None
+    return fetch_with_retries(session, url, headers, max_retries=max_retries, backoff_factor=backoff_factor).content
+
+
+def page_kind(url):
+    """
+    The URL class under which fetch statistics are kept: 'person' (p*.htm), 'source'
+    (s*.htm) or 'peer' (index_*.htm) pages, otherwise the generic url_class.
+    """
+    name = url.rsplit('/', 1)[-1]
+    if re.fullmatch(r'p\d+\.htm', name):
+        return 'person'
+    if re.fullmatch(r's\d+\.htm', name):
+        return 'source'
+    if name.startswith('index_'):
+        return 'peer'
+    return url_class(url)
+
+
+def make_engine(headers, concurrency=CONCURRENCY):
+    """
+    Creates the rate-limited concurrent fetch engine shared by the scrapers, keeping
+    fetch statistics per page kind.
+
+    Parameters:
+        headers (dict): HTTP headers to include with requests.
+        concurrency (int): Number of pages fetched concurrently.
+
+    Returns:
+        FetchEngine: The engine; use it as a context manager to close its session.
+    """
+    return FetchEngine(headers, concurrency=concurrency, requests_per_second=1 / GLOBAL_SLEEP,
+                       max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, stats=FetchStats(page_kind))
 
 
 # --- Person Scraper Functions ---
+def education_flags(narr, clarendonlist):
+    """
+    Derives the Clarendon school and Oxbridge flags from a person's narrative.
+
+    Parameters:
+        narr (str): The narrative text.
+        clarendonlist (list): List of school names to check in the narrative.
+
+    Returns:
+        tuple: (clarendon, oxbridge) where clarendon is 0/1 and oxbridge is
+               'both', 'oxford', 'cambridge' or 'N/A'.
+    """
+    # Column-wise over a whole table, narrative.NarrativeClassifier does the same.
+    narr_lower = narr.lower()
+    clarendon = int(any(school.lower() in narr_lower for school in clarendonlist))
+    if 'oxford' in narr_lower and 'cambridge' in narr_lower:
+        oxbridge = 'both'
+    elif 'oxford' in narr_lower and 'univ' in narr_lower:
+        oxbridge = 'oxford'
+    elif 'cambridge' in narr_lower and 'univ' in narr_lower:
+        oxbridge = 'cambridge'
+    else:
+        oxbridge = 'N/A'
+    return clarendon, oxbridge
+
+
 def parse_person(person, clarendonlist):
     """
     Parses a person div element and extracts the required information.
@@ -101,20 +177,7 @@ def parse_person(person, clarendonlist):
 
     narr_tag = person.find("div", class_="narr")
     narr = narr_tag.get_text(strip=True).replace('\xa0', '') if narr_tag else 'N/A'
-    clarendon = 0
-    for school in clarendonlist:
-        if school.lower() in narr.lower():
-            clarendon = 1
-            break  # Deterministic output.
-    narr_lower = narr.lower()
-    if 'oxford' in narr_lower and 'cambridge' in narr_lower:
-        oxbridge = 'both'
-    elif 'oxford' in narr_lower and 'univ' in narr_lower:
-        oxbridge = 'oxford'
-    elif 'cambridge' in narr_lower and 'univ' in narr_lower:
-        oxbridge = 'cambridge'
-    else:
-        oxbridge = 'N/A'
+    clarendon, oxbridge = education_flags(narr, clarendonlist)
     last_edit_tag = person.find("span", class_="field-le-value")
     last_edit = last_edit_tag.get_text(strip=True) if last_edit_tag else 'N/A'
     sources = ';'.join([a.get_text() for a in person.find_all('a', href=True) if '.htm#s' in a.get('href', '')])
@@ -146,9 +209,446 @@ def parse_person(person, clarendonlist):
     }
 
 
-def build_full_dataset(rawpath, maxpersonpage, baseurl, headers, clarendonlist):
+# --- Fast Person Parser ---
+# XPath equivalents of the BeautifulSoup lookups in parse_person. A single class name
+# matches any of an element's classes; "sn sect-sn" and "sinfo sect-ls" must match the
+# whole (whitespace-normalised) class attribute, as they do in BeautifulSoup.
+ITP_XPATH = etree.XPath('//div[contains(concat(" ", normalize-space(@class), " "), " itp ")]')
+NAME_XPATH = etree.XPath('.//h2[normalize-space(@class) = "sn sect-sn"]')
+INFO_XPATH = etree.XPath('.//div[normalize-space(@class) = "sinfo sect-ls"]')
+NARR_XPATH = etree.XPath('.//div[contains(concat(" ", normalize-space(@class), " "), " narr ")]')
+LASTEDIT_XPATH = etree.XPath('.//span[contains(concat(" ", normalize-space(@class), " "), " field-le-value ")]')
+NON_TEXT_TAGS = {'script', 'style', 'template'}
+
+
+def _strings(element, skip=()):
+    """
+    Yields the text nodes under an element in document order, like BeautifulSoup's
+    _all_strings: comments and script/style contents are left out, and the subtrees of
+    tags in `skip` are dropped while the text following them is kept.
+    """
+    if element.text and element.tag not in NON_TEXT_TAGS:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in skip:
+            yield from _strings(child, skip)
+        if child.tail:
+            yield child.tail
+
+
+def _stripped_text(element):
+    return ''.join(text.strip() for text in _strings(element))
+
+
+def parse_person_lxml(person, clarendonlist):
+    """
+    lxml counterpart of parse_person, returning the same record for a person div.
+    It reads the tree without modifying it: the anchors parse_person unwraps and the
+    <sup> tags it decomposes are skipped when collecting the name and sources instead.
+
+    Parameters:
+        person (lxml.html.HtmlElement): The element corresponding to a person.
+        clarendonlist (list): List of school names to check in the narrative.
+
+    Returns:
+        dict: A dictionary containing the parsed data.
+    """
+    name_tags = NAME_XPATH(person)
+    name_tag = name_tags[0] if name_tags else None
+    if name_tag is not None:
+        parts = ','.join(_strings(name_tag, skip={'sup'})).split(',')
+        fullname = parts[0].strip() if parts else 'N/A'
+        title = parts[1].strip() if len(parts) > 1 else 'N/A'
+    else:
+        fullname = 'N/A'
+        title = 'N/A'
+
+    info_blocks = INFO_XPATH(person)
+    gender = 'N/A'
+    person_id = 'N/A'
+    born = 'N/A'
+    died = 'N/A'
+    if info_blocks:
+        info_text = ','.join(_strings(info_blocks[0]))
+        for trait in info_text.split(','):
+            trait = trait.strip().lower()
+            if trait == 'm':
+                gender = 'M'
+            elif trait == 'f':
+                gender = 'F'
+            if '#' in trait:
+                person_id = trait.replace('#', '').strip()
+            if 'b.' in trait:
+                born = trait.replace('b.', '').strip()
+            if 'd.' in trait:
+                died = trait.replace('d.', '').strip()
+
+    narr_tags = NARR_XPATH(person)
+    narr = _stripped_text(narr_tags[0]).replace('\xa0', '') if narr_tags else 'N/A'
+    clarendon, oxbridge = education_flags(narr, clarendonlist)
+    last_edit_tags = LASTEDIT_XPATH(person)
+    last_edit = _stripped_text(last_edit_tags[0]) if last_edit_tags else 'N/A'
+
+    # parse_person unwraps the anchors inside the name and decomposes its <sup> tags,
+    # so whatever they contain is invisible to the lookups that follow.
+    removed = set()
+    if name_tag is not None:
+        removed.update(name_tag.iter('a'))
+        for sup in name_tag.iter('sup'):
+            removed.update(sup.iter())
+    sources = ';'.join([''.join(_strings(a)) for a in person.iter('a')
+                        if a not in removed and '.htm#s' in a.get('href', '')])
+
+    ul_tags = [ul for ul in person.iter('ul') if ul not in removed]
+    if ul_tags:
+        li_texts = []
+        for li in ul_tags[0].iter('li'):
+            match = re.search(r'#i(.*?)"', etree.tostring(li, encoding='unicode', with_tail=False))
+            if match:
+                li_texts.append(match.group(1))
+        child = ';'.join(li_texts) if li_texts else 'N/A'
+    else:
+        child = 'N/A'
+
+    return {
+        'fullname': fullname,
+        'title': title,
+        'gender': gender,
+        'id': person_id,
+        'born': born,
+        'died': died,
+        'narr': narr,
+        'clarendon': clarendon,
+        'oxbridge': oxbridge,
+        'child': child,
+        'lastedit': last_edit,
+        'sources': sources
+    }
+
+
+# --- Page Parsers ---
+def person_rows(page, content, clarendonlist, parser='bs4'):
+    """
+    Parses one person page into TSV rows, one per person.
+
+    Parameters:
+        page (int): The page number.
+        content (bytes): The raw HTML of the page.
+        clarendonlist (list): List of schools to search for in narratives.
+        parser (str): 'bs4' for BeautifulSoup with html.parser, or 'lxml' for the
+                      faster parse_person_lxml, which gives the same rows.
+
+    Returns:
+        list: Rows ordered as PERSON_FIELDS.
+    """
+    if parser == 'lxml':
+        root = lxml.html.document_fromstring(UnicodeDammit(content, is_html=True).unicode_markup)
+        people = ((person, parse_person_lxml) for person in ITP_XPATH(root))
+    else:
+        soup = BeautifulSoup(content, 'html.parser')
+        people = ((person, parse_person) for person in soup.find_all("div", class_="itp"))
+    rows = []
+    for person, parse in people:
+        person_data = parse(person, clarendonlist)
+        person_data['Page'] = str(page)
+        person_data['ID'] = person_data.pop('id')
+        rows.append([person_data[field] for field in PERSON_FIELDS])
+    return rows
+
+
+def peer_rows(typeoflord, content):
+    """
+    Parses one peerage index page into (type, id) rows.
+
+    Parameters:
+        typeoflord (str): The type of peer listed on the page.
+        content (bytes): The raw HTML of the page.
+
+    Returns:
+        list: Rows ordered as PEER_FIELDS.
+    """
+    soup = BeautifulSoup(content, 'lxml')
+    rows = []
+    for element in soup.find_all(href=True):
+        element_str = str(element)
+        if '.htm#i' in element_str:
+            match = re.search(r'htm#i(.*?)"', element_str)
+            if match:
+                peer_id = match.group(1)
+                rows.append([typeoflord, peer_id])
+                logging.debug("Scraped peer: type=%s, id=%s", typeoflord, peer_id)
+    return rows
+
+
+def source_rows(page, content):
+    """
+    Parses one sources page into (page, source id, source) rows.
+
+    Parameters:
+        page (int): The page number.
+        content (bytes): The raw HTML of the page.
+
+    Returns:
+        list: Rows ordered as SOURCE_FIELDS.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    rows = []
+    for li in soup.find_all("li"):
+        text = li.get_text(strip=True)
+        if text.lower().startswith('[s'):
+            match = re.search(r"\[(\w+)\]", text)
+            if match:
+                sourceid = match.group(1)
+                rows.append([page, sourceid, text])
+                logging.debug("Scraped source: page=%s, sourceID=%s", page, sourceid)
+    return rows
+
+
+# --- Resumable Crawl ---
+def merge_partial_output(output_file, fieldnames, done, sort_key, lineterminator='\n', part_file=None,
+                         replaced=()):
+    """
+    Folds the rows of an interrupted or just-finished run (`output_file` + '.part') into
+    `output_file`. Only rows of pages the manifest marks as done are kept, which drops
+    half-written pages, and both files are merged as streams so the result stays in page order.
+
+    Parameters:
+        output_file (str): The TSV being built.
+        fieldnames (list): The header of the TSV.
+        done (set): Page keys the manifest marks as done.
+        sort_key (callable): Maps the first column of a row to its position in the crawl.
+        lineterminator (str): Line terminator used by the TSV.
+        part_file (str or None): The file holding the new rows, if not `output_file` + '.part'.
+        replaced (set): Page keys whose rows in `output_file` are superseded by the new rows.
+    """
+    part_file = part_file or output_file + '.part'
+    if not os.path.exists(part_file):
+        return
+    done = {str(key) for key in done}
+    replaced = {str(key) for key in replaced}
+
+    def rows(path, skip=()):
+        if not os.path.exists(path):
+            return
+        with open(path, newline='') as filein:
+            reader = csv.reader(filein, delimiter='\t')
+            next(reader, None)
+            for row in reader:
+                if row and row[0] in done and row[0] not in skip:
+                    yield row
+
+    tmp_file = output_file + '.tmp'
+    with open(tmp_file, 'w', newline='') as fileout:
+        writer = csv.writer(fileout, delimiter='\t', lineterminator=lineterminator)
+        writer.writerow(fieldnames)
+        writer.writerows(heapq.merge(rows(output_file, replaced), rows(part_file), key=lambda row: sort_key(row[0])))
+    os.replace(tmp_file, output_file)
+    os.remove(part_file)
+
+
+def newest_lastedit(rows):
+    """
+    Returns the newest "Last Edited" date among a page's person rows as an ISO date, or None.
+    """
+    dates = []
+    for row in rows:
+        for date_format in ('%d %b %Y', '%d %B %Y'):
+            try:
+                dates.append(datetime.strptime(row[LASTEDIT_COLUMN], date_format).date())
+                break
+            except ValueError:
+                pass
+    return max(dates).isoformat() if dates else None
+
+
+def crawl_to_tsv(kind, jobs, output_file, fieldnames, rows_from_page, headers, resume=True,
+                 concurrency=CONCURRENCY, sort_key=int, lineterminator='\n', desc=None):
+    """
+    Fetches pages and writes their parsed rows to a TSV in page order, recording every
+    fetch in the crawl manifest stored next to the output. Every fetched page is also kept
+    in the page cache, so the TSV can be rebuilt offline with `reparse_from_cache`. With
+    `resume`, pages the manifest already marks as done are skipped, so a rerun only
+    fetches the pages that failed or were never reached.
+
+    Parameters:
+        kind (str): The kind of page, used to key the manifest.
+        jobs (list): (page key, url) pairs in crawl order.
+        output_file (str): The TSV to build.
+        fieldnames (list): The header of the TSV; the first column must hold the page key.
+        rows_from_page (callable): Maps (page key, content) to a list of rows.
+        headers (dict): HTTP headers to include with requests.
+        resume (bool): Continue from the manifest rather than starting over.
+        concurrency (int): Number of pages fetched concurrently.
+        sort_key (callable): Maps a page key, as written to the TSV, to its crawl position.
+        lineterminator (str): Line terminator used by the TSV.
+        desc (str): Progress bar label.
+    """
+    part_file = output_file + '.part'
+    manifest_file = os.path.join(os.path.dirname(output_file), MANIFEST_FILE)
+    cache = PageCache(os.path.join(os.path.dirname(output_file), CACHE_DIR))
+    with CrawlManifest(manifest_file) as manifest:
+        if not resume:
+            manifest.reset(kind)
+            for path in (output_file, part_file):
+                if os.path.exists(path):
+                    os.remove(path)
+        merge_partial_output(output_file, fieldnames, manifest.keys(kind), sort_key, lineterminator)
+        done = manifest.keys(kind)
+        pending = [(key, url) for key, url in jobs if key not in done]
+        logging.info("Crawling %s pages: %s already done, %s to fetch.", kind, len(jobs) - len(pending), len(pending))
+        try:
+            with metrics.stage(f'crawl.{kind}', rows_in=len(pending), skipped=len(jobs) - len(pending)) as stage, \
+                    open(part_file, 'w', newline='') as fileout, make_engine(headers, concurrency) as engine:
+                writer = csv.writer(fileout, delimiter='\t', lineterminator=lineterminator)
+                writer.writerow(fieldnames)
+                n_rows, failed = 0, 0
+                try:
+                    for result in tqdm(engine.fetch_many(pending), total=len(pending), desc=desc):
+                        rows = []
+                        if result.content is None:
+                            failed += 1
+                            logging.error("Failed to fetch %s after %s attempts. Skipping.", result.url, result.attempts)
+                        else:
+                            cache.put(result.content)
+                            rows = rows_from_page(result.key, result.content)
+                            writer.writerows(rows)
+                            fileout.flush()
+                            n_rows += len(rows)
+                        manifest.record(kind, result, lastedit=newest_lastedit(rows) if kind == 'person' else None)
+                finally:
+                    stage.update(rows_out=n_rows, failed_pages=failed)
+                    metrics.get_recorder().fetches(engine.stats, stage=f'crawl.{kind}')
+        finally:
+            merge_partial_output(output_file, fieldnames, manifest.keys(kind), sort_key, lineterminator)
+        logging.info("Manifest for %s pages: %s", kind, manifest.summary(kind))
+
+
+def _rows_from_cached_pages(cache_root, rows_from_page, pages):
+    """
+    Parses a batch of cached pages; runs in a worker process during a reparse.
+    """
+    cache = PageCache(cache_root)
+    return [rows_from_page(page, cache.get(digest)) for page, digest in pages]
+
+
+def rebuild_tsv_from_cache(kind, output_file, fieldnames, rows_from_page, sort_key=int, lineterminator='\n',
+                           workers=1, batch_size=PARSE_BATCH_SIZE):
+    """
+    Rebuilds a TSV offline from the page cache, for every page the crawl manifest marks as done.
+    Pages done but missing from the cache (e.g. crawled before it existed) keep their rows
+    from the existing TSV. With more than one worker, batches of pages are parsed in a process pool and written
+    back in page order.
+
+    Parameters:
+        kind (str): The kind of page, used to key the manifest.
+        output_file (str): The TSV to rebuild; the manifest and cache are read from its directory.
+        fieldnames (list): The header of the TSV.
+        rows_from_page (callable): Maps (page key, content) to a list of rows; must be picklable.
+        sort_key (callable): Maps a page key to its crawl position.
+        lineterminator (str): Line terminator used by the TSV.
+        workers (int): Number of parsing processes.
+        batch_size (int): Number of pages handed to a worker at a time.
+    """
+    rawpath = os.path.dirname(output_file)
+    cache_root = os.path.join(rawpath, CACHE_DIR)
+    cache = PageCache(cache_root)
+    with CrawlManifest(os.path.join(rawpath, MANIFEST_FILE)) as manifest:
+        digests = manifest.digests(kind)
+    pages = sorted(digests, key=sort_key)
+    missing = [page for page in pages if digests[page] not in cache]
+    if missing:
+        logging.warning("%s %s pages are in the manifest but not in the cache. Keeping their rows from %s.",
+                        len(missing), kind, output_file)
+    pages = [(page, digests[page]) for page in pages if digests[page] in cache]
+    batches = [pages[i:i + batch_size] for i in range(0, len(pages), batch_size)]
+    parse_batch = functools.partial(_rows_from_cached_pages, cache_root, rows_from_page)
+
+    tmp_file = output_file + '.reparse'
+    with metrics.stage(f'reparse.{kind}', rows_in=len(pages), workers=workers) as stage, \
+            open(tmp_file, 'w', newline='') as fileout, tqdm(total=len(pages), desc=f"Reparsing {kind} pages") as bar:
+        writer = csv.writer(fileout, delimiter='\t', lineterminator=lineterminator)
+        writer.writerow(fieldnames)
+        stage.update(rows_out=0)
+
+        def write(batch, page_rows):
+            for rows in page_rows:
+                writer.writerows(rows)
+                stage.rows_out += len(rows)
+            bar.update(len(batch))
+
+        if workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for batch in batches:
+                    pending.append((batch, pool.submit(parse_batch, batch)))
+                    if len(pending) >= workers * 2:
+                        done_batch, future = pending.popleft()
+                        write(done_batch, future.result())
+                while pending:
+                    done_batch, future = pending.popleft()
+                    write(done_batch, future.result())
+        else:
+            for batch in batches:
+                write(batch, parse_batch(batch))
+    if missing:
+        # Pages crawled before the cache existed cannot be reparsed; their existing rows stay.
+        merge_partial_output(output_file, fieldnames, set(digests), sort_key, lineterminator, part_file=tmp_file,
+                             replaced={page for page, _ in pages})
+    else:
+        os.replace(tmp_file, output_file)
+
+
+def reparse_from_cache(rawpath, clarendonlist, workers=1, parser='lxml'):
+    """
+    Rebuilds entire_thepeerage.tsv, british_peers_and_orders.tsv and sources.tsv from the
+    page cache without touching the network, e.g. after a change to the parsers.
+
+    Parameters:
+        rawpath (str): The directory holding the raw TSVs, manifest and cache.
+        clarendonlist (list): List of schools to search for in narratives.
+        workers (int): Number of processes parsing person pages.
+        parser (str): Person page parser, 'lxml' (fast) or 'bs4'.
+    """
+    rebuild_tsv_from_cache('person', os.path.join(rawpath, 'entire_thepeerage.tsv'), PERSON_FIELDS,
+                           functools.partial(person_rows, clarendonlist=clarendonlist, parser=parser),
+                           lineterminator='\r\n', workers=workers)
+    rebuild_tsv_from_cache('peer', os.path.join(rawpath, 'british_peers_and_orders.tsv'), PEER_FIELDS,
+                           peer_rows, sort_key=TYPES_OF_LORD.index)
+    rebuild_tsv_from_cache('source', os.path.join(rawpath, 'sources.tsv'), SOURCE_FIELDS, source_rows)
+    logging.info("Completed reparsing the raw datasets from the page cache.")
+
+
+def check_parser_parity(rawpath, clarendonlist, limit=None):
+    """
+    Parses cached person pages with both BeautifulSoup and lxml and reports the pages
+    where the two disagree. Run this after changing either parser.
+
+    Parameters:
+        rawpath (str): The directory holding the manifest and cache.
+        clarendonlist (list): List of schools to search for in narratives.
+        limit (int or None): Only check this many pages.
+
+    Returns:
+        list: Page numbers whose rows differ between the two parsers.
+    """
+    cache = PageCache(os.path.join(rawpath, CACHE_DIR))
+    with CrawlManifest(os.path.join(rawpath, MANIFEST_FILE)) as manifest:
+        digests = manifest.digests('person')
+    pages = [page for page in sorted(digests) if digests[page] in cache][:limit]
+    mismatches = []
+    for page in tqdm(pages, desc="Checking parser parity"):
+        content = cache.get(digests[page])
+        if person_rows(page, content, clarendonlist, 'bs4') != person_rows(page, content, clarendonlist, 'lxml'):
+            mismatches.append(page)
+    logging.info("Parser parity: %s of %s pages differ.", len(mismatches), len(pages))
+    return mismatches
+
+
+def build_full_dataset(rawpath, maxpersonpage, baseurl, headers, clarendonlist, concurrency=CONCURRENCY,
+                       resume=True):
     """
     Builds the dataset by scraping each person page and writing the results to a TSV file.
+    Pages are fetched concurrently but written in page order.
 
     Parameters:
         rawpath (str): The directory where the output file will be stored.
@@ -156,33 +656,137 @@ def build_full_dataset(rawpath, maxpersonpage, baseurl, headers, clarendonlist):
         baseurl (str): The base URL for constructing page URLs.
         headers (dict): HTTP headers to include with requests.
         clarendonlist (list): List of schools to search for in narratives.
+        concurrency (int): Number of pages fetched concurrently.
+        resume (bool): Skip pages the crawl manifest already marks as done.
     """
     output_file = os.path.join(rawpath, 'entire_thepeerage.tsv')
-    with open(output_file, 'w', newline='') as fileout:
-        fieldnames = ['Page', 'ID', 'fullname', 'title', 'gender', 'born', 'died',
-                      'narr', 'clarendon', 'oxbridge', 'child', 'lastedit', 'sources']
-        writer = csv.DictWriter(fileout, fieldnames=fieldnames, delimiter='\t')
-        writer.writeheader()
-
-        session = requests.Session()
-        for page in tqdm(range(1, maxpersonpage + 1), desc="Persons"):
-            url = f"{baseurl}p{page}.htm"
-            content = fetch_page(session, url, headers, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR)
-            if content is None:
-                logging.error("Failed to fetch page %s after %s attempts. Skipping.", page, MAX_RETRIES)
-                continue
-            soup = BeautifulSoup(content, 'html.parser')
-            time.sleep(GLOBAL_SLEEP)
-            for person in soup.find_all("div", class_="itp"):
-                person_data = parse_person(person, clarendonlist)
-                person_data['Page'] = str(page)
-                person_data['ID'] = person_data.pop('id')
-                writer.writerow(person_data)
+    jobs = [(page, f"{baseurl}p{page}.htm") for page in range(1, maxpersonpage + 1)]
+    crawl_to_tsv('person', jobs, output_file, PERSON_FIELDS,
+                 functools.partial(person_rows, clarendonlist=clarendonlist), headers,
+                 resume=resume, concurrency=concurrency, lineterminator='\r\n', desc="Persons")
     logging.info("Completed building the full dataset.")
 
 
+def update_full_dataset(rawpath, baseurl, headers, clarendonlist, concurrency=CONCURRENCY,
+                        probe_misses=PROBE_MISSES):
+    """
+    Incrementally refreshes entire_thepeerage.tsv from the previous crawl's manifest.
+
+    Every known person page is re-requested conditionally, with If-None-Match and
+    If-Modified-Since built from the stored ETag and Last-Modified (or, failing that,
+    the page's newest "Last Edited" date). Pages answered with 304, or whose content hash
+    is unchanged, are left alone. New pages are probed past the old maximum until
+    `probe_misses` pages in a row do not exist. Only the rows of changed and new pages
+    are rewritten; they are merged into the existing TSV in page order.
+
+    Parameters:
+        rawpath (str): The directory holding the raw TSV, manifest and cache.
+        baseurl (str): The base URL for constructing page URLs.
+        headers (dict): HTTP headers to include with requests.
+        clarendonlist (list): List of schools to search for in narratives.
+        concurrency (int): Number of pages fetched concurrently.
+        probe_misses (int): Consecutive missing pages that mark the end of the site.
+
+    Returns:
+        dict: Counts of 'unchanged', 'changed', 'new' and 'failed' pages.
+    """
+    output_file = os.path.join(rawpath, 'entire_thepeerage.tsv')
+    update_file = output_file + '.update'
+    cache = PageCache(os.path.join(rawpath, CACHE_DIR))
+    counts = {'unchanged': 0, 'changed': 0, 'new': 0, 'failed': 0}
+    with CrawlManifest(os.path.join(rawpath, MANIFEST_FILE)) as manifest:
+        entries = manifest.entries('person')
+        if not entries:
+            raise ValueError("No previous crawl in the manifest; run a full crawl first.")
+        old_max = max(entries)
+
+        def conditional_headers(entry):
+            validators = {}
+            if entry['etag']:
+                validators['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                validators['If-Modified-Since'] = entry['last_modified']
+            elif entry['lastedit']:
+                lastedit = datetime.strptime(entry['lastedit'], '%Y-%m-%d')
+                validators['If-Modified-Since'] = lastedit.strftime('%a, %d %b %Y 00:00:00 GMT')
+            return validators
+
+        misses = 0
+
+        def jobs():
+            for page in range(1, old_max + 1):
+                if page in entries:
+                    yield page, f"{baseurl}p{page}.htm", conditional_headers(entries[page])
+                else:
+                    yield page, f"{baseurl}p{page}.htm"
+            page = old_max + 1
+            while misses < probe_misses:
+                yield page, f"{baseurl}p{page}.htm"
+                page += 1
+
+        updated = []
+        try:
+            with metrics.stage('update.person', rows_in=len(entries)) as stage, \
+                    open(update_file, 'w', newline='') as fileout, make_engine(headers, concurrency) as engine:
+                writer = csv.writer(fileout, delimiter='\t', lineterminator='\r\n')
+                writer.writerow(PERSON_FIELDS)
+                for result in tqdm(engine.fetch_many(jobs(), give_up_on=(404,)), desc="Updating persons"):
+                    if result.key > old_max:
+                        misses = misses + 1 if result.content is None else 0
+                    if result.content is None:
+                        if result.status_code == 304:
+                            counts['unchanged'] += 1
+                            manifest.record('person', result)
+                        elif result.key <= old_max:
+                            counts['failed'] += 1
+                            logging.error("Failed to refresh %s (status %s).", result.url, result.status_code)
+                        continue
+                    entry = entries.get(result.key)
+                    digest = cache.put(result.content)
+                    if entry is not None and entry['sha256'] == digest:
+                        counts['unchanged'] += 1
+                        manifest.record('person', result, lastedit=entry['lastedit'])
+                        continue
+                    rows = person_rows(result.key, result.content, clarendonlist)
+                    writer.writerows(rows)
+                    # Only the hash and size are kept for the manifest, not the page itself.
+                    updated.append((result._replace(content=None), newest_lastedit(rows), digest,
+                                    len(result.content)))
+                    counts['changed' if entry is not None else 'new'] += 1
+                stage.update(rows_out=len(updated), **counts)
+                metrics.get_recorder().fetches(engine.stats, stage='update.person')
+            # Changed pages are only recorded once their rows are in the TSV, so an
+            # interrupted update is simply redone next time.
+            merge_partial_output(output_file, PERSON_FIELDS, set(entries) | {r.key for r, *_ in updated}, int,
+                                 lineterminator='\r\n', part_file=update_file, replaced={r.key for r, *_ in updated})
+            for result, lastedit, digest, size in updated:
+                manifest.record('person', result, lastedit=lastedit, digest=digest, size=size)
+        finally:
+            if os.path.exists(update_file):
+                os.remove(update_file)
+    logging.info("Incremental update of person pages: %s", counts)
+    return counts
+
+
+def write_parquet_copies(rawpath):
+    """
+    Writes typed Parquet copies of the raw TSVs next to them, for readers that want
+    column projection and no CSV type inference.
+
+    Parameters:
+        rawpath (str): The directory holding the raw TSVs.
+    """
+    for name, schema in [('entire_thepeerage', RAW_PERSON_SCHEMA),
+                         ('british_peers_and_orders', PEER_SCHEMA),
+                         ('sources', SOURCE_SCHEMA)]:
+        tsv_path = os.path.join(rawpath, f"{name}.tsv")
+        if os.path.exists(tsv_path):
+            tsv_to_parquet(tsv_path, os.path.join(rawpath, f"{name}.parquet"), schema)
+            logging.info("Wrote %s.parquet", name)
+
+
 # --- British Peers Scraper ---
-def build_british_peers(rawpath, baseurl, headers):
+def build_british_peers(rawpath, baseurl, headers, resume=True):
     """
     Scrapes British peers and orders, saving the results to a TSV file.
 
@@ -190,46 +794,18 @@ def build_british_peers(rawpath, baseurl, headers):
         rawpath (str): The directory where the output file will be stored.
         baseurl (str): The base URL for constructing page URLs.
         headers (dict): HTTP headers for requests.
+        resume (bool): Skip index pages the crawl manifest already marks as done.
     """
     output_file = os.path.join(rawpath, 'british_peers_and_orders.tsv')
     logging.info("Starting to build British peers dataset: %s", output_file)
-
-    with open(output_file, 'w', newline='') as fileout:
-        writer = csv.writer(fileout, delimiter='\t', lineterminator='\n')
-        writer.writerow(['type', 'id'])
-        session = requests.Session()
-
-        types_of_lord = [
-            'marquess', 'duke', 'earl', 'viscount', 'baron',
-            'baron_by_writ', 'life_peer', 'law_lord',
-            'scot_law_lord', 'baronet', 'jacobite', 'feudal',
-            'clan_chief'
-        ]
-
-        for typeoflord in tqdm(types_of_lord, desc="British Peers"):
-            url = f"{baseurl}index_{typeoflord}.htm"
-            logging.info("Fetching URL: %s", url)
-
-            content = fetch_page(session, url, headers, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR)
-            if content is None:
-                logging.error("Failed to fetch URL %s after %s attempts. Skipping.", url, MAX_RETRIES)
-                continue
-
-            soup = BeautifulSoup(content, 'lxml')
-            time.sleep(GLOBAL_SLEEP)
-            for element in soup.find_all(href=True):
-                element_str = str(element)
-                if '.htm#i' in element_str:
-                    match = re.search(r'htm#i(.*?)"', element_str)
-                    if match:
-                        peer_id = match.group(1)
-                        writer.writerow([typeoflord, peer_id])
-                        logging.info("Scraped peer: type=%s, id=%s", typeoflord, peer_id)
+    jobs = [(typeoflord, f"{baseurl}index_{typeoflord}.htm") for typeoflord in TYPES_OF_LORD]
+    crawl_to_tsv('peer', jobs, output_file, PEER_FIELDS, peer_rows, headers,
+                 resume=resume, sort_key=TYPES_OF_LORD.index, desc="British Peers")
     logging.info("Completed building British peers dataset.")
 
 
 # --- Sources Scraper ---
-def build_sourcedata(rawpath, maxsourcespage, baseurl, headers):
+def build_sourcedata(rawpath, maxsourcespage, baseurl, headers, resume=True):
     """
     Scrapes sources, saving the results to a TSV file.
 
@@ -238,34 +814,43 @@ def build_sourcedata(rawpath, maxsourcespage, baseurl, headers):
         maxsourcespage (int): The maximum number of source pages to scrape.
         baseurl (str): The base URL for constructing page URLs.
         headers (dict): HTTP headers for requests.
+        resume (bool): Skip source pages the crawl manifest already marks as done.
     """
     output_file = os.path.join(rawpath, 'sources.tsv')
     logging.info("Starting to build sources dataset: %s", output_file)
-    with open(output_file, 'w', newline='') as fileout:
-        writer = csv.writer(fileout, delimiter='\t', lineterminator='\n')
-        writer.writerow(['Page', 'SourceID', 'Source'])
-        session = requests.Session()
-        for page in tqdm(range(1, maxsourcespage + 1), desc="Sources"):
-            url = f"{baseurl}s{page}.htm"
-            content = fetch_page(session, url, headers, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR)
-            if content is None:
-                logging.error("Failed to fetch source page %s after %s attempts. Skipping.", page, MAX_RETRIES)
-                continue
-            soup = BeautifulSoup(content, 'html.parser')
-            time.sleep(GLOBAL_SLEEP)
-            for li in soup.find_all("li"):
-                text = li.get_text(strip=True)
-                if text.lower().startswith('[s'):
-                    match = re.search(r"\[(\w+)\]", text)
-                    if match:
-                        sourceid = match.group(1)
-                        writer.writerow([page, sourceid, text])
-                        logging.info("Scraped source: page=%s, sourceID=%s", page, sourceid)
+    jobs = [(page, f"{baseurl}s{page}.htm") for page in range(1, maxsourcespage + 1)]
+    crawl_to_tsv('source', jobs, output_file, SOURCE_FIELDS, source_rows, headers,
+                 resume=resume, desc="Sources")
     logging.info("Completed building sources dataset.")
 
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Scrape thepeerage.com into ../data/thepeerage/raw.")
+    argparser.add_argument('--fresh', action='store_true',
+                           help="Ignore the crawl manifest and start every crawl from scratch.")
+    argparser.add_argument('--update', action='store_true',
+                           help="Incrementally refresh the person pages of a previous crawl and probe for new ones.")
+    argparser.add_argument('--reparse', action='store_true',
+                           help="Rebuild the raw TSVs from the page cache instead of crawling.")
+    argparser.add_argument('--check-parity', action='store_true',
+                           help="Compare the BeautifulSoup and lxml person parsers on the cached pages.")
+    argparser.add_argument('--workers', type=int, default=os.cpu_count(),
+                           help="Number of processes parsing cached pages during --reparse.")
+    argparser.add_argument('--parser', choices=['lxml', 'bs4'], default='lxml',
+                           help="Person page parser used by --reparse.")
+    argparser.add_argument('--parquet', action='store_true',
+                           help="Also write typed Parquet copies of the raw TSVs.")
+    argparser.add_argument('--concurrency', type=int, default=CONCURRENCY,
+                           help="Number of person pages fetched concurrently.")
+    argparser.add_argument('--metrics', default=None,
+                           help=f"Append per-stage and per-page-kind fetch metrics to this JSON-lines file "
+                                f"(default: ${metrics.METRICS_ENV}, if set).")
+    argparser.add_argument('--profile', default=None,
+                           help=f"Dump a cProfile of each stage into this directory (default: ${metrics.PROFILE_ENV}).")
+    args = argparser.parse_args()
+    metrics.configure(args.metrics, args.profile)
+
     maxpersonpage = 75973  # as of 05/04/2025
     maxsourcespage = 166   # as of 06/12/2021
     baseurl = 'http://www.thepeerage.com/'
@@ -284,8 +869,20 @@ if __name__ == "__main__":
     rawpath = '../data/thepeerage/raw'
     os.makedirs(rawpath, exist_ok=True)
 
-    # Run the scrapers in sequence.
-    build_full_dataset(rawpath, maxpersonpage, baseurl, headers, clarendonlist)
-    build_british_peers(rawpath, baseurl, headers)
-    build_sourcedata(rawpath, maxsourcespage, baseurl, headers)
+    if args.check_parity:
+        mismatches = check_parser_parity(rawpath, clarendonlist)
+        print(f"{len(mismatches)} pages differ between the parsers: {mismatches[:20]}")
+    elif args.reparse:
+        reparse_from_cache(rawpath, clarendonlist, workers=args.workers, parser=args.parser)
+    elif args.update:
+        update_full_dataset(rawpath, baseurl, headers, clarendonlist, concurrency=args.concurrency)
+    else:
+        # Run the scrapers in sequence.
+        resume = not args.fresh
+        build_full_dataset(rawpath, maxpersonpage, baseurl, headers, clarendonlist,
+                           concurrency=args.concurrency, resume=resume)
+        build_british_peers(rawpath, baseurl, headers, resume=resume)
+        build_sourcedata(rawpath, maxsourcespage, baseurl, headers, resume=resume)
+    if args.parquet:
+        write_parquet_copies(rawpath)
     logging.info("Tada!")
\ No newline at end of file
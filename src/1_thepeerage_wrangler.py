@@ -1,212 +1,39 @@
-import re
 import os
+import argparse
 import numpy as np
 import pandas as pd
-from datetime import datetime
 
+from table_io import read_table, write_parquet, iter_table, ParquetAppender, RAW_PERSON_SCHEMA, PANDAS_TYPES
+from peer_flags import peer_membership
+from genealogy import GenealogyGraph
+from date_parsing import DateParseCache, add_date_columns, iso_dates
+from person_store import build_store
+import metrics
+from metrics import Laps
 
-def compute_halfway_day(month, year):
-    """
-    Return the default ("halfway") day for the given month and year:
-      - For February: 14 if not a leap year, 15 if a leap year.
-      - Months with 31 days: 16.
-      - Months with 30 days: 15.
-    """
-    if month == 2:
-        if (year % 400 == 0) or ((year % 4 == 0) and (year % 100 != 0)):
-            return 15
-        else:
-            return 14
-    if month in [1, 3, 5, 7, 8, 10, 12]:
-        return 16
-    return 15
+# --- Streaming ---
+CHUNKSIZE = 100_000  # Raw person rows wrangled at a time by main_chunked.
+# Raw TSV columns read with fixed types, so every chunk gets the same dtypes whatever
+# values it happens to hold (e.g. a chunk where every 'child' is a single ID).
+RAW_DTYPES = {field.name: PANDAS_TYPES.get(field.type, str) for field in RAW_PERSON_SCHEMA}
 
 
-def parse_dates(val):
+def main(fmt='csv'):
     """
-    Parse a string from the 'born' column and extract (year, month, day, is_synthetic_date).
-
-    Rules:
-    - If the string contains "before" or "after" (but not "circa"), return missing values.
-
-    (A) If the string contains a slash ("/") or the word "or":
-         - First, if the string matches exactly two year numbers separated by a slash
-           (e.g. "1464/65"), return (second_year, 1, 1, True) where the second year is reconstructed if abbreviated.
-         - Otherwise, split on "/" (or " or "), extract a base year from the first token and a secondary year
-           from the second token, then:
-             • If no month name is found, default to month 7 and day 1 (synthetic).
-             • If a month name is found, use it. For the day, if the string starts with a digit and the first
-               number (day candidate) is ≤ 31, use it; otherwise, compute a fallback day (mark synthetic).
-
-    (B) If no slash or "or" is present:
-         - If a month name is found:
-             • If the string starts with a digit and at least two numbers exist, take the first as day and the last as year (synthetic = False).
-             • Otherwise, use the sole found number as year and compute the day (synthetic = True).
-         - If no month name is found:
-             • If only one number is present, default to month 7 and day 1 (synthetic = True).
-             • If more than one number is present and the string starts with a digit, use the first as day and the last as year (synthetic = False);
-               otherwise default to day 1 (synthetic = True) with month 7.
-
-    If nothing can be parsed, returns (np.nan, np.nan, np.nan, False).
+    Wrangles the raw thepeerage tables into wrangled_peerage.csv, or with fmt='parquet'
+    reads the raw Parquet copies and writes a typed wrangled_peerage.parquet instead.
+    Each section is recorded as a 'wrangle.*' stage in the metrics file, if one is configured.
     """
-    if pd.isnull(val) or str(val).strip() == '':
-        return (np.nan, np.nan, np.nan, False)
-
-    s = str(val).strip().lower()
-
-    # If the string indicates uncertainty with "before" or "after" (but not "circa"), return missing.
-    if (("before" in s or "after" in s) and ("circa" not in s)):
-        return (np.nan, np.nan, np.nan, False)
-
-    synthetic = False
-    month_names = {
-        'january': 1, 'february': 2, 'march': 3, 'april': 4,
-        'may': 5, 'june': 6, 'july': 7, 'august': 8,
-        'september': 9, 'october': 10, 'november': 11, 'december': 12
-    }
-
-    # (A) Handle strings with a slash ("/") or "or".
-    if '/' in s or ' or ' in s:
-        # Check if the entire string is exactly two year numbers separated by a slash.
-        match_range = re.fullmatch(r'(\d{3,4})\s*/\s*(\d{1,4})', s)
-        if match_range:
-            base_year_str = match_range.group(1)
-            second_year_str = match_range.group(2)
-            if len(second_year_str) < len(base_year_str):
-                full_year = int(base_year_str[:len(base_year_str) - len(second_year_str)] + second_year_str)
-            else:
-                full_year = int(second_year_str)
-            synthetic = True  # synthesized default for missing month/day
-            return (full_year, 1, 1, synthetic)
-
-        # Otherwise, split on '/' (or " or ").
-        tokens = s.split('/') if '/' in s else s.split(' or ')
-        match1 = re.search(r'\d{3,4}', tokens[0])
-        if match1:
-            base_year_str = match1.group(0)
-        else:
-            return (np.nan, np.nan, np.nan, False)
-        match2 = re.search(r'\d+', tokens[1]) if len(tokens) > 1 else None
-        if match2:
-            second_year_str = match2.group(0)
-        else:
-            second_year_str = None
-        if second_year_str:
-            if len(second_year_str) < len(base_year_str):
-                full_year = int(base_year_str[:len(base_year_str) - len(second_year_str)] + second_year_str)
-            else:
-                full_year = int(second_year_str)
-        else:
-            full_year = int(base_year_str)
-
-        # Look for a month name in the whole string.
-        found_month = None
-        for name, number in month_names.items():
-            if name in s:
-                found_month = number
-                break
-        if found_month is None:
-            synthetic = True
-            return (full_year, 7, 1, synthetic)
-        else:
-            month = found_month
-
-        # Determine day: if the string starts with a digit, try to use the first number.
-        if re.match(r'\d', s):
-            numbers = re.findall(r'\d+', s)
-            try:
-                day_candidate = int(numbers[0])
-            except Exception:
-                day_candidate = None
-            if day_candidate is not None and day_candidate <= 31:
-                day = day_candidate
-            else:
-                synthetic = True
-                day = compute_halfway_day(month, full_year)
-        else:
-            synthetic = True
-            day = compute_halfway_day(month, full_year)
-        return (full_year, month, day, synthetic)
-
-    # (B) Handle strings without a slash or "or".
-    else:
-        found_month = None
-        for name, number in month_names.items():
-            if name in s:
-                found_month = number
-                break
-        numbers = re.findall(r'\d+', s)
-        if found_month is not None:
-            if len(numbers) == 0:
-                return (np.nan, np.nan, np.nan, False)
-            if re.match(r'\d', s):
-                if len(numbers) >= 2:
-                    # Both day and year appear.
-                    day = int(numbers[0])
-                    year = int(numbers[-1])
-                    synthetic = False
-                else:
-                    year = int(numbers[0])
-                    synthetic = True
-                    day = compute_halfway_day(found_month, year)
-            else:
-                year = int(numbers[-1])
-                synthetic = True
-                day = compute_halfway_day(found_month, year)
-            month = found_month
-        else:
-            # No month name.
-            if len(numbers) == 0:
-                return (np.nan, np.nan, np.nan, False)
-            if len(numbers) == 1:
-                year = int(numbers[0])
-                month = 7
-                day = 1
-                synthetic = True
-            else:
-                if re.match(r'\d', s):
-                    day = int(numbers[0])
-                    year = int(numbers[-1])
-                    synthetic = False
-                else:
-                    year = int(numbers[-1])
-                    day = 1
-                    synthetic = True
-                month = 7
-        return (year, month, day, synthetic)
-
-
-def create_datetime(row):
-    """
-    Create a datetime from the row's 'born_year', 'born_month', and 'born_day'.
-    If any component is missing or invalid (e.g., day out of range for the month), print the error
-    along with the entire 'born' field and return pd.NaT.
-    For years less than 1678 (outside the np.datetime64 range), a native Python datetime is created.
-    """
-    if pd.isnull(row['born_year']) or pd.isnull(row['born_month']) or pd.isnull(row['born_day']):
-        return pd.NaT
-    try:
-        y = int(row['born_year'])
-        m = int(row['born_month'])
-        d = int(row['born_day'])
-        if y < 1678:
-            return datetime(y, m, d)
-        else:
-            return pd.Timestamp(year=y, month=m, day=d)
-    except ValueError as e:
-        print(f"Error creating datetime for row index {row.name} with 'born'='{row['born']}': "
-              f"year={row['born_year']}, month={row['born_month']}, day={row['born_day']}. Error: {e}")
-        return pd.NaT
-
-
-def main():
+    laps = Laps('wrangle', echo=False)
     # ====================== File Paths & Data Loading ======================
     rawpath = '../data/thepeerage/raw'
     bad_stuff = '../data/thepeerage/bad_stuff'
 
-    source = pd.read_csv(os.path.join(rawpath, 'sources.tsv'), sep='\t')
-    peers = pd.read_csv(os.path.join(rawpath, 'british_peers_and_orders.tsv'), sep='\t')
-    raw = pd.read_csv(os.path.join(rawpath, 'entire_thepeerage.tsv'), sep='\t')
+    ext = '.parquet' if fmt == 'parquet' else '.tsv'
+    source = read_table(os.path.join(rawpath, 'sources' + ext))
+    peers = read_table(os.path.join(rawpath, 'british_peers_and_orders' + ext))
+    raw = read_table(os.path.join(rawpath, 'entire_thepeerage' + ext))
+    laps.lap('load', rows_out=len(raw), format=fmt)
 
     print(f"There are {len(raw[raw['ID'].isnull()])} rows of missing ids in the raw dataset")
     raw[raw['ID'].isnull()].to_csv(os.path.join(bad_stuff, 'missing_person_ID.csv'))
@@ -232,33 +59,19 @@ def main():
     print(f"We begin with {len(df)} rows of the raw df")
     print("Now, let's merge on our peerage data.")
     peers = peers.rename({'type': 'type_of_peer'}, axis=1)
-    for type_of_peer in peers['type_of_peer'].unique():
-        df['is_' + type_of_peer] = 0
-    df['is_peer'] = 0
-    for index, row in peers.iterrows():
-        df.loc[index, 'is_' + row['type_of_peer']] = 1
-        df.loc[index, 'is_peer'] = 1
-    df['is_child_of_peer'] = 0
-    df['is_grandchild_of_peer'] = 0
+    flags = peer_membership(peers['type_of_peer'], df.index).drop(columns='type_of_peer')
+    df[list(flags.columns)] = flags.to_numpy()
+    laps.lap('peer_flags', rows_in=len(raw), rows_out=len(df))
 
     # ====================== Process Child / Grandchild Relationships ======================
-    child_not_found = set()
-    grandchild_not_found = set()
-    for item in df['child'].str.split(';'):
-        if item is not np.nan:
-            for child in item:
-                # this is wrong, it should be if in peers.index, i think
-                if int(child) in df.index:
-                    df.loc[int(child), 'is_child_of_peer'] = 1
-                    if df.loc[int(child), 'child'] is not np.nan:
-                        for grandchild in df.loc[int(child), 'child'].split(';'):
-                            if grandchild is not np.nan:
-                                if int(grandchild) in df.index:
-                                    df.loc[int(grandchild), 'is_grandchild_of_peer'] = 1
-                                else:
-                                    grandchild_not_found.add(int(grandchild))
-                else:
-                    child_not_found.add(int(child))
+    graph = GenealogyGraph.from_child_column(df['child'])
+    print(f"Compiled the genealogy graph: {len(graph)} people, {graph.n_edges} parent-child links, "
+          f"{len(graph.dangling_children)} links to unknown IDs")
+    flags, dangling = graph.descent_flags(graph.positions(peers.index), depth=2)
+    rows = graph.positions(df.index)
+    df['is_child_of_peer'] = flags[rows, 0]
+    df['is_grandchild_of_peer'] = flags[rows, 1]
+    child_not_found, grandchild_not_found = dangling
     print(f"We have {len(child_not_found)} children not found")
     print(f"We have {len(grandchild_not_found)} grandchildren not found")
 
@@ -272,24 +85,182 @@ def main():
     grandchild_not_found_file = os.path.join(bad_stuff, 'grandchild_not_found.csv')
     grandchild_not_found_df.to_csv(grandchild_not_found_file, index=False)
     print(f"Grandchild not found list saved to: {grandchild_not_found_file}")
+    laps.lap('descent', rows_in=len(df), rows_out=len(df))
 
-    # ====================== Parse 'born' Column & Create Date Columns ======================
-    df[['born_year', 'born_month', 'born_day', 'is_synthetic_birthdate']] = df['born'].apply(
-        lambda x: pd.Series(parse_dates(x))
-    )
-    df['born_datetime'] = df.apply(create_datetime, axis=1)
-    df['born_datetime_str'] = df['born_datetime'].apply(lambda x: x.strftime('%d-%m-%Y') if pd.notnull(x) else np.nan)
-
-    df[['died_year', 'died_month', 'died_day', 'is_synthetic_dieddate']] = df['died'].apply(
-        lambda x: pd.Series(parse_dates(x))
-    )
-    df['died_datetime'] = df.apply(create_datetime, axis=1)
-    df['died_datetime_str'] = df['died_datetime'].apply(lambda x: x.strftime('%d-%m-%Y') if pd.notnull(x) else np.nan)
+    # ====================== Parse 'born' / 'died' Columns & Create Date Columns ======================
+    date_cache = DateParseCache()
+    for prefix, synthetic_column in [('born', 'is_synthetic_birthdate'), ('died', 'is_synthetic_dieddate')]:
+        n_invalid = add_date_columns(df, prefix, synthetic_column, cache=date_cache)
+        print(f"{n_invalid} '{prefix}' dates parse to a day that does not exist; their datetimes are left empty")
+    stats = date_cache.stats()
+    print(f"Parsed {stats['rows']} dates as {stats['distinct']} distinct strings ({stats['deduplicated']:.1%} "
+          f"deduplicated); {stats['misses']} were parsed, {stats['hits']} came from the cache "
+          f"({stats['hit_rate']:.1%} hit rate)")
+    laps.lap('dates', rows_in=stats['rows'], rows_out=len(df), distinct=stats['distinct'])
 
     print(f"We end with {len(df)} rows of the df")
-    print(f"Saving out to ../data/thepeerage/wrangled/wrangled_peerage.csv")
-    df.to_csv('../data/thepeerage/wrangled/wrangled_peerage.csv')
+    if fmt == 'parquet':
+        print(f"Saving out to ../data/thepeerage/wrangled/wrangled_peerage.parquet")
+        write_parquet(df, '../data/thepeerage/wrangled/wrangled_peerage.parquet')
+    else:
+        print(f"Saving out to ../data/thepeerage/wrangled/wrangled_peerage.csv")
+        datetimes = {name: iso_dates(df[name]) for name in ['born_datetime', 'died_datetime']}
+        df.assign(**datetimes).to_csv('../data/thepeerage/wrangled/wrangled_peerage.csv')
+    laps.lap('save', rows_in=len(df), rows_out=len(df), format=fmt)
+    laps.close()
+
+
+def _append_csv(df, path, first):
+    df.to_csv(path, mode='w' if first else 'a', header=first)
+
+
+def main_chunked(fmt='csv', chunksize=CHUNKSIZE):
+    """
+    Wrangles the raw person table as main() does, but in chunks of `chunksize` rows,
+    so memory stays flat however large the crawl grows.
+
+    A first pass reads only the ID and child columns. It keeps the person IDs and the
+    parent -> child edges as integer arrays, compiles the genealogy graph and computes
+    the descent flags. A second pass reads whole chunks and applies the row-local steps
+    to each: the missing ID/Page splits into bad_stuff, the peer flags from the preloaded
+    peers table, the descent flags looked up by ID, and date parsing through one shared
+    DateParseCache. Each chunk is then appended to the output, which replaces the
+    previous output once the last chunk is written.
+
+    ID is always written as an integer and Page and clarendon as nullable integers.
+    main() writes them as floats when the table has missing values. The datetimes are
+    always written with a ' 00:00:00' time, as main() writes them whenever a column holds
+    a date outside 1677-2262, which thepeerage's always do.
+
+    Parameters:
+        fmt (str): 'csv' reads the raw TSVs and writes wrangled_peerage.csv; 'parquet'
+                   reads the raw Parquet copies and writes wrangled_peerage.parquet.
+        chunksize (int): Raw person rows held in memory at a time.
+    """
+    laps = Laps('wrangle_chunked', echo=False)
+    rawpath = '../data/thepeerage/raw'
+    bad_stuff = '../data/thepeerage/bad_stuff'
+    output_file = '../data/thepeerage/wrangled/wrangled_peerage.' + fmt
+
+    ext = '.parquet' if fmt == 'parquet' else '.tsv'
+    raw_file = os.path.join(rawpath, 'entire_thepeerage' + ext)
+    read_kwargs = {} if fmt == 'parquet' else {'dtype': RAW_DTYPES}
+    source = read_table(os.path.join(rawpath, 'sources' + ext))
+    peers = read_table(os.path.join(rawpath, 'british_peers_and_orders' + ext))
+
+    # ====================== Pass 1: IDs & Child Edges ======================
+    ids, parents, children = [], [], []
+    for chunk in iter_table(raw_file, chunksize, columns=['ID', 'child'], **read_kwargs):
+        chunk = chunk[chunk['ID'].notnull()]
+        ids.append(chunk['ID'].to_numpy(dtype='int64'))
+        chunk_parents, chunk_children = GenealogyGraph.child_edges(chunk.set_index('ID')['child'])
+        parents.append(chunk_parents)
+        children.append(chunk_children)
+    graph = GenealogyGraph.from_edges(np.concatenate(ids), np.concatenate(parents), np.concatenate(children))
+    n_ids = sum(len(chunk_ids) for chunk_ids in ids)
+    del ids, parents, children
+    print(f"Compiled the genealogy graph: {len(graph)} people, {graph.n_edges} parent-child links, "
+          f"{len(graph.dangling_children)} links to unknown IDs")
+    laps.lap('index', rows_out=n_ids, edges=graph.n_edges)
+
+    # ====================== Peers & Descent Flags ======================
+    print(f"There are {len(peers[peers['id'].isnull()])} rows of missing ids in the peers dataset")
+    print(f"There are {len(peers[peers['type'].isnull()])} rows of missing types in the peers dataset")
+    print(f"There are {len(source[source['Page'].isnull()])} rows of missing pages in the source dataset")
+    print(f"There are {len(source[source['SourceID'].isnull()])} rows of missing sourceID in the source dataset")
+    print(f"There are {len(source[source['Source'].isnull()])} rows of missing Source in the source dataset")
+    in_raw = peers['id'].isin(graph.ids)
+    print(f"There are {(~in_raw).sum()} peer IDs not in the raw...")
+    peers[~in_raw].to_csv(os.path.join(bad_stuff, 'peers_not_in_raw_ID.csv'))
+    print(f"These are saved to {os.path.join(bad_stuff, 'peers_not_in_raw_ID.csv')}.")
+    peers = peers[in_raw].set_index('id').rename({'type': 'type_of_peer'}, axis=1)
+
+    descent, dangling = graph.descent_flags(graph.positions(peers.index), depth=2)
+    for name, missing in zip(['child_not_found', 'grandchild_not_found'], dangling):
+        print(f"We have {len(missing)} {name.replace('_not_found', 'ren')} not found")
+        path = os.path.join(bad_stuff, name + '.csv')
+        pd.DataFrame({name: list(missing)}).to_csv(path, index=False)
+        print(f"{name.split('_')[0].capitalize()} not found list saved to: {path}")
+    laps.lap('descent', rows_in=len(peers), rows_out=len(graph))
+
+    # ====================== Pass 2: Row-Local Steps, Chunk by Chunk ======================
+    part_file = output_file + '.part'
+    missing_id_file = os.path.join(bad_stuff, 'missing_person_ID.csv')
+    missing_page_file = os.path.join(bad_stuff, 'missing_person_Page.csv')
+    date_cache = DateParseCache()
+    counts = {'rows': 0, 'missing_id': 0, 'missing_page': 0, 'invalid_born': 0, 'invalid_died': 0, 'chunks': 0}
+    appender = ParquetAppender(part_file) if fmt == 'parquet' else None
+    try:
+        for chunk in iter_table(raw_file, chunksize, **read_kwargs):
+            first = counts['chunks'] == 0
+            counts['chunks'] += 1
+            counts['rows'] += len(chunk)
+            missing = chunk['ID'].isnull()
+            counts['missing_id'] += int(missing.sum())
+            _append_csv(chunk[missing], missing_id_file, first)
+            chunk = chunk[~missing]
+            missing = chunk['Page'].isnull()
+            counts['missing_page'] += int(missing.sum())
+            _append_csv(chunk[missing], missing_page_file, first)
+
+            df = chunk.set_index(chunk['ID'].astype('int64')).drop(columns='ID')
+            flags = peer_membership(peers['type_of_peer'], df.index).drop(columns='type_of_peer')
+            df[list(flags.columns)] = flags.to_numpy()
+            rows = graph.positions(df.index)
+            df['is_child_of_peer'] = descent[rows, 0]
+            df['is_grandchild_of_peer'] = descent[rows, 1]
+            for prefix, synthetic_column in [('born', 'is_synthetic_birthdate'), ('died', 'is_synthetic_dieddate')]:
+                counts['invalid_' + prefix] += add_date_columns(df, prefix, synthetic_column, cache=date_cache)
+
+            if appender is not None:
+                appender.append(df)
+            else:
+                datetimes = {name: iso_dates(df[name], times=True) for name in ['born_datetime', 'died_datetime']}
+                _append_csv(df.assign(**datetimes), part_file, first)
+    finally:
+        if appender is not None:
+            appender.close()
+    os.replace(part_file, output_file)
+    laps.lap('chunks', rows_in=counts['rows'], rows_out=counts['rows'] - counts['missing_id'],
+             chunks=counts['chunks'], chunksize=chunksize)
+    laps.close()
+
+    print(f"There were {counts['missing_id']} rows of missing ids in the raw dataset; "
+          f"these are saved to {missing_id_file} and dropped")
+    print(f"There were {counts['missing_page']} rows of missing pages in the raw dataset; "
+          f"these are saved to {missing_page_file}")
+    for prefix in ['born', 'died']:
+        print(f"{counts['invalid_' + prefix]} '{prefix}' dates parse to a day that does not exist; "
+              f"their datetimes are left empty")
+    stats = date_cache.stats()
+    print(f"Parsed {stats['rows']} dates as {stats['distinct']} distinct strings ({stats['deduplicated']:.1%} "
+          f"deduplicated); {stats['misses']} were parsed, {stats['hits']} came from the cache "
+          f"({stats['hit_rate']:.1%} hit rate)")
+    print(f"Wrote {counts['rows'] - counts['missing_id']} rows in {counts['chunks']} chunks to {output_file}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    argparser = argparse.ArgumentParser(description="Wrangle the raw thepeerage tables.")
+    argparser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                           help="Read the raw TSVs and write CSV, or read the raw Parquet copies and write Parquet.")
+    argparser.add_argument('--chunksize', type=int, default=None,
+                           help=f"Stream the raw person table in chunks of this many rows (e.g. {CHUNKSIZE}) "
+                                f"to keep memory flat.")
+    argparser.add_argument('--store', action='store_true',
+                           help="Also build the memory-mapped person store (person_store.py) from the output.")
+    argparser.add_argument('--metrics', default=None,
+                           help=f"Append per-stage metrics to this JSON-lines file (default: ${metrics.METRICS_ENV}, if set).")
+    argparser.add_argument('--profile', default=None,
+                           help=f"Dump a cProfile of each stage into this directory (default: ${metrics.PROFILE_ENV}).")
+    args = argparser.parse_args()
+    metrics.configure(args.metrics, args.profile)
+    if args.chunksize:
+        main_chunked(fmt=args.format, chunksize=args.chunksize)
+    else:
+        main(fmt=args.format)
+    if args.store:
+        with metrics.stage('wrangle.store') as stage:
+            store = build_store(f'../data/thepeerage/wrangled/wrangled_peerage.{args.format}',
+                                '../data/thepeerage/wrangled/person_store')
+            stage.update(rows_out=len(store))
+        print(f"Built the person store: {len(store)} people, {store.meta['index']} ID index")
\ No newline at end of file
@@ -0,0 +1,61 @@
+import os
+import argparse
+
+from table_io import write_parquet
+from hollingsworth import read_flatfile, wrangle_peers, datetime_strings, GenderLookup
+import metrics
+from metrics import Laps
+
+
+def main(fmt='csv', infer_gender=False):
+    """
+    Wrangles Hollingsworth's peersflatfile.tab into peers.csv, as 2_hollsingworth_wrangler.ipynb
+    does, or with fmt='parquet' into a typed peers.parquet. With infer_gender, people
+    without a recorded sex get one guessed from their first forename (needs gender_guesser).
+    Each step is recorded as a 'wrangle_hollingsworth.*' stage in the metrics file, if one is configured.
+    """
+    laps = Laps('wrangle_hollingsworth', echo=False)
+    # ====================== File Paths & Data Loading ======================
+    flatfile_path = '../data/hollingsworth/tab/peersflatfile.tab'
+    wrangled = '../data/hollingsworth/wrangled'
+
+    flatfile = read_flatfile(flatfile_path)
+    laps.lap('load', rows_out=len(flatfile))
+
+    # ====================== Wrangling ======================
+    gender_lookup = GenderLookup() if infer_gender else None
+    peers = wrangle_peers(flatfile, gender_lookup=gender_lookup)
+    print(f"We begin with {len(flatfile)} rows of peersflatfile.tab and keep {len(peers)} after dropping duplicates")
+    print(f"We are missing {peers['Extracted Parental Peerage_h'].isnull().sum()} parental peerages")
+    for prefix in ['born', 'died']:
+        print(f"{peers[f'{prefix}_datetime_h'].notnull().sum()} '{prefix}' dates are complete and valid")
+    if gender_lookup is not None:
+        print(f"Guessed genders for {len(gender_lookup)} distinct first forenames")
+    laps.lap('wrangle', rows_in=len(flatfile), rows_out=len(peers))
+
+    # ====================== Saving ======================
+    os.makedirs(wrangled, exist_ok=True)
+    if fmt == 'parquet':
+        print(f"Saving out to {wrangled}/peers.parquet")
+        write_parquet(peers, os.path.join(wrangled, 'peers.parquet'))
+    else:
+        print(f"Saving out to {wrangled}/peers.csv")
+        datetimes = {name: datetime_strings(peers[name]) for name in ['born_datetime_h', 'died_datetime_h']}
+        peers.assign(**datetimes).to_csv(os.path.join(wrangled, 'peers.csv'))
+    laps.lap('save', rows_in=len(peers), rows_out=len(peers), format=fmt)
+    laps.close()
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Wrangle Hollingsworth's peersflatfile.tab.")
+    argparser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                           help="Write peers.csv, or a typed peers.parquet.")
+    argparser.add_argument('--infer-gender', action='store_true',
+                           help="Guess missing genders from first forenames with gender_guesser.")
+    argparser.add_argument('--metrics', default=None,
+                           help=f"Append per-stage metrics to this JSON-lines file (default: ${metrics.METRICS_ENV}, if set).")
+    argparser.add_argument('--profile', default=None,
+                           help=f"Dump a cProfile of each stage into this directory (default: ${metrics.PROFILE_ENV}).")
+    args = argparser.parse_args()
+    metrics.configure(args.metrics, args.profile)
+    main(fmt=args.format, infer_gender=args.infer_gender)
@@ -0,0 +1,67 @@
+import time
+import argparse
+import pandas as pd
+
+from narrative import CLARENDON_SCHOOLS, NARRATIVE_CATEGORIES, NarrativeClassifier, narrative_features
+from synthetic import synthetic_narratives
+
+# --- Defaults ---
+# Roughly the number of people in a full crawl of thepeerage.com.
+N_PEOPLE = 760000
+
+
+def legacy_features(narr, categories=NARRATIVE_CATEGORIES):
+    """
+    One `in` test per phrase per person, as education_flags did for the Clarendon schools
+    and Oxbridge, kept as the reference implementation.
+    """
+    rows = []
+    for text in narr:
+        flags = {}
+        for category, phrases in categories.items():
+            flags[category] = 0
+            for phrase in phrases:
+                if phrase.lower() in text.lower():
+                    flags[category] = 1
+                    break
+        narr_lower = text.lower()
+        if 'oxford' in narr_lower and 'cambridge' in narr_lower:
+            flags['oxbridge'] = 'both'
+        elif 'oxford' in narr_lower and 'univ' in narr_lower:
+            flags['oxbridge'] = 'oxford'
+        elif 'cambridge' in narr_lower and 'univ' in narr_lower:
+            flags['oxbridge'] = 'cambridge'
+        else:
+            flags['oxbridge'] = 'N/A'
+        rows.append(flags)
+    return pd.DataFrame(rows, index=narr.index)
+
+
+def main(n_people):
+    narr = synthetic_narratives(n_people)
+    print(f"{len(narr)} narratives, {len(NARRATIVE_CATEGORIES)} categories")
+
+    start = time.perf_counter()
+    features = narrative_features(narr)
+    single_pass_seconds = time.perf_counter() - start
+    print(f"single-pass classifier: {single_pass_seconds:.2f}s")
+
+    start = time.perf_counter()
+    legacy = legacy_features(narr)
+    legacy_seconds = time.perf_counter() - start
+    print(f"per-phrase loop: {legacy_seconds:.2f}s")
+
+    pd.testing.assert_frame_equal(legacy, features, check_dtype=False)
+    print(f"Identical flags, {legacy_seconds / single_pass_seconds:.1f}x faster.")
+
+    education = NarrativeClassifier({'clarendon': CLARENDON_SCHOOLS})
+    start = time.perf_counter()
+    education.classify(narr)
+    print(f"Clarendon schools alone: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the narrative classifier against the per-phrase loop.")
+    parser.add_argument('--people', type=int, default=N_PEOPLE, help="Number of synthetic narratives.")
+    args = parser.parse_args()
+    main(args.people)
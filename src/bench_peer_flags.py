@@ -0,0 +1,74 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from peer_flags import peer_membership
+
+# --- Defaults ---
+# Roughly the size of a full crawl of thepeerage.com and its peers/orders index.
+N_PEOPLE = 760000
+N_PEER_ROWS = 100000
+TYPES_OF_PEER = ['duke', 'marquess', 'earl', 'viscount', 'baron', 'baronet', 'knight', 'lordparliament']
+
+
+def synthetic_tables(n_people, n_peer_rows, seed=0):
+    """
+    Builds a people frame indexed by ID and a peers table of (type, id) rows shaped like
+    british_peers_and_orders.tsv, where some people hold several titles.
+    """
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(np.arange(1, n_people * 10), size=n_people, replace=False)
+    df = pd.DataFrame({'fullname': 'x'}, index=pd.Index(ids, name='ID'))
+    peers = pd.DataFrame({
+        'type_of_peer': rng.choice(TYPES_OF_PEER, size=n_peer_rows),
+        'id': rng.choice(ids, size=n_peer_rows),
+    }).set_index('id')
+    return df, peers
+
+
+def legacy_flags(df, peers):
+    """
+    The per-row loop peer_membership replaces, kept as the reference implementation.
+    """
+    df = df.copy()
+    for type_of_peer in peers['type_of_peer'].unique():
+        df['is_' + type_of_peer] = 0
+    df['is_peer'] = 0
+    for index, row in peers.iterrows():
+        df.loc[index, 'is_' + row['type_of_peer']] = 1
+        df.loc[index, 'is_peer'] = 1
+    return df
+
+
+def vectorised_flags(df, peers):
+    df = df.copy()
+    flags = peer_membership(peers['type_of_peer'], df.index).drop(columns='type_of_peer')
+    df[list(flags.columns)] = flags.to_numpy()
+    return df
+
+
+def main(n_people, n_peer_rows):
+    df, peers = synthetic_tables(n_people, n_peer_rows)
+    print(f"{len(df)} people, {len(peers)} peer rows")
+
+    start = time.perf_counter()
+    vectorised = vectorised_flags(df, peers)
+    vectorised_seconds = time.perf_counter() - start
+    print(f"peer_membership: {vectorised_seconds:.2f}s")
+
+    start = time.perf_counter()
+    legacy = legacy_flags(df, peers)
+    legacy_seconds = time.perf_counter() - start
+    print(f"iterrows/.loc loop: {legacy_seconds:.2f}s")
+
+    pd.testing.assert_frame_equal(legacy, vectorised, check_dtype=False)
+    print(f"Identical flags, {legacy_seconds / vectorised_seconds:.0f}x faster.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the peer flag join against the per-row loop.")
+    parser.add_argument('--people', type=int, default=N_PEOPLE, help="Number of people in the synthetic frame.")
+    parser.add_argument('--peer-rows', type=int, default=N_PEER_ROWS, help="Number of rows in the synthetic peers table.")
+    args = parser.parse_args()
+    main(args.people, args.peer_rows)
@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import importlib
+import subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from synthetic import SyntheticGenealogy
+from narrative import CLARENDON_SCHOOLS
+from date_parsing import DateParseCache, add_date_columns, build_datetimes, parse_dates
+from peer_flags import peer_membership
+from genealogy import GenealogyGraph
+from names import split_fullname, split_forenames_surname
+from blocking import BlockingIndex, add_blocking_keys
+from scoring import score_candidates
+from matching import assign_matches
+from linkage import Linkage, composite_weight, passes_thresholds
+from hollingsworth import extract_parental_peerage
+
+# The scraper module name starts with a digit, so it is imported by name.
+scraper = importlib.import_module('0_thepeerage_scraper')
+
+# --- Defaults ---
+SIZES = [10000, 100000, 1000000]
+SEED = 0
+PARSE_LIMIT = 20000       # People parsed from HTML per size; parsing scales linearly.
+REFERENCE_LIMIT = 100000  # Rows run through the row-wise reference implementations per size.
+RESULTS_DIR = '../data/benchmarks'
+# Blocks of more candidate pairs are skipped by BlockingIndex; the common forenames of
+# a decade otherwise give ~10^8 pairs at 1M people (see 'skipped_blocks' in the results).
+MAX_BLOCK_PAIRS = 50000
+REGRESSION_THRESHOLD = 0.2  # Slowdown in rows per second reported as a regression.
+RECRAWL_FRACTION = 0.001    # Share of thepeerage records changed, and again added, before update_linkage.
+PACKAGES = ['pandas', 'numpy', 'scipy', 'pyarrow', 'lxml', 'bs4', 'recordlinkage', 'jellyfish']
+
+
+# --- Benchmarks ---
+def _timed(function, repeat=1):
+    """
+    Runs `function` `repeat` times and returns (fastest run in seconds, last result).
+    """
+    best, result = np.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def matching_tables(data, people, date_cache=None):
+    """
+    The df_h2i/df_l2i frames of steps 0 and 1 of 4_matching.ipynb for a synthetic dataset:
+    names keys, birth/death years and decade bins, and the parental peerage of each side.
+
+    Parameters:
+        data (SyntheticGenealogy): The dataset.
+        people (pd.DataFrame): data.raw indexed by integer ID, with the peer flag columns.
+        date_cache (DateParseCache or None): Cache to parse the born/died strings through.
+
+    Returns:
+        tuple: (df_h, df_l, true_pairs), the Hollingsworth and thepeerage frames indexed by
+               h_index and l_index, and the MultiIndex of true (h_index, l_index) matches.
+    """
+    cache = DateParseCache() if date_cache is None else date_cache
+    keys = split_fullname(people['fullname'])
+    graph = GenealogyGraph.from_child_column(people['child'])
+    peer_ids = people.index[people['is_peer'] == 1]
+    parental = graph.inherited_labels(graph.positions(peer_ids), people.loc[peer_ids, 'type_of_peer'], 1)
+    df_l = pd.DataFrame({
+        'forename': keys['First Forename'].to_numpy(),
+        'surname': keys['Last Surname'].to_numpy(),
+        'born_year': cache.parse(people['born'])['year'].to_numpy(),
+        'died_year': cache.parse(people['died'])['year'].to_numpy(),
+        'Extracted Parental Peerage_l': pd.Series(parental[graph.positions(people.index)]).replace('', np.nan).to_numpy(),
+    }, index=pd.RangeIndex(len(people), name='l_index'))
+
+    flatfile = data.hollingsworth
+    keys = split_forenames_surname(flatfile['First Names'], flatfile['Surname'])
+    df_h = pd.DataFrame({
+        'forename': keys['First Forename'].to_numpy(),
+        'surname': keys['Last Surname'].to_numpy(),
+        'born_year': flatfile['B Year'].to_numpy(),
+        'died_year': flatfile['D Year'].to_numpy(),
+        'Extracted Parental Peerage_h': extract_parental_peerage(flatfile['Parent']).to_numpy(),
+    }, index=pd.RangeIndex(len(flatfile), name='h_index'))
+
+    for df in (df_h, df_l):
+        df['year_bin'] = (df['born_year'] // 10).astype('Int64')
+        df['died_year_bin'] = (df['died_year'] // 10).astype('Int64')
+
+    known = data.true_matches.notna().to_numpy()
+    true_pairs = pd.MultiIndex.from_arrays(
+        [df_h.index[known], people.index.get_indexer(data.true_matches[known].astype('int64'))],
+        names=['h_index', 'l_index'])
+    return df_h, df_l, true_pairs
+
+
+def run_size(n_people, seed=SEED, repeat=1, parse_limit=PARSE_LIMIT, reference_limit=REFERENCE_LIMIT,
+             skip=(), workers=1, max_block_pairs=MAX_BLOCK_PAIRS):
+    """
+    Generates a dataset of `n_people` and times each hot path on it.
+
+    Parameters:
+        n_people (int): Number of people in thepeerage tables.
+        seed (int): Seed of the generator.
+        repeat (int): Runs per benchmark; the fastest is kept.
+        parse_limit (int): People parsed from HTML.
+        reference_limit (int): Rows run through the row-wise reference implementations.
+        skip (set): Benchmark names not to run.
+        workers (int): Processes used by score_candidates and assign_matches.
+        max_block_pairs (int or None): Largest block BlockingIndex keeps.
+
+    Returns:
+        list: One dict per benchmark: benchmark, people, rows, seconds, rows_per_second,
+              plus any figures of interest (candidates, recall, ...).
+    """
+    results = []
+
+    def record(name, rows, seconds, **extra):
+        results.append({'benchmark': name, 'people': n_people, 'rows': int(rows), 'seconds': round(seconds, 6),
+                        'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None, **extra})
+        print(f"  {name:<22} {rows:>10} rows {seconds:>9.3f}s")
+
+    start = time.perf_counter()
+    data = SyntheticGenealogy(n_people, seed=seed)
+    print(f"{n_people} people, {len(data.peers)} peer rows, {len(data.hollingsworth)} Hollingsworth rows "
+          f"(generated in {time.perf_counter() - start:.1f}s)")
+
+    # --- Scraper: person pages -> rows ---
+    pages = list(data.pages(limit=parse_limit)) if {'parse_person', 'parse_person_lxml'} - set(skip) else []
+    parsed = sum(content.count(b'class="itp"') for _, content in pages)
+    for name, parser in [('parse_person', 'bs4'), ('parse_person_lxml', 'lxml')]:
+        if name in skip:
+            continue
+        seconds, rows = _timed(lambda: [row for page, content in pages
+                                        for row in scraper.person_rows(page, content, CLARENDON_SCHOOLS, parser)],
+                               repeat)
+        expected = data.raw.iloc[:parsed].astype(str).to_numpy()
+        if not np.array_equal(np.array(rows, dtype=object).astype(str), expected):
+            raise AssertionError(f"{name} does not parse the synthetic pages back to the raw rows")
+        record(name, parsed, seconds)
+    del pages
+
+    # --- Wrangler: dates ---
+    sample = data.raw.iloc[:reference_limit]
+    if 'parse_dates' not in skip:
+        seconds, parts = _timed(lambda: sample['born'].apply(lambda x: pd.Series(parse_dates(x))), repeat)
+        record('parse_dates', len(sample), seconds)
+    if 'build_datetimes' not in skip:
+        frame = pd.DataFrame(sample['born'].map(parse_dates).tolist(), columns=['year', 'month', 'day', 'is_synthetic'])
+        parts = [frame[name].astype('Int64') for name in ['year', 'month', 'day']]
+        seconds, _ = _timed(lambda: build_datetimes(*parts), repeat)
+        record('build_datetimes', len(frame), seconds)
+
+    # As read_table gives the raw table: 'N/A' is missing.
+    people = data.raw.mask(data.raw == 'N/A').assign(ID=data.raw['ID'].astype('int64')).set_index('ID')
+    if 'add_date_columns' not in skip:
+        def dates():
+            df = people[['born', 'died']].copy()
+            cache = DateParseCache()
+            for prefix, synthetic_column in [('born', 'is_synthetic_birthdate'), ('died', 'is_synthetic_dieddate')]:
+                add_date_columns(df, prefix, synthetic_column, cache=cache)
+            return cache.stats()
+        seconds, stats = _timed(dates, repeat)
+        record('add_date_columns', 2 * len(people), seconds, distinct=stats['distinct'])
+
+    # --- Wrangler: peer and descent flags, as in main() of 1_thepeerage_wrangler.py ---
+    peers = data.peers[data.peers['id'].isin(people.index)].set_index('id').rename(columns={'type': 'type_of_peer'})
+    seconds, flags = _timed(lambda: peer_membership(peers['type_of_peer'], people.index), repeat)
+    if 'peer_membership' not in skip:
+        record('peer_membership', len(people), seconds, peer_rows=len(peers))
+    people = people.join(flags)
+    if 'descent_flags' not in skip:
+        def descent():
+            graph = GenealogyGraph.from_child_column(people['child'])
+            return graph, graph.descent_flags(graph.positions(peers.index), depth=2)
+        seconds, (graph, _) = _timed(descent, repeat)
+        record('descent_flags', len(people), seconds, edges=int(graph.n_edges))
+
+    # --- Matching: steps 1 to 5 of 4_matching.ipynb ---
+    if {'add_blocking_keys', 'blocking_index', 'score_candidates', 'assign_matches', 'update_linkage'} - set(skip):
+        df_h, df_l, true_pairs = matching_tables(data, people)
+        del people, data
+        seconds, _ = _timed(lambda: [add_blocking_keys(df_h, 'Extracted Parental Peerage_h'),
+                                     add_blocking_keys(df_l, 'Extracted Parental Peerage_l')], repeat)
+        record('add_blocking_keys', len(df_h) + len(df_l), seconds)
+        indexer = BlockingIndex(max_block_pairs=max_block_pairs)
+        seconds, candidates = _timed(lambda: indexer.index(df_h, df_l), repeat)
+        found = true_pairs.isin(candidates)
+        record('blocking_index', len(df_h) + len(df_l), seconds, candidates=len(candidates),
+               skipped_blocks=sum(blocking_pass['skipped_blocks'] for blocking_pass in indexer.report),
+               recall=round(float(found.mean()), 4) if len(found) else None)
+        if {'score_candidates', 'assign_matches'} - set(skip):
+            seconds, features = _timed(lambda: score_candidates(candidates, df_h, df_l, workers=workers,
+                                                                keep=passes_thresholds), repeat)
+            record('score_candidates', len(candidates), seconds, kept=len(features))
+            weights = composite_weight(features)
+            seconds, matches = _timed(lambda: assign_matches(weights, workers=workers), repeat)
+            correct = pd.MultiIndex.from_frame(matches[['h_index', 'l_index']]).isin(true_pairs).sum()
+            record('assign_matches', len(weights), seconds, matches=len(matches),
+                   precision=round(correct / len(matches), 4) if len(matches) else None,
+                   recall=round(correct / len(true_pairs), 4) if len(true_pairs) else None)
+        if 'update_linkage' not in skip:
+            # A recrawl: some records get another record's surname, and some are new.
+            df_h, df_l = df_h.rename_axis('h_id'), df_l.rename_axis('l_id')
+            rng = np.random.default_rng(seed)
+            n_changed = max(1, int(len(df_l) * RECRAWL_FRACTION))
+            new_ids = rng.choice(df_l.index, n_changed, replace=False)
+            linkage = Linkage.build(df_h, df_l.drop(new_ids), max_block_pairs=max_block_pairs, workers=workers)
+            recrawled = df_l.copy()
+            changed = rng.choice(df_l.index.difference(new_ids), n_changed, replace=False)
+            recrawled.loc[changed, 'surname'] = df_l['surname'].to_numpy()[rng.integers(len(df_l), size=n_changed)]
+            add_blocking_keys(recrawled, 'Extracted Parental Peerage_l')
+            seconds, (updated, diff) = _timed(lambda: linkage.update(df_h, recrawled, workers=workers), repeat)
+            record('update_linkage', updated.report['dirty_l'], seconds, candidates=len(updated.candidates),
+                   pairs_resolved=updated.report['pairs_resolved'], diff=len(diff))
+    return results
+
+
+# --- Results ---
+def environment():
+    """
+    Where the results were measured: commit, Python, platform and package versions.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                    text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = getattr(importlib.import_module(package), '__version__', None)
+        except ImportError:
+            packages[package] = None
+    return {'commit': commit, 'dirty': dirty, 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'packages': packages}
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Lines up two result files by (benchmark, people).
+
+    Parameters:
+        baseline, current (dict): Loaded result files.
+        threshold (float): Relative loss of throughput flagged as a regression.
+
+    Returns:
+        pd.DataFrame: Indexed by (benchmark, people), with the rows per second of each run,
+                      their ratio (current / baseline) and a 'regression' flag.
+    """
+    frames = [pd.DataFrame(results['results']).set_index(['benchmark', 'people'])['rows_per_second']
+              for results in (baseline, current)]
+    table = pd.concat(frames, axis=1, keys=['baseline', 'current'], join='inner')
+    table['ratio'] = table['current'] / table['baseline']
+    table['regression'] = table['ratio'] < 1 - threshold
+    return table
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Benchmark the scraper, wrangler and matching hot paths "
+                                                    "on seeded synthetic data.")
+    argparser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="Numbers of people to run at.")
+    argparser.add_argument('--seed', type=int, default=SEED, help="Seed of the synthetic data.")
+    argparser.add_argument('--repeat', type=int, default=1, help="Runs per benchmark; the fastest is kept.")
+    argparser.add_argument('--parse-limit', type=int, default=PARSE_LIMIT, help="People parsed from HTML per size.")
+    argparser.add_argument('--reference-limit', type=int, default=REFERENCE_LIMIT,
+                           help="Rows run through the row-wise reference implementations per size.")
+    argparser.add_argument('--skip', nargs='*', default=[], help="Benchmarks not to run.")
+    argparser.add_argument('--workers', type=int, default=1, help="Processes for scoring and assignment.")
+    argparser.add_argument('--max-block-pairs', type=int, default=MAX_BLOCK_PAIRS,
+                           help="Largest blocking block kept (0 keeps all).")
+    argparser.add_argument('--out', default=None, help="JSON file to write (default: a new file in "
+                                                       f"{RESULTS_DIR}).")
+    argparser.add_argument('--compare', default=None, help="Earlier results JSON to compare against.")
+    args = argparser.parse_args()
+
+    report = {'created': datetime.now().isoformat(timespec='seconds'), **environment(), 'seed': args.seed,
+              'repeat': args.repeat, 'parse_limit': args.parse_limit, 'reference_limit': args.reference_limit,
+              'max_block_pairs': args.max_block_pairs or None, 'results': []}
+    for size in args.sizes:
+        report['results'] += run_size(size, seed=args.seed, repeat=args.repeat, parse_limit=args.parse_limit,
+                                      reference_limit=args.reference_limit, skip=set(args.skip), workers=args.workers,
+                                      max_block_pairs=args.max_block_pairs or None)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}_{report['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"Results saved to {out}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            table = compare_results(json.load(f), report)
+        print(table.to_string(float_format=lambda x: f'{x:.2f}'))
+        if table['regression'].any():
+            print(f"{int(table['regression'].sum())} benchmarks regressed by more than {REGRESSION_THRESHOLD:.0%}.")
+            sys.exit(1)
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+from recordlinkage.preprocessing import phonetic
+
+# --- Defaults ---
+PHONETIC_METHOD = 'nysiis'
+# Each pass pairs records that agree on every key in it. Bins are compared with the
+# tolerance in BIN_TOLERANCE; 'parental_peerage' is ';'-separated and may match on
+# any of its titles.
+DEFAULT_PASSES = [
+    ('surname_code', 'year_bin'),
+    ('surname_code', 'died_year_bin'),
+    ('forename_code', 'year_bin'),
+    ('parental_peerage', 'forename_code', 'year_bin'),
+]
+BIN_TOLERANCE = {'year_bin': 1, 'died_year_bin': 1}
+MULTI_VALUED = {'parental_peerage'}
+
+
+def phonetic_codes(names, method=PHONETIC_METHOD):
+    """
+    Phonetic code of each name, computed once per distinct name.
+
+    Parameters:
+        names (pd.Series): Names, e.g. surnames; missing or empty names get no code.
+        method (str): Any method of recordlinkage.preprocessing.phonetic.
+
+    Returns:
+        pd.Series: The codes, indexed like `names`, NaN where there is no code.
+    """
+    codes, uniques = pd.factorize(names.where(names.astype(str).str.strip() != ''))
+    encoded = phonetic(pd.Series(uniques, dtype=object), method).replace('', np.nan).to_numpy()
+    return pd.Series(np.where(codes >= 0, encoded[codes], np.nan), index=names.index, dtype=object)
+
+
+def add_blocking_keys(df, parental_peerage_column, method=PHONETIC_METHOD):
+    """
+    Adds the 'surname_code', 'forename_code' and 'parental_peerage' keys used by
+    DEFAULT_PASSES to a table prepared as in 4_matching.ipynb (with 'forename',
+    'surname', 'year_bin' and 'died_year_bin' columns).
+
+    Parameters:
+        df (pd.DataFrame): The table, modified in place.
+        parental_peerage_column (str): Its 'Extracted Parental Peerage' column.
+        method (str): Phonetic encoding of the names.
+    """
+    df['surname_code'] = phonetic_codes(df['surname'], method)
+    df['forename_code'] = phonetic_codes(df['forename'], method)
+    df['parental_peerage'] = df[parental_peerage_column].astype(object).str.lower()
+
+
+class BlockingIndex:
+    """
+    Candidate-pair generator for linking the Hollingsworth and thepeerage tables, built
+    on an inverted index over several blocking keys.
+
+    Each pass maps every record to the tuple of its key values (a record missing any key
+    sits that pass out), and pairs left and right records with the same tuple. Bins in
+    `tolerance` also pair with neighbouring bins, so a birth in 1689 still meets one in
+    1691. The pairs of all passes are unioned and deduplicated. Like a recordlinkage
+    indexer, `index(df_left, df_right)` returns a pd.MultiIndex of (left, right) labels.
+
+    Parameters:
+        passes (list): Tuples of key columns, one tuple per pass.
+        tolerance (dict): Column -> how many neighbouring integer bins also match.
+        multi_valued (set): Columns holding ';'-separated values, any one of which may match.
+        max_block_pairs (int or None): Blocks that would produce more pairs than this are
+                                       skipped (and counted in the report).
+    """
+
+    def __init__(self, passes=DEFAULT_PASSES, tolerance=BIN_TOLERANCE, multi_valued=MULTI_VALUED,
+                 max_block_pairs=None):
+        self.passes = [tuple(keys) for keys in passes]
+        self.tolerance = dict(tolerance)
+        self.multi_valued = set(multi_valued)
+        self.max_block_pairs = max_block_pairs
+        self.report = []
+
+    def _keys(self, df, keys, widen):
+        """
+        Returns (record position, key tuple) rows for one pass, one row per value of
+        each multi-valued key and, on the widened side, per neighbouring bin.
+        """
+        frame = df[list(keys)].reset_index(drop=True)
+        frame.index.name = '_position'
+        for key in keys:
+            if key in self.multi_valued:
+                frame[key] = frame[key].str.split(';')
+                frame = frame.explode(key)
+                frame[key] = frame[key].str.strip().replace('', np.nan)
+        frame = frame.dropna()
+        for key in keys:
+            spread = self.tolerance.get(key, 0)
+            if widen and spread:
+                offsets = np.arange(-spread, spread + 1)
+                # By position: after an explode the record positions repeat.
+                frame = frame.iloc[np.repeat(np.arange(len(frame)), len(offsets))]
+                frame[key] = frame[key].to_numpy(dtype='int64') + np.tile(offsets, len(frame) // len(offsets))
+            elif key in self.tolerance:
+                frame[key] = frame[key].to_numpy(dtype='int64')
+        return frame.reset_index()
+
+    def _pass_pairs(self, left, right, keys):
+        """
+        Returns the (left position, right position) pairs sharing every key of one pass.
+        """
+        left_keys = self._keys(left, keys, widen=True)
+        right_keys = self._keys(right, keys, widen=False)
+        if not len(left_keys) or not len(right_keys):
+            self.report.append({'pass': keys, 'blocks': 0, 'largest_block': 0, 'skipped_blocks': 0, 'pairs': 0})
+            return np.zeros(0, dtype='int64'), np.zeros(0, dtype='int64')
+        codes, _ = pd.MultiIndex.from_frame(pd.concat([left_keys[list(keys)], right_keys[list(keys)]])).factorize()
+        left_codes, right_codes = codes[:len(left_keys)], codes[len(left_keys):]
+
+        left_sizes = np.bincount(left_codes, minlength=codes.max() + 1 if len(codes) else 0)
+        right_sizes = np.bincount(right_codes, minlength=len(left_sizes))
+        block_pairs = left_sizes * right_sizes
+        skipped = np.zeros(len(block_pairs), dtype=bool)
+        if self.max_block_pairs is not None:
+            skipped = block_pairs > self.max_block_pairs
+        keep_left, keep_right = ~skipped[left_codes], ~skipped[right_codes]
+
+        pairs = pd.DataFrame({'block': left_codes[keep_left], 'l': left_keys['_position'].to_numpy()[keep_left]}).merge(
+            pd.DataFrame({'block': right_codes[keep_right], 'r': right_keys['_position'].to_numpy()[keep_right]}),
+            on='block')
+        self.report.append({
+            'pass': keys,
+            'blocks': int((block_pairs > 0).sum()),
+            'largest_block': int(block_pairs.max()) if len(block_pairs) else 0,
+            'skipped_blocks': int(skipped.sum()),
+            'pairs': len(pairs),
+        })
+        return pairs['l'].to_numpy(), pairs['r'].to_numpy()
+
+    def index(self, df_left, df_right):
+        """
+        Generates the candidate pairs.
+
+        Parameters:
+            df_left (pd.DataFrame): The left table (Hollingsworth), with the key columns.
+            df_right (pd.DataFrame): The right table (thepeerage), with the key columns.
+
+        Returns:
+            pd.MultiIndex: Unique (left label, right label) candidate pairs.
+        """
+        self.report = []
+        encoded = []
+        for keys in self.passes:
+            left_positions, right_positions = self._pass_pairs(df_left, df_right, keys)
+            encoded.append(left_positions.astype('int64') * len(df_right) + right_positions)
+        encoded = np.unique(np.concatenate(encoded)) if encoded else np.zeros(0, dtype='int64')
+        left_positions, right_positions = np.divmod(encoded, len(df_right))
+        return pd.MultiIndex.from_arrays([df_left.index[left_positions], df_right.index[right_positions]],
+                                         names=[df_left.index.name, df_right.index.name])
+
+
+def blocking_report(candidates, n_left, n_right, true_pairs=None):
+    """
+    Summarises a candidate set: pairs compared, the reduction against comparing every
+    pair, and, given a labelled sample of true matches, the recall (pairs completeness).
+
+    Parameters:
+        candidates (pd.MultiIndex): The candidate pairs.
+        n_left, n_right (int): Number of records in each table.
+        true_pairs (pd.MultiIndex or None): Known matching pairs.
+
+    Returns:
+        dict: 'pairs', 'reduction_ratio' and, with true_pairs, 'true_pairs', 'found' and 'recall'.
+    """
+    report = {
+        'pairs': len(candidates),
+        'reduction_ratio': 1 - len(candidates) / (n_left * n_right) if n_left and n_right else 0.0,
+    }
+    if true_pairs is not None:
+        found = int(true_pairs.isin(candidates).sum())
+        report.update({'true_pairs': len(true_pairs), 'found': found,
+                       'recall': found / len(true_pairs) if len(true_pairs) else 0.0})
+    return report
+
@@ -0,0 +1,142 @@
+import sqlite3
+import hashlib
+from datetime import datetime
+
+# --- Schema ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    kind        TEXT NOT NULL,
+    page        NOT NULL,
+    url         TEXT NOT NULL UNIQUE,
+    status      TEXT NOT NULL,
+    http_code   INTEGER,
+    bytes       INTEGER,
+    sha256      TEXT,
+    attempts    INTEGER,
+    updated_at  TEXT NOT NULL,
+    etag        TEXT,
+    last_modified TEXT,
+    lastedit    TEXT,
+    PRIMARY KEY (kind, page)
+)
+"""
+# Columns added after the first version of the manifest, migrated in place on open.
+ADDED_COLUMNS = {'etag': 'TEXT', 'last_modified': 'TEXT', 'lastedit': 'TEXT'}
+
+
+class CrawlManifest:
+    """
+    Persistent page-level record of a crawl, stored in SQLite.
+
+    Each fetched page is keyed by its kind ('person', 'peer' or 'source') and page key
+    (the page number, or the peerage type for the index pages), and records the fetch
+    status, HTTP code, byte size and SHA-256 content hash. A rerun uses it to skip pages
+    already done and retry only those that failed or were never reached. The ETag and
+    Last-Modified validators and the newest "Last Edited" date on each page are kept for
+    incremental recrawls.
+
+    Parameters:
+        path (str): Location of the SQLite database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(pages)")}
+        for column, sqltype in ADDED_COLUMNS.items():
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE pages ADD COLUMN {column} {sqltype}")
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, kind, result, lastedit=None, digest=None, size=None):
+        """
+        Records the outcome of one fetch, replacing any earlier record for the page.
+        A 304 (Not Modified) answer only refreshes the check time, and a failed fetch
+        never overwrites a page that is already done.
+
+        Parameters:
+            kind (str): The kind of page.
+            result (fetch_engine.FetchResult): The fetch result; its key is the page key.
+            lastedit (str or None): The newest "Last Edited" date found on the page.
+            digest (str or None): SHA-256 of the content, for a result whose content has
+                                  already been hashed and dropped; the page is then done.
+            size (int or None): Byte size of that content.
+        """
+        content = result.content
+        if digest is None and content is not None:
+            digest, size = hashlib.sha256(content).hexdigest(), len(content)
+        now = datetime.now().isoformat(timespec='seconds')
+        if digest is None:
+            previous = self.conn.execute("SELECT status FROM pages WHERE kind = ? AND page = ?",
+                                         (kind, result.key)).fetchone()
+            if previous is not None and previous[0] == 'done':
+                if result.status_code == 304:
+                    self.conn.execute("UPDATE pages SET updated_at = ? WHERE kind = ? AND page = ?",
+                                      (now, kind, result.key))
+                    self.conn.commit()
+                return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (kind, page, url, status, http_code, bytes, sha256, attempts, "
+            "updated_at, etag, last_modified, lastedit) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (kind, result.key, result.url,
+             'done' if digest is not None else 'failed',
+             result.status_code,
+             size,
+             digest,
+             result.attempts,
+             now,
+             result.etag,
+             result.last_modified,
+             lastedit)
+        )
+        self.conn.commit()
+
+    def keys(self, kind, status='done'):
+        """
+        Returns the set of page keys of the given kind with the given status.
+        """
+        rows = self.conn.execute("SELECT page FROM pages WHERE kind = ? AND status = ?", (kind, status))
+        return {row[0] for row in rows}
+
+    def digests(self, kind):
+        """
+        Returns a dict of page key -> content hash for every page of the given kind marked done.
+        """
+        rows = self.conn.execute("SELECT page, sha256 FROM pages WHERE kind = ? AND status = 'done'", (kind,))
+        return dict(rows.fetchall())
+
+    def entries(self, kind):
+        """
+        Returns a dict of page key -> dict of the stored columns for every page of the
+        given kind marked done.
+        """
+        cursor = self.conn.execute("SELECT * FROM pages WHERE kind = ? AND status = 'done'", (kind,))
+        columns = [description[0] for description in cursor.description]
+        entries = (dict(zip(columns, row)) for row in cursor)
+        return {entry['page']: entry for entry in entries}
+
+    def reset(self, kind):
+        """
+        Forgets every page of the given kind, so the next crawl starts from scratch.
+        """
+        self.conn.execute("DELETE FROM pages WHERE kind = ?", (kind,))
+        self.conn.commit()
+
+    def summary(self, kind):
+        """
+        Returns a dict of status -> number of pages for the given kind.
+        """
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM pages WHERE kind = ? GROUP BY status", (kind,))
+        return dict(rows.fetchall())
@@ -0,0 +1,515 @@
+import re
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# --- Rules ---
+MONTH_NAMES = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+DATE_COLUMNS = ['year', 'month', 'day', 'is_synthetic']
+MONTH_PATTERN = '|'.join(MONTH_NAMES)
+# Digit runs beyond what a float64 holds exactly are not dates; they are left unparsed.
+MAX_EXACT = float(2 ** 53)
+# Distinct date strings kept by a DateParseCache.
+DATE_CACHE_SIZE = 1 << 20
+# First and last midnight pandas can hold as datetime64[ns].
+NANOSECOND_DAYS = (np.datetime64('1677-09-22'), np.datetime64('2262-04-11'))
+
+def compute_halfway_day(month, year):
+    """
+    Return the default ("halfway") day for the given month and year:
+      - For February: 14 if not a leap year, 15 if a leap year.
+      - Months with 31 days: 16.
+      - Months with 30 days: 15.
+    """
+    if month == 2:
+        if (year % 400 == 0) or ((year % 4 == 0) and (year % 100 != 0)):
+            return 15
+        else:
+            return 14
+    if month in [1, 3, 5, 7, 8, 10, 12]:
+        return 16
+    return 15
+
+
+def halfway_days(month, year):
+    """
+    Vectorised compute_halfway_day over arrays of months and years.
+    """
+    with np.errstate(invalid='ignore'):
+        leap = (year % 400 == 0) | ((year % 4 == 0) & (year % 100 != 0))
+    return np.where(month == 2, np.where(leap, 15, 14), np.where(np.isin(month, [1, 3, 5, 7, 8, 10, 12]), 16, 15))
+
+
+# --- Reference Parser ---
+def parse_dates(val):
+    """
+    Parse a string from the 'born' column and extract (year, month, day, is_synthetic_date).
+
+    Rules:
+    - If the string contains "before" or "after" (but not "circa"), return missing values.
+
+    (A) If the string contains a slash ("/") or the word "or":
+         - First, if the string matches exactly two year numbers separated by a slash
+           (e.g. "1464/65"), return (second_year, 1, 1, True) where the second year is reconstructed if abbreviated.
+         - Otherwise, split on "/" (or " or "), extract a base year from the first token and a secondary year
+           from the second token, then:
+             • If no month name is found, default to month 7 and day 1 (synthetic).
+             • If a month name is found, use it. For the day, if the string starts with a digit and the first
+               number (day candidate) is ≤ 31, use it; otherwise, compute a fallback day (mark synthetic).
+
+    (B) If no slash or "or" is present:
+         - If a month name is found:
+             • If the string starts with a digit and at least two numbers exist, take the first as day and the last as year (synthetic = False).
+             • Otherwise, use the sole found number as year and compute the day (synthetic = True).
+         - If no month name is found:
+             • If only one number is present, default to month 7 and day 1 (synthetic = True).
+             • If more than one number is present and the string starts with a digit, use the first as day and the last as year (synthetic = False);
+               otherwise default to day 1 (synthetic = True) with month 7.
+
+    If nothing can be parsed, returns (np.nan, np.nan, np.nan, False).
+
+    This is the one-string-at-a-time reference for parse_date_column.
+    """
+    if pd.isnull(val) or str(val).strip() == '':
+        return (np.nan, np.nan, np.nan, False)
+
+    s = str(val).strip().lower()
+
+    # If the string indicates uncertainty with "before" or "after" (but not "circa"), return missing.
+    if (("before" in s or "after" in s) and ("circa" not in s)):
+        return (np.nan, np.nan, np.nan, False)
+
+    synthetic = False
+
+    # (A) Handle strings with a slash ("/") or "or".
+    if '/' in s or ' or ' in s:
+        # Check if the entire string is exactly two year numbers separated by a slash.
+        match_range = re.fullmatch(r'(\d{3,4})\s*/\s*(\d{1,4})', s)
+        if match_range:
+            base_year_str = match_range.group(1)
+            second_year_str = match_range.group(2)
+            if len(second_year_str) < len(base_year_str):
+                full_year = int(base_year_str[:len(base_year_str) - len(second_year_str)] + second_year_str)
+            else:
+                full_year = int(second_year_str)
+            synthetic = True  # synthesized default for missing month/day
+            return (full_year, 1, 1, synthetic)
+
+        # Otherwise, split on '/' (or " or ").
+        tokens = s.split('/') if '/' in s else s.split(' or ')
+        match1 = re.search(r'\d{3,4}', tokens[0])
+        if match1:
+            base_year_str = match1.group(0)
+        else:
+            return (np.nan, np.nan, np.nan, False)
+        match2 = re.search(r'\d+', tokens[1]) if len(tokens) > 1 else None
+        if match2:
+            second_year_str = match2.group(0)
+        else:
+            second_year_str = None
+        if second_year_str:
+            if len(second_year_str) < len(base_year_str):
+                full_year = int(base_year_str[:len(base_year_str) - len(second_year_str)] + second_year_str)
+            else:
+                full_year = int(second_year_str)
+        else:
+            full_year = int(base_year_str)
+
+        # Look for a month name in the whole string.
+        found_month = None
+        for name, number in MONTH_NAMES.items():
+            if name in s:
+                found_month = number
+                break
+        if found_month is None:
+            synthetic = True
+            return (full_year, 7, 1, synthetic)
+        else:
+            month = found_month
+
+        # Determine day: if the string starts with a digit, try to use the first number.
+        if re.match(r'\d', s):
+            numbers = re.findall(r'\d+', s)
+            try:
+                day_candidate = int(numbers[0])
+            except Exception:
+                day_candidate = None
+            if day_candidate is not None and day_candidate <= 31:
+                day = day_candidate
+            else:
+                synthetic = True
+                day = compute_halfway_day(month, full_year)
+        else:
+            synthetic = True
+            day = compute_halfway_day(month, full_year)
+        return (full_year, month, day, synthetic)
+
+    # (B) Handle strings without a slash or "or".
+    else:
+        found_month = None
+        for name, number in MONTH_NAMES.items():
+            if name in s:
+                found_month = number
+                break
+        numbers = re.findall(r'\d+', s)
+        if found_month is not None:
+            if len(numbers) == 0:
+                return (np.nan, np.nan, np.nan, False)
+            if re.match(r'\d', s):
+                if len(numbers) >= 2:
+                    # Both day and year appear.
+                    day = int(numbers[0])
+                    year = int(numbers[-1])
+                    synthetic = False
+                else:
+                    year = int(numbers[0])
+                    synthetic = True
+                    day = compute_halfway_day(found_month, year)
+            else:
+                year = int(numbers[-1])
+                synthetic = True
+                day = compute_halfway_day(found_month, year)
+            month = found_month
+        else:
+            # No month name.
+            if len(numbers) == 0:
+                return (np.nan, np.nan, np.nan, False)
+            if len(numbers) == 1:
+                year = int(numbers[0])
+                month = 7
+                day = 1
+                synthetic = True
+            else:
+                if re.match(r'\d', s):
+                    day = int(numbers[0])
+                    year = int(numbers[-1])
+                    synthetic = False
+                else:
+                    year = int(numbers[-1])
+                    day = 1
+                    synthetic = True
+                month = 7
+        return (year, month, day, synthetic)
+
+
+# --- Vectorised Parser ---
+def _number(strings):
+    """
+    Converts extracted digit strings to float64, NaN where nothing was extracted.
+    """
+    numbers = pd.to_numeric(strings, errors='coerce').to_numpy(dtype='float64')
+    # \d also matches non-ASCII decimal digits, which only int() understands.
+    other = np.isnan(numbers) & strings.notna().to_numpy()
+    numbers[other] = [float(int(digits)) if len(digits) < 300 else np.inf for digits in strings[other]]
+    return numbers
+
+
+def _join_years(base, second):
+    """
+    Vectorised "1464/65" -> 1465 year reconstruction: a shorter second year replaces
+    the trailing digits of the base year, otherwise it is taken as is.
+    """
+    base_len = np.asarray(base.str.len(), dtype='float64')
+    second_len = np.asarray(second.str.len(), dtype='float64')
+    base_year, second_year = _number(base), _number(second)
+    scale = 10.0 ** np.nan_to_num(second_len)
+    with np.errstate(invalid='ignore', over='ignore'):
+        return np.where(second_len < base_len, np.floor(base_year / scale) * scale + second_year, second_year)
+
+
+def parse_date_column(values):
+    """
+    Parses a whole column of date strings with the rules of parse_dates, using
+    vectorised string operations and NumPy arithmetic instead of one call per row.
+
+    Parameters:
+        values (pd.Series): Raw date strings, e.g. the 'born' or 'died' column.
+
+    Returns:
+        pd.DataFrame: Indexed like `values`, with nullable 'year', 'month' and 'day'
+                      columns and a boolean 'is_synthetic' column.
+    """
+    n = len(values)
+    year, month, day = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+    synthetic = np.zeros(n, dtype=bool)
+
+    present = values.notna().to_numpy()
+    text = values[present].astype(str).str.strip().str.lower()
+    rows = np.flatnonzero(present)[(text != '').to_numpy()]
+    text = text[(text != '').to_numpy()].reset_index(drop=True)
+
+    # One pass each for the qualifiers, the month names and the numbers of every string.
+    hedged = (text.str.contains('before|after') & ~text.str.contains('circa', regex=False)).to_numpy()
+    slash = text.str.contains('/', regex=False).to_numpy()
+    alternative = slash | text.str.contains(' or ', regex=False).to_numpy()
+    # No month name overlaps another, so the lowest month found is the first in MONTH_NAMES order.
+    months = text.str.findall(MONTH_PATTERN).explode().map(MONTH_NAMES)
+    found_month = months.groupby(level=0).min().fillna(0).to_numpy()
+    has_month = found_month > 0
+    starts_digit = text.str.match(r'\d').to_numpy()
+    numbers = text.str.findall(r'\d+').explode()
+    numbers = pd.Series(_number(numbers), index=numbers.index).groupby(level=0)
+    n_numbers = numbers.count().to_numpy()
+    first_number = numbers.first().to_numpy()
+    last_number = numbers.last().to_numpy()
+
+    t_year, t_month, t_day = np.full(len(text), np.nan), np.full(len(text), np.nan), np.full(len(text), np.nan)
+    t_synthetic = np.zeros(len(text), dtype=bool)
+
+    def assign(mask, y, m, d, synth):
+        t_year[mask] = y[mask] if isinstance(y, np.ndarray) else y
+        t_month[mask] = m[mask] if isinstance(m, np.ndarray) else m
+        t_day[mask] = d[mask] if isinstance(d, np.ndarray) else d
+        t_synthetic[mask] = synth[mask] if isinstance(synth, np.ndarray) else synth
+
+    # (A) Strings with a slash or " or " (a minority) are split and searched on their own.
+    a_rows = np.flatnonzero(~hedged & alternative)
+    a_text = text.iloc[a_rows].reset_index(drop=True)
+    tokens = pd.Series(np.where(slash[a_rows], a_text.str.split('/', n=2), a_text.str.split(' or ', n=2)),
+                       dtype=object)
+    base = tokens.str[0].str.extract(r'(\d{3,4})', expand=False)
+    second = tokens.str[1].str.extract(r'(\d+)', expand=False)
+    year_range = a_text.str.extract(r'^(\d{3,4})\s*/\s*(\d{1,4})$')
+    joined = np.where(second.notna().to_numpy(), _join_years(base, second), _number(base))
+
+    a_year = np.full(len(text), np.nan)
+    is_range = np.zeros(len(text), dtype=bool)
+    is_range[a_rows] = year_range[0].notna().to_numpy()
+    has_base = np.zeros(len(text), dtype=bool)
+    has_base[a_rows] = base.notna().to_numpy()
+    has_base &= ~is_range
+    a_year[a_rows] = np.where(is_range[a_rows], _join_years(year_range[0], year_range[1]), joined)
+    assign(is_range, a_year, 1, 1, True)
+    assign(has_base & ~has_month, a_year, 7, 1, True)
+    day_given = has_base & has_month & starts_digit & (first_number <= 31)
+    assign(day_given, a_year, found_month, first_number, False)
+    assign(has_base & has_month & ~day_given, a_year, found_month, halfway_days(found_month, a_year), True)
+
+    # (B) Strings without a slash or " or ".
+    plain = ~hedged & ~alternative & (n_numbers > 0)
+    halfway = halfway_days(found_month, last_number)
+    day_and_year = plain & starts_digit & (n_numbers >= 2)
+    assign(plain & has_month & day_and_year, last_number, found_month, first_number, False)
+    assign(plain & has_month & ~day_and_year, last_number, found_month, halfway, True)
+    assign(plain & ~has_month & (n_numbers == 1), first_number, 7, 1, True)
+    assign(plain & ~has_month & day_and_year, last_number, 7, first_number, False)
+    assign(plain & ~has_month & (n_numbers >= 2) & ~starts_digit, last_number, 7, 1, True)
+
+    year[rows], month[rows], day[rows], synthetic[rows] = t_year, t_month, t_day, t_synthetic
+    # Absurd digit runs too long to hold exactly are treated as unparseable.
+    overflow = (np.abs(year) >= MAX_EXACT) | (np.abs(day) >= MAX_EXACT)
+    year[overflow], month[overflow], day[overflow], synthetic[overflow] = np.nan, np.nan, np.nan, False
+    return pd.DataFrame({
+        'year': pd.array(year, dtype='Int64'),
+        'month': pd.array(month, dtype='Int8'),
+        'day': pd.array(day, dtype='Int64'),
+        'is_synthetic': synthetic,
+    }, index=values.index)
+
+
+def build_datetimes(year, month, day):
+    """
+    Vectorised datetime construction from parsed components. Dates that do not exist
+    (e.g. 31 February) or fall outside years 1..9999 are NaT, as they were
+    when each row was built with datetime/pd.Timestamp.
+
+    Parameters:
+        year, month, day (pd.Series): Nullable integer components.
+
+    Returns:
+        tuple: A datetime64[us] pd.Series indexed like `year`, and a boolean array
+               marking rows whose components were all present but formed no valid date.
+    """
+    y = year.to_numpy(dtype='float64', na_value=np.nan)
+    m = month.to_numpy(dtype='float64', na_value=np.nan)
+    d = day.to_numpy(dtype='float64', na_value=np.nan)
+    complete = ~(np.isnan(y) | np.isnan(m) | np.isnan(d))
+    ok = complete & (y >= 1) & (y <= 9999) & (m >= 1) & (m <= 12) & (d >= 1) & (d <= 31)
+
+    months = np.zeros(len(y), dtype='int64')
+    months[ok] = (y[ok].astype('int64') - 1970) * 12 + m[ok].astype('int64') - 1
+    first = months.astype('datetime64[M]').astype('datetime64[D]')
+    days_in_month = ((months + 1).astype('datetime64[M]').astype('datetime64[D]') - first).astype('int64')
+    ok &= d <= days_in_month
+    dates = first + np.where(ok, d - 1, 0).astype('int64')
+
+    datetimes = np.full(len(y), np.datetime64('NaT'), dtype='datetime64[us]')
+    datetimes[ok] = dates[ok]
+    return pd.Series(datetimes, index=year.index), complete & ~ok
+
+
+def format_dates(year, month, day, valid):
+    """
+    Returns 'dd-mm-YYYY' strings (the year unpadded, as strftime gives it) where `valid`,
+    else NaN.
+    """
+    strings = np.full(len(year), np.nan, dtype=object)
+    if valid.any():
+        strings[valid] = (day[valid].astype(str).str.zfill(2) + '-' + month[valid].astype(str).str.zfill(2)
+                          + '-' + year[valid].astype(str)).to_numpy()
+    return strings
+
+
+def iso_dates(datetimes, times=None):
+    """
+    Returns 'YYYY-MM-DD' strings ('' for NaT) for writing datetime64 columns to CSV as
+    the wranglers' columns of datetime/pd.Timestamp objects were written. pandas kept such
+    a column as objects, written as '1568-09-04 00:00:00', when any date fell outside
+    its nanosecond range (1677-2262); otherwise it converted the column to
+    datetime64[ns], written as '1768-09-04'. Years before 1000 are zero-padded either way.
+
+    Parameters:
+        datetimes (pd.Series): datetime64 values.
+        times (bool or None): Whether to append ' 00:00:00'; if None, only when a date
+                              falls outside the nanosecond range.
+
+    Returns:
+        np.ndarray: One string per value.
+    """
+    values = datetimes.to_numpy()
+    valid = ~np.isnat(values)
+    if times is None:
+        days = values[valid].astype('datetime64[D]')
+        times = bool(((days < NANOSECOND_DAYS[0]) | (days > NANOSECOND_DAYS[1])).any())
+    strings = np.datetime_as_string(values, unit='D').astype(object)
+    if times:
+        strings = strings + ' 00:00:00'
+    strings[~valid] = ''
+    return strings
+
+
+# --- Memoisation ---
+class DateParseCache:
+    """
+    Bounded LRU cache of parsed date strings.
+
+    Date strings repeat heavily ("1850", "circa 1700", "1464/65", ...), so a column is
+    factorised into its distinct values, only values not already cached are parsed
+    (with parse_date_column), and the results are broadcast back to the rows. One cache
+    can be shared by the born and died columns and across chunks of a table.
+
+    Parameters:
+        maxsize (int): Maximum number of distinct strings kept; least recently used
+                       entries are evicted first.
+    """
+
+    def __init__(self, maxsize=DATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.rows = 0
+        self.distinct = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, uniques):
+        """
+        Returns the parsed (year, month, day, is_synthetic) of each distinct value,
+        parsing and caching those not seen before.
+
+        Parameters:
+            uniques (array-like): Distinct, non-null date strings.
+
+        Returns:
+            pd.DataFrame: One row per value, with the columns of parse_date_column.
+        """
+        found = [self.entries.get(value) for value in uniques]
+        missing = [value for value, entry in zip(uniques, found) if entry is None]
+        self.hits += len(found) - len(missing)
+        self.misses += len(missing)
+        for value, entry in zip(uniques, found):
+            if entry is not None:
+                self.entries.move_to_end(value)
+        if missing:
+            parsed = parse_date_column(pd.Series(missing, dtype=object))
+            new = dict(zip(missing, parsed.itertuples(index=False, name=None)))
+            found = [entry if entry is not None else new[value] for value, entry in zip(uniques, found)]
+            self.entries.update(new)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        frame = pd.DataFrame(found, columns=DATE_COLUMNS)
+        return frame.astype({'year': 'Int64', 'month': 'Int8', 'day': 'Int64', 'is_synthetic': bool})
+
+    def factorize(self, values):
+        """
+        Splits a column into codes and distinct values, counting both for the statistics.
+
+        Returns:
+            tuple: (codes, uniques) as from pd.factorize; missing values have code -1.
+        """
+        codes, uniques = pd.factorize(values)
+        self.rows += len(values)
+        self.distinct += len(uniques)
+        return codes, uniques
+
+    def parse(self, values):
+        """
+        parse_date_column through the cache: each distinct string is parsed at most once.
+        """
+        codes, uniques = self.factorize(values)
+        parsed = self.lookup(uniques)
+        return broadcast(parsed, codes).set_axis(values.index)
+
+    def stats(self):
+        """
+        Returns a dict of how much parsing the cache saved: rows seen, distinct values,
+        cache hits and misses among them, the hit rate and the share of rows deduplicated.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'rows': self.rows,
+            'distinct': self.distinct,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'deduplicated': 1 - self.distinct / self.rows if self.rows else 0.0,
+            'size': len(self.entries),
+        }
+
+
+def broadcast(frame, codes):
+    """
+    Expands a per-distinct-value frame back to rows; code -1 (a missing value) gives
+    missing components and is_synthetic False, as parse_dates does.
+    """
+    rows = frame.reindex(codes).reset_index(drop=True)
+    rows['is_synthetic'] = rows['is_synthetic'].eq(True)
+    return rows
+
+
+def add_date_columns(df, prefix, synthetic_column, cache=None):
+    """
+    Parses df[prefix] and adds the {prefix}_year/_month/_day, synthetic flag,
+    {prefix}_datetime and {prefix}_datetime_str columns. Each distinct date string is
+    parsed and converted once, through `cache`, and the results broadcast to the rows.
+
+    Parameters:
+        df (pd.DataFrame): The table, modified in place.
+        prefix (str): The date column to parse, 'born' or 'died'.
+        synthetic_column (str): Name of the synthetic-date flag column.
+        cache (DateParseCache or None): Cache to parse through; a fresh one if None.
+
+    Returns:
+        int: Number of rows whose parsed components form no valid date.
+    """
+    cache = DateParseCache() if cache is None else cache
+    codes, uniques = cache.factorize(df[prefix])
+    parsed = cache.lookup(uniques)
+    datetimes, invalid = build_datetimes(parsed['year'], parsed['month'], parsed['day'])
+    parsed['datetime'] = datetimes
+    parsed['datetime_str'] = format_dates(parsed['year'], parsed['month'], parsed['day'], datetimes.notna().to_numpy())
+
+    rows = broadcast(parsed, codes)
+    df[f'{prefix}_year'] = rows['year'].array
+    df[f'{prefix}_month'] = rows['month'].array
+    df[f'{prefix}_day'] = rows['day'].array
+    df[synthetic_column] = rows['is_synthetic'].array
+    df[f'{prefix}_datetime'] = rows['datetime'].array
+    df[f'{prefix}_datetime_str'] = rows['datetime_str'].array
+    return int(np.bincount(codes[codes >= 0], minlength=len(uniques))[invalid].sum())
@@ -0,0 +1,193 @@
+import time
+import logging
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import FetchStats
+
+# --- Defaults ---
+CONCURRENCY = 4           # Number of worker threads fetching at once.
+REQUESTS_PER_SECOND = 2   # Global request rate shared by all workers.
+MAX_RETRIES = 10          # Maximum number of retries for each fetch.
+BACKOFF_FACTOR = 60       # Base time (in seconds) for exponential backoff.
+REQUEST_TIMEOUT = 60      # Seconds before an unresponsive request is abandoned.
+
+FetchResult = namedtuple('FetchResult', ['key', 'url', 'content', 'status_code', 'attempts', 'etag', 'last_modified'],
+                         defaults=[None, None])
+
+
+# --- Rate Limiting ---
+class TokenBucket:
+    """
+    Thread-safe token bucket used to enforce a global request rate.
+
+    Parameters:
+        rate (float): Tokens added per second.
+        capacity (int): Maximum number of tokens that can accumulate (burst size).
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then consumes it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# --- Fetching ---
+def fetch_with_retries(session, url, headers, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                       timeout=REQUEST_TIMEOUT, limiter=None, key=None, give_up_on=(), stats=None):
+    """
+    Fetches a URL with exponential backoff, optionally waiting on a shared rate limiter
+    before every attempt. A 304 (Not Modified) answer to a conditional request is final
+    and returns no content.
+
+    Parameters:
+        session (requests.Session): The session to use for the request.
+        url (str): The URL to fetch.
+        headers (dict): HTTP headers to include.
+        max_retries (int): Maximum number of retries.
+        backoff_factor (int): Base time (in seconds) to wait between retries.
+        timeout (float): Per-request timeout in seconds.
+        limiter (TokenBucket or None): Rate limiter shared between workers.
+        key: Caller-supplied identifier carried through to the result (e.g. the page number).
+        give_up_on (tuple): Status codes that are final rather than retried, e.g. 404.
+        stats (FetchStats or None): Counts the latency, status and size of every attempt,
+                                    the time backing off and the outcome.
+
+    Returns:
+        FetchResult: The content is None if every attempt failed or the page was not modified.
+    """
+    status_code = None
+    for attempt in range(max_retries):
+        if limiter is not None:
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+            status_code = response.status_code
+            if stats is not None:
+                stats.attempt(url, time.perf_counter() - start, status_code, len(response.content))
+            if response.status_code in (200, 304):
+                content = response.content if response.status_code == 200 else None
+                if stats is not None:
+                    stats.finished(url, attempt + 1, ok=True)
+                return FetchResult(key, url, content, status_code, attempt + 1,
+                                   response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            elif response.status_code in give_up_on:
+                if stats is not None:
+                    stats.finished(url, attempt + 1, ok=True)
+                return FetchResult(key, url, None, status_code, attempt + 1)
+            else:
+                logging.warning("Status code %s for URL %s. Retrying after delay.", response.status_code, url)
+        except Exception as e:
+            if stats is not None:
+                stats.attempt(url, time.perf_counter() - start)
+            logging.error("Exception fetching %s: %s", url, e)
+        delay = backoff_factor * (attempt + 1)
+        if stats is not None:
+            stats.backoff(url, delay)
+        time.sleep(delay)
+    if stats is not None:
+        stats.finished(url, max_retries, ok=False)
+    return FetchResult(key, url, None, status_code, max_retries)
+
+
+class FetchEngine:
+    """
+    Concurrent fetcher: a bounded thread pool sharing one pooled requests.Session and
+    one global token bucket, so politeness is enforced across all workers.
+
+    Parameters:
+        headers (dict): HTTP headers to include with every request.
+        concurrency (int): Number of worker threads.
+        requests_per_second (float): Global rate limit across all workers.
+        max_retries (int): Maximum number of retries for each fetch.
+        backoff_factor (int): Base time (in seconds) for exponential backoff.
+        timeout (float): Per-request timeout in seconds.
+        stats (FetchStats or None): Fetch counters to add to; a new FetchStats if None.
+    """
+
+    def __init__(self, headers, concurrency=CONCURRENCY, requests_per_second=REQUESTS_PER_SECOND,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, timeout=REQUEST_TIMEOUT, stats=None):
+        self.headers = headers
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.limiter = TokenBucket(requests_per_second)
+        self.stats = FetchStats() if stats is None else stats
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def fetch(self, url, key=None, extra_headers=None, give_up_on=()):
+        """
+        Fetches a single URL through the shared session and rate limiter.
+
+        Parameters:
+            url (str): The URL to fetch.
+            key: Caller-supplied identifier carried through to the result.
+            extra_headers (dict or None): Headers added to this request only, e.g. If-None-Match.
+            give_up_on (tuple): Status codes that are final rather than retried.
+
+        Returns:
+            FetchResult: The result of the fetch.
+        """
+        headers = {**self.headers, **extra_headers} if extra_headers else self.headers
+        return fetch_with_retries(self.session, url, headers, max_retries=self.max_retries,
+                                  backoff_factor=self.backoff_factor, timeout=self.timeout,
+                                  limiter=self.limiter, key=key, give_up_on=give_up_on, stats=self.stats)
+
+    def fetch_many(self, jobs, give_up_on=()):
+        """
+        Fetches many URLs concurrently, yielding results in the order the jobs were given.
+        At most a few multiples of `concurrency` pages are held in memory at once, and
+        `jobs` is consumed lazily, so a generator can stop producing based on earlier results.
+
+        Parameters:
+            jobs (iterable): (key, url) pairs, or (key, url, extra_headers) triples.
+            give_up_on (tuple): Status codes that are final rather than retried.
+
+        Yields:
+            FetchResult: One result per job, in input order.
+        """
+        window = self.concurrency * 4
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            pending = deque()
+            for key, url, *extra_headers in jobs:
+                pending.append(pool.submit(self.fetch, url, key, *extra_headers, give_up_on=give_up_on))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
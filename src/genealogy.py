@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+
+class GenealogyGraph:
+    """
+    Parent -> child graph of thepeerage.com people in compressed sparse row (CSR) form.
+
+    People are numbered by their position in the sorted array `ids`; the children of
+    the person at position p are `indices[indptr[p]:indptr[p + 1]]`. Child IDs that
+    do not belong to any person in the table are kept aside as dangling edges, so they
+    can be reported rather than silently dropped. Descent is computed by expanding
+    a frontier of positions one generation at a time with array operations.
+
+    Parameters:
+        ids (np.ndarray): Sorted, unique person IDs.
+        indptr (np.ndarray): Offsets into `indices`, one more than the number of people.
+        indices (np.ndarray): Child positions, grouped by parent position.
+        dangling_parents (np.ndarray): Parent positions of edges to unknown IDs.
+        dangling_children (np.ndarray): The unknown child IDs of those edges.
+    """
+
+    def __init__(self, ids, indptr, indices, dangling_parents, dangling_children):
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.dangling_parents = dangling_parents
+        self.dangling_children = dangling_children
+
+    @staticmethod
+    def child_edges(child):
+        """
+        Splits the ';'-separated `child` column of the raw person table into edges.
+
+        Parameters:
+            child (pd.Series): Child IDs of each person, e.g. '10563;10564', indexed by
+                               person ID. Missing or empty values mean no children.
+
+        Returns:
+            tuple: (parent IDs, child IDs), two int64 arrays with one entry per edge.
+        """
+        edges = child.dropna().astype(str).str.split(';').explode()
+        edges = edges[edges != '']
+        return edges.index.to_numpy(dtype='int64'), edges.to_numpy(dtype='int64')
+
+    @classmethod
+    def from_child_column(cls, child):
+        """
+        Compiles the ';'-separated `child` column of the raw person table into a graph.
+
+        Parameters:
+            child (pd.Series): Child IDs of each person, e.g. '10563;10564', indexed by
+                               person ID. Missing or empty values mean no children.
+
+        Returns:
+            GenealogyGraph: The compiled graph.
+        """
+        return cls.from_edges(child.index.to_numpy(dtype='int64'), *cls.child_edges(child))
+
+    @classmethod
+    def from_edges(cls, ids, parent_ids, child_ids):
+        """
+        Compiles a graph from person IDs and parent -> child edges, e.g. collected from
+        the child column one chunk of the raw table at a time.
+
+        Parameters:
+            ids (np.ndarray): Person IDs (repeats allowed).
+            parent_ids (np.ndarray): Parent ID of each edge; must be among `ids`.
+            child_ids (np.ndarray): Child ID of each edge.
+
+        Returns:
+            GenealogyGraph: The compiled graph.
+        """
+        ids = np.unique(np.asarray(ids, dtype='int64'))
+        parents = np.searchsorted(ids, np.asarray(parent_ids, dtype='int64'))
+        children = np.asarray(child_ids, dtype='int64')
+
+        positions = np.searchsorted(ids, children)
+        found = positions < len(ids)
+        found[found] = ids[positions[found]] == children[found]
+        order = np.argsort(parents[found], kind='stable')
+        indices = positions[found][order]
+        indptr = np.zeros(len(ids) + 1, dtype='int64')
+        np.cumsum(np.bincount(parents[found], minlength=len(ids)), out=indptr[1:])
+        return cls(ids, indptr, indices, parents[~found], children[~found])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def n_edges(self):
+        return len(self.indices)
+
+    def positions(self, ids):
+        """
+        Returns the position of each ID, or -1 where the ID is not in the graph.
+        """
+        ids = np.asarray(ids, dtype='int64')
+        if not len(self.ids):
+            return np.full(len(ids), -1, dtype='int64')
+        positions = np.searchsorted(self.ids, ids)
+        clipped = np.minimum(positions, len(self.ids) - 1)
+        return np.where((positions < len(self.ids)) & (self.ids[clipped] == ids), clipped, -1)
+
+    def expand(self, frontier):
+        """
+        Steps one generation down from the given positions.
+
+        Parameters:
+            frontier (np.ndarray): Parent positions (repeats allowed).
+
+        Returns:
+            tuple: (origin, children, dangling) where children[i] is a child position of the
+                   parent frontier[origin[i]], and dangling holds the unknown child IDs
+                   referenced by the frontier.
+        """
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        origin = np.repeat(np.arange(len(frontier)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        children = self.indices[np.repeat(starts, counts) + offsets]
+        dangling = self.dangling_children[np.isin(self.dangling_parents, frontier)]
+        return origin, children, np.unique(dangling)
+
+    def generations(self, sources, depth):
+        """
+        Yields, for k = 1..depth, the people who are k-th generation descendants of any
+        source, and the unknown IDs named as children by the (k-1)-th generation.
+
+        Parameters:
+            sources (np.ndarray): Positions of the people to descend from.
+            depth (int): Number of generations to follow.
+
+        Yields:
+            tuple: (generation, descendant positions, dangling child IDs).
+        """
+        frontier = np.unique(sources)
+        for generation in range(1, depth + 1):
+            _, children, dangling = self.expand(frontier)
+            frontier = np.unique(children)
+            yield generation, frontier, dangling
+
+    def descent_flags(self, sources, depth=2):
+        """
+        Returns a (len(self), depth) int8 array whose column k-1 is 1 for the k-th
+        generation descendants of the sources, and the dangling IDs of each generation.
+        """
+        flags = np.zeros((len(self), depth), dtype='int8')
+        dangling = []
+        for generation, descendants, missing in self.generations(sources, depth):
+            flags[descendants, generation - 1] = 1
+            dangling.append(missing)
+        return flags, dangling
+
+    def inherited_labels(self, sources, labels, generation):
+        """
+        Collects, for each person, the labels of the sources they are a `generation`-th
+        descendant of, e.g. the peerage types of a person's parents or grandparents.
+
+        Parameters:
+            sources (np.ndarray): Positions of the labelled people.
+            labels (array-like): One label per source.
+            generation (int): 1 for children, 2 for grandchildren, and so on.
+
+        Returns:
+            np.ndarray: Per person, the sorted unique labels joined with ';', or ''.
+        """
+        labels = pd.Categorical(np.asarray(labels))
+        codes = labels.codes.astype('int64')
+        nodes = np.asarray(sources, dtype='int64')
+        for _ in range(generation):
+            origin, nodes, _ = self.expand(nodes)
+            codes = codes[origin]
+            pairs = np.unique(np.stack([nodes, codes], axis=1), axis=0)
+            nodes, codes = pairs[:, 0], pairs[:, 1]
+
+        joined = np.full(len(self), '', dtype=object)
+        if len(nodes):
+            text = np.asarray(labels.categories, dtype=object)[codes]
+            order = np.lexsort((text, nodes))
+            inherited = pd.Series(text[order]).groupby(nodes[order], sort=False).agg(';'.join)
+            joined[inherited.index.to_numpy()] = inherited.to_numpy()
+        return joined
@@ -0,0 +1,179 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from names import split_forenames_surname
+from date_parsing import build_datetimes, iso_dates
+
+# --- Global Constants ---
+FLATFILE_ENCODING = 'Windows-1252'
+# Rows repeating these are the same person entered twice; the first row is kept.
+DUPLICATE_KEYS = ['Surname', 'First Names', 'B Day', 'B Month', 'B Year']
+# Royal styles anywhere in 'Parent', or a peerage abbreviation right after a digit
+# (e.g. 'Fordcav 2B', '3Ms').
+PARENT_PEERAGE_PATTERN = r'''(?ix)                  # i → ignore case, x → free-spacing
+        (?:\bKing\b|\bQueen\b)       # royal styles (anywhere in the string)
+    |                                # – OR –
+        (?<=\d)                      # only immediately after a digit …
+        (?:Bs|Ds|Ms|Vs|Cs|B|D|M|V|E) # … the peerage abbreviations
+'''
+# Peerage abbreviations (upper-cased) and their full styles.
+PEERAGE_CODES = {
+    "D":  "duke",        "DS": "duke",
+    "M":  "marquess",    "MS": "marquess",
+    "E":  "earl",        "CS": "earl",
+    "V":  "viscount",    "VS": "viscount",
+    "B":  "baron",       "BS": "baroness",
+}
+# Two-letter codes are tried before their one-letter prefixes.
+PEERAGE_CODE_PATTERN = re.compile(rf"\b({'|'.join(sorted(PEERAGE_CODES, key=len, reverse=True))})\b", flags=re.I)
+# peersflatfile.tab columns and their names in peers.csv, in output order.
+OUTPUT_COLUMNS = {
+    'Full_Name': 'Full_Name_h',
+    'First Forename': 'First Forename_h',
+    'Last Surname': 'Last Surname_h',
+    'peers_Sex': 'Gender_h',
+    'B Day': 'born_day_h',
+    'B Month': 'born_month_h',
+    'B Year': 'born_year_h',
+    'B Acc': 'born_accuracy_h',
+    'D Day': 'died_day_h',
+    'D Month': 'died_month_h',
+    'D Year': 'died_year_h',
+    'D Acc': 'died_accuracy_h',
+    'born_datetime': 'born_datetime_h',
+    'died_datetime': 'died_datetime_h',
+    'Extracted Parental Peerage': 'Extracted Parental Peerage_h',
+}
+# gender_guesser answers and the peers_Sex code they fill in; 'andy' (androgynous) and
+# 'unknown' leave the gender missing.
+GUESSED_GENDERS = {'male': 'M', 'mostly_male': 'M', 'female': 'F', 'mostly_female': 'F'}
+
+
+# --- Reading ---
+def read_flatfile(path):
+    """
+    Reads Hollingsworth's peersflatfile.tab.
+    """
+    return pd.read_csv(path, sep='\t', encoding=FLATFILE_ENCODING, low_memory=False)
+
+
+# --- Parental Peerage ---
+def _peerages(parents):
+    extracted = parents.str.findall(PARENT_PEERAGE_PATTERN).str.join(';')
+    single = extracted.isin(['d', 'e', 'v'])
+    extracted[single] = extracted[single].str.upper()
+    extracted = extracted.str.replace(PEERAGE_CODE_PATTERN, lambda m: PEERAGE_CODES[m.group(0).upper()], regex=True)
+    return extracted.replace('', np.nan)
+
+
+def extract_parental_peerage(parent):
+    """
+    The styles of the parent's peerages, e.g. 'Fordcav 2B' -> 'baron' and 'King' ->
+    'King', ';'-joined; NaN where the 'Parent' column names none. Each distinct
+    'Parent' value is processed once.
+
+    Parameters:
+        parent (pd.Series): The 'Parent' column of peersflatfile.tab.
+
+    Returns:
+        pd.Series: Indexed like `parent`.
+    """
+    codes, uniques = pd.factorize(parent)
+    extracted = _peerages(pd.Series(uniques, dtype=object)).reindex(codes)
+    extracted.index = parent.index
+    return extracted
+
+
+# --- Dates ---
+def historic_datetimes(day, month, year):
+    """
+    Builds datetimes from the integer (float, with NaN) day, month and year columns with
+    array arithmetic. Missing or zero components, days that do not exist and years
+    outside 1..9999 give NaT. The result is datetime64[us], so dates before 1678 (the
+    limit of pandas' default nanoseconds) are kept.
+
+    Returns:
+        pd.Series: datetime64[us], indexed like `day`.
+    """
+    return build_datetimes(year, month, day)[0]
+
+
+def datetime_strings(datetimes):
+    """
+    Formats datetimes as the notebook's column of datetime.datetime objects was written
+    to peers.csv (see iso_dates), with NaN for NaT.
+    """
+    strings = iso_dates(datetimes)
+    strings[strings == ''] = np.nan
+    return pd.Series(strings, index=datetimes.index)
+
+
+# --- Gender ---
+class GenderLookup:
+    """
+    Classifies first names with gender_guesser once per distinct name, keeping every
+    answer in a table that later calls (and later files) reuse.
+
+    Parameters:
+        detector (object or None): Anything with a get_gender(name) method; a
+                                   case-insensitive gender_guesser Detector if None.
+    """
+
+    def __init__(self, detector=None):
+        if detector is None:
+            from gender_guesser.detector import Detector
+            detector = Detector(case_sensitive=False)
+        self.detector = detector
+        self.table = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    def __call__(self, names):
+        """
+        Returns the gender_guesser answer ('male', 'mostly_female', 'unknown', ...) for each
+        name, NaN for missing names.
+
+        Parameters:
+            names (pd.Series): First names.
+
+        Returns:
+            pd.Series: Indexed like `names`.
+        """
+        codes, uniques = pd.factorize(names)
+        for name in uniques:
+            if name not in self.table:
+                self.table[name] = self.detector.get_gender(name)
+        answers = pd.Series([self.table[name] for name in uniques], dtype=object).reindex(codes)
+        answers.index = names.index
+        return answers
+
+
+# --- Wrangling ---
+def wrangle_peers(flatfile, gender_lookup=None):
+    """
+    Wrangles peersflatfile.tab into the table written to peers.csv: duplicates dropped,
+    parental peerage extracted, dates built and name keys split off, with the '_h'
+    columns 4_matching.ipynb reads.
+
+    Parameters:
+        flatfile (pd.DataFrame): As read by read_flatfile.
+        gender_lookup (GenderLookup or None): If given, people whose peers_Sex is missing
+                                              get the gender guessed from their first forename.
+
+    Returns:
+        pd.DataFrame: One row per person, indexed by their row in the flat file.
+    """
+    peers = flatfile.drop_duplicates(subset=DUPLICATE_KEYS).copy()
+    peers['Extracted Parental Peerage'] = extract_parental_peerage(peers['Parent'])
+    peers['born_datetime'] = historic_datetimes(peers['B Day'], peers['B Month'], peers['B Year'])
+    peers['died_datetime'] = historic_datetimes(peers['D Day'], peers['D Month'], peers['D Year'])
+    keys = split_forenames_surname(peers['First Names'], peers['Surname'])
+    peers[list(keys.columns)] = keys
+    if gender_lookup is not None:
+        missing = peers['peers_Sex'].isnull()
+        peers.loc[missing, 'peers_Sex'] = gender_lookup(peers.loc[missing, 'First Forename']).map(GUESSED_GENDERS)
+    return peers[list(OUTPUT_COLUMNS)].rename(columns=OUTPUT_COLUMNS)
+
@@ -0,0 +1,511 @@
+import os
+import json
+import shutil
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from table_io import read_table
+from blocking import BlockingIndex, add_blocking_keys, DEFAULT_PASSES, BIN_TOLERANCE
+from scoring import score_candidates
+from matching import assign_matches
+import metrics
+from metrics import Laps
+
+# --- Global Constants ---
+FORMAT_VERSION = 1
+META_FILE = 'linkage.json'
+KEYS = ['h_id', 'l_id']   # Hollingsworth row in peers.csv, and thepeerage ID.
+SCORE_COLUMNS = ['forename_score', 'surname_score', 'year_score', 'died_year_score']
+# Composite weight (ALPHA, BETA, GAMMA) and score thresholds of 4_matching.ipynb.
+WEIGHTS = {'forename_score': 0.2, 'surname_score': 0.4, 'year_score': 0.4}
+THRESHOLDS = {'forename_score': 0.75, 'surname_score': 0.75, 'year_score': 0.65}
+# The same, named as in the parameters cell of 4_matching.ipynb.
+MATCH_PARAMETERS = {
+    'ALPHA': WEIGHTS['forename_score'], 'BETA': WEIGHTS['surname_score'], 'GAMMA': WEIGHTS['year_score'],
+    'FORENAME_THRESHOLD': THRESHOLDS['forename_score'], 'SURNAME_THRESHOLD': THRESHOLDS['surname_score'],
+    'YEAR_THRESHOLD': THRESHOLDS['year_score'],
+}
+# Columns of the wrangled tables renamed as in step 0 of 4_matching.ipynb.
+H_COLUMNS = {'First Forename_h': 'forename', 'Last Surname_h': 'surname', 'born_year_h': 'born_year',
+             'died_year_h': 'died_year', 'Extracted Parental Peerage_h': 'Extracted Parental Peerage_h'}
+L_COLUMNS = {'First Forename_l': 'forename', 'Last Surname_l': 'surname', 'born_year_l': 'born_year',
+             'died_year_l': 'died_year', 'Extracted Parental Peerage_l': 'Extracted Parental Peerage_l'}
+PARENTAL_PEERAGE = {'h': 'Extracted Parental Peerage_h', 'l': 'Extracted Parental Peerage_l'}
+# A record is re-linked when any of these changes; everything blocking and scoring read
+# is derived from them.
+FINGERPRINT_COLUMNS = ['forename', 'surname', 'born_year', 'died_year', 'parental_peerage']
+PEERS_PATH = '../data/hollingsworth/wrangled/peers.csv'
+PEERAGE_PATH = '../data/thepeerage/wrangled/wrangled_peerage'
+MATCHED_DIR = '../data/matched'
+MATCHED_FILE = 'matched_hollingsworth_and_lundy.csv'
+DIFF_FILE = 'match_diff.csv'
+LINKAGE_DIR = 'linkage'   # The linkage saved alongside each matched table.
+
+
+# --- Preparation ---
+def prepare_table(df, side):
+    """
+    Steps 0 and 1 of 4_matching.ipynb for one wrangled table, keeping its index: the name
+    and year columns renamed, decade bins and blocking keys added.
+
+    Parameters:
+        df (pd.DataFrame): peers.csv indexed by its first column, or the wrangled peerage
+                           indexed by ID.
+        side (str): 'h' or 'l'.
+
+    Returns:
+        pd.DataFrame: The columns blocking and scoring read, indexed like `df`.
+    """
+    columns = H_COLUMNS if side == 'h' else L_COLUMNS
+    table = df[list(columns)].rename(columns=columns)
+    table['year_bin'] = (table['born_year'] // 10).astype('Int64')
+    table['died_year_bin'] = (table['died_year'] // 10).astype('Int64')
+    add_blocking_keys(table, PARENTAL_PEERAGE[side])
+    return table
+
+
+def load_tables(peers_path=PEERS_PATH, peerage_path=PEERAGE_PATH):
+    """
+    Reads peers.csv and the wrangled peerage and prepares both for linking.
+
+    Returns:
+        tuple: (h, l), indexed by h_id (row of peers.csv) and l_id (thepeerage ID).
+    """
+    df_h = pd.read_csv(peers_path, low_memory=False, index_col=0)
+    df_l = read_table(peerage_path, columns=['ID'] + list(L_COLUMNS), nullable=False, index_col='ID', low_memory=False)
+    if 'ID' in df_l.columns:
+        df_l = df_l.set_index('ID')
+    h, l = prepare_table(df_h, 'h'), prepare_table(df_l, 'l')
+    h.index.name, l.index.name = KEYS
+    return h, l
+
+
+def fingerprints(table):
+    """
+    64-bit hash of each record's FINGERPRINT_COLUMNS.
+
+    Returns:
+        pd.Series: uint64, indexed like `table`.
+    """
+    frame = pd.DataFrame({name: table[name].astype(object) if name not in ('born_year', 'died_year')
+                          else table[name].to_numpy(dtype='float64', na_value=np.nan)
+                          for name in FINGERPRINT_COLUMNS})
+    return pd.Series(pd.util.hash_pandas_object(frame, index=False).to_numpy(), index=table.index)
+
+
+# --- Weighting ---
+def passes_thresholds(features, thresholds=THRESHOLDS):
+    """
+    Whether each scored pair exceeds every threshold, as step 4 of 4_matching.ipynb keeps it.
+
+    Returns:
+        np.ndarray: One boolean per row of `features`.
+    """
+    return np.logical_and.reduce([features[name] > threshold for name, threshold in thresholds.items()])
+
+
+def composite_weight(features, weights=WEIGHTS):
+    """
+    The weighted sum of the scores, as step 5 of 4_matching.ipynb computes it.
+
+    Returns:
+        pd.Series: Indexed like `features`.
+    """
+    weight = 0
+    for name, factor in weights.items():
+        weight = weight + factor * features[name]
+    return weight
+
+
+# --- Linkage ---
+def _pairs(frame):
+    return pd.MultiIndex.from_frame(frame[KEYS])
+
+
+def _sorted(frame):
+    return frame.sort_values(KEYS, kind='stable').reset_index(drop=True)
+
+
+class Linkage:
+    """
+    The result of linking Hollingsworth to thepeerage, kept so that a later run only has
+    to redo the records that changed.
+
+    Everything is keyed by stable IDs rather than row positions: h_id is the record's
+    row in peers.csv and l_id its thepeerage ID. A linkage holds
+
+    - `candidates`: every (h_id, l_id) pair the blocking passes produced, in no particular order;
+    - `features`: the scores and composite weight of the candidates that pass the thresholds;
+    - `matches`: the one-to-one assignment, with match_weight and the scores;
+    - `h_records`, `l_records`: a fingerprint of each linked record's matching columns,
+      from which `update` finds the records added, changed or removed since;
+    - `params`: the weights, thresholds and blocking passes it was built with.
+
+    Saved as a directory of Parquet files described by linkage.json.
+
+    Parameters:
+        params (dict): As built by Linkage.build.
+        h_records, l_records (pd.Series): Fingerprints, indexed by h_id and l_id.
+        candidates (pd.DataFrame): h_id and l_id.
+        features (pd.DataFrame): h_id, l_id, SCORE_COLUMNS and weight.
+        matches (pd.DataFrame): h_id, l_id, match_weight and SCORE_COLUMNS.
+    """
+
+    def __init__(self, params, h_records, l_records, candidates, features, matches):
+        self.params = params
+        self.h_records = h_records
+        self.l_records = l_records
+        self.candidates = candidates
+        self.features = features
+        self.matches = matches
+        self.report = {}
+
+    def __len__(self):
+        return len(self.matches)
+
+    # --- Linking ---
+    def indexer(self):
+        """
+        A BlockingIndex with the linkage's passes.
+        """
+        return BlockingIndex(passes=self.params['passes'], tolerance=self.params['tolerance'],
+                             max_block_pairs=self.params['max_block_pairs'])
+
+    def passes_thresholds(self, features):
+        return passes_thresholds(features, self.params['thresholds'])
+
+    def weight(self, features):
+        return composite_weight(features, self.params['weights'])
+
+    def _score(self, candidates, h, l, workers):
+        features = score_candidates(candidates, h, l, workers=workers, keep=self.passes_thresholds)
+        features['weight'] = self.weight(features)
+        return features[SCORE_COLUMNS + ['weight']].reset_index()
+
+    def _assign(self, features, workers):
+        weights = features.set_index(KEYS)['weight']
+        matches = assign_matches(weights, workers=workers).rename(columns={'h_index': 'h_id', 'l_index': 'l_id'})
+        return matches.merge(features[KEYS + SCORE_COLUMNS], on=KEYS, how='left')
+
+    @classmethod
+    def build(cls, h, l, weights=WEIGHTS, thresholds=THRESHOLDS, passes=DEFAULT_PASSES, tolerance=BIN_TOLERANCE,
+              max_block_pairs=None, workers=1):
+        """
+        Links the two tables from scratch, as steps 2 to 5 of 4_matching.ipynb do.
+
+        Parameters:
+            h, l (pd.DataFrame): Prepared tables (see prepare_table), indexed by h_id and l_id.
+            weights (dict): Score column -> factor in the composite weight.
+            thresholds (dict): Score column -> value a kept pair must exceed.
+            passes, tolerance, max_block_pairs: As for BlockingIndex.
+            workers (int): Processes for scoring and assignment.
+
+        Returns:
+            Linkage: The new linkage.
+        """
+        params = {'weights': dict(weights), 'thresholds': dict(thresholds), 'passes': [list(keys) for keys in passes],
+                  'tolerance': dict(tolerance), 'max_block_pairs': max_block_pairs}
+        linkage = cls(params, fingerprints(h), fingerprints(l), None, None, None)
+        indexer = linkage.indexer()
+        candidates = indexer.index(h.rename_axis('h_id'), l.rename_axis('l_id'))
+        features = linkage._score(candidates, h.rename_axis('h_id'), l.rename_axis('l_id'), workers)
+        linkage.candidates = candidates.to_frame(index=False)
+        linkage.features = _sorted(features)
+        linkage.matches = _sorted(linkage._assign(linkage.features, workers))
+        linkage.report = {'candidates': len(candidates), 'features': len(features), 'matches': len(linkage.matches),
+                          'blocking': indexer.report}
+        return linkage
+
+    @classmethod
+    def from_positions(cls, h, l, indexer, candidates, features, matches, h_ids, l_ids, weights=WEIGHTS,
+                       thresholds=THRESHOLDS):
+        """
+        A linkage from the frames of 4_matching.ipynb, whose h_index and l_index are row
+        positions, relabelled with the stable IDs.
+
+        Parameters:
+            h, l (pd.DataFrame): df_h2i and df_l2i.
+            indexer (BlockingIndex): The indexer that produced `candidates`.
+            candidates (pd.MultiIndex): candidate_index.
+            features (pd.DataFrame): The thresholded features, with a 'weight' column.
+            matches (pd.DataFrame): matches_df (h_index, l_index, match_weight, ...).
+            h_ids, l_ids (array-like): The ID of each position: df_h's index and df_l['ID'].
+            weights, thresholds (dict): Those the notebook used.
+
+        Returns:
+            Linkage: The linkage.
+        """
+        h_ids, l_ids = np.asarray(h_ids), np.asarray(l_ids)
+
+        def relabel(h_index, l_index):
+            return {'h_id': h_ids[np.asarray(h_index, dtype='int64')], 'l_id': l_ids[np.asarray(l_index, dtype='int64')]}
+
+        params = {'weights': dict(weights), 'thresholds': dict(thresholds),
+                  'passes': [list(keys) for keys in indexer.passes], 'tolerance': dict(indexer.tolerance),
+                  'max_block_pairs': indexer.max_block_pairs}
+        h_records = fingerprints(h.set_axis(pd.Index(h_ids[h.index], name='h_id')))
+        l_records = fingerprints(l.set_axis(pd.Index(l_ids[l.index], name='l_id')))
+        candidates = pd.DataFrame(relabel(candidates.get_level_values(0), candidates.get_level_values(1)))
+        features = pd.DataFrame({**relabel(features.index.get_level_values(0), features.index.get_level_values(1)),
+                                 **{name: features[name].to_numpy() for name in SCORE_COLUMNS + ['weight']}})
+        matches = pd.DataFrame({**relabel(matches['h_index'], matches['l_index']),
+                                'match_weight': matches['match_weight'].to_numpy()})
+        matches = matches.merge(features[KEYS + SCORE_COLUMNS], on=KEYS, how='left')
+        return cls(params, h_records, l_records, candidates, _sorted(features), _sorted(matches))
+
+    def dirty(self, h, l, changed_h=(), changed_l=()):
+        """
+        The records to re-link: added, removed or with a changed fingerprint since the
+        linkage was built, plus any named explicitly.
+
+        Returns:
+            tuple: (h_ids, l_ids) as pd.Index.
+        """
+        found = []
+        for records, table, changed in [(self.h_records, h, changed_h), (self.l_records, l, changed_l)]:
+            current = fingerprints(table)
+            both = current.index.intersection(records.index)
+            differ = both[current.loc[both].to_numpy() != records.loc[both].to_numpy()]
+            added = current.index.difference(records.index)
+            removed = records.index.difference(current.index)
+            dirty = differ.union(added).union(removed)
+            found.append(dirty.union(pd.Index(list(changed), dtype=dirty.dtype)) if len(changed) else dirty)
+        return tuple(found)
+
+    def update(self, h, l, changed_h=(), changed_l=(), workers=1):
+        """
+        Brings the linkage up to date with new versions of the tables, redoing only what
+        the dirty records (see `dirty`) can affect:
+
+        - their candidate pairs are dropped, and they are blocked afresh against the
+          whole of the other table;
+        - only those new candidates are scored;
+        - the assignment is re-solved only in the connected components of the candidate
+          graph that gained or lost a pair or a record; the matches of every other
+          component are kept, since a matching never links two components.
+
+        The result has the same candidates and scores as Linkage.build on the new tables,
+        and the same total match weight; where several matchings tie, the pairs chosen
+        may differ. With max_block_pairs, a block is judged by the pairs it has in the
+        re-blocked subset, so oversized blocks may be kept that a full build skips.
+
+        Parameters:
+            h, l (pd.DataFrame): The new prepared tables, indexed by h_id and l_id.
+            changed_h, changed_l (iterable): IDs to re-link whether or not their
+                                             fingerprint changed, e.g. from a recrawl.
+            workers (int): Processes for scoring and assignment.
+
+        Returns:
+            tuple: (the updated Linkage, the diff of its matches against these, as from diff_matches).
+        """
+        h, l = h.rename_axis('h_id'), l.rename_axis('l_id')
+        dirty_h, dirty_l = self.dirty(h, l, changed_h, changed_l)
+
+        stale = self.candidates['h_id'].isin(dirty_h) | self.candidates['l_id'].isin(dirty_l)
+        indexer = self.indexer()
+        fresh = indexer.index(h.loc[h.index.intersection(dirty_h)], l).append(
+            indexer.index(h, l.loc[l.index.intersection(dirty_l)])).unique().set_names(KEYS)
+        candidates = pd.concat([self.candidates[~stale], fresh.to_frame(index=False)[KEYS]], ignore_index=True)
+
+        stale_features = self.features['h_id'].isin(dirty_h) | self.features['l_id'].isin(dirty_l)
+        scored = self._score(fresh, h, l, workers)
+        features = pd.concat([self.features[~stale_features], scored], ignore_index=True)
+
+        # Components touching a dirty record, or a pair that was dropped or added.
+        seeds_h = dirty_h.union(pd.Index(self.features.loc[stale_features, 'h_id'])).union(pd.Index(scored['h_id']))
+        seeds_l = dirty_l.union(pd.Index(self.features.loc[stale_features, 'l_id'])).union(pd.Index(scored['l_id']))
+        h_codes, h_ids = pd.factorize(features['h_id'])
+        l_codes, l_ids = pd.factorize(features['l_id'])
+        n_h = len(h_ids)
+        graph = coo_matrix((np.ones(len(features)), (h_codes, n_h + l_codes)), shape=(n_h + len(l_ids),) * 2)
+        n_components, labels = connected_components(graph, directed=False)
+        touched = np.zeros(n_components, dtype=bool)
+        touched[labels[:n_h][h_ids.isin(seeds_h)]] = True
+        touched[labels[n_h:][l_ids.isin(seeds_l)]] = True
+        resolve = touched[labels[h_codes]]
+
+        affected_h = dirty_h.union(pd.Index(h_ids[touched[labels[:n_h]]]))
+        affected_l = dirty_l.union(pd.Index(l_ids[touched[labels[n_h:]]]))
+        kept = self.matches[~self.matches['h_id'].isin(affected_h) & ~self.matches['l_id'].isin(affected_l)]
+        solved = self._assign(features[resolve], workers)
+        matches = _sorted(pd.concat([kept, solved], ignore_index=True))
+
+        linkage = Linkage(self.params, fingerprints(h), fingerprints(l), candidates, _sorted(features), matches)
+        linkage.report = {
+            'dirty_h': len(dirty_h), 'dirty_l': len(dirty_l),
+            'candidates_dropped': int(stale.sum()), 'candidates_added': len(fresh),
+            'features_dropped': int(stale_features.sum()), 'features_added': len(scored),
+            'components': int(n_components), 'components_resolved': int(touched.sum()),
+            'pairs_resolved': int(resolve.sum()), 'matches_kept': len(kept), 'matches': len(matches),
+        }
+        return linkage, diff_matches(self.matches, matches)
+
+    # --- Saving ---
+    def save(self, path):
+        """
+        Writes the linkage to a directory, replacing any linkage there.
+        """
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        self.h_records.rename('fingerprint').reset_index().to_parquet(os.path.join(tmp_path, 'h_records.parquet'))
+        self.l_records.rename('fingerprint').reset_index().to_parquet(os.path.join(tmp_path, 'l_records.parquet'))
+        for name in ['candidates', 'features', 'matches']:
+            getattr(self, name).to_parquet(os.path.join(tmp_path, f'{name}.parquet'), index=False)
+        meta = {'version': FORMAT_VERSION, 'created': datetime.now().isoformat(timespec='seconds'),
+                'params': self.params, 'h_records': len(self.h_records), 'l_records': len(self.l_records),
+                'candidates': len(self.candidates), 'features': len(self.features), 'matches': len(self.matches)}
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=1)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a linkage written by Linkage.save.
+        """
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"{path} has linkage format {meta['version']}, expected {FORMAT_VERSION}")
+        records = [pd.read_parquet(os.path.join(path, f'{side}_records.parquet')).set_index(key)['fingerprint']
+                   for side, key in zip('hl', KEYS)]
+        frames = [pd.read_parquet(os.path.join(path, f'{name}.parquet')) for name in ['candidates', 'features', 'matches']]
+        return cls(meta['params'], *records, *frames)
+
+
+# --- Results ---
+def diff_matches(old, new):
+    """
+    The pairs matched in only one of two match tables, or matched in both with a
+    different weight.
+
+    Returns:
+        pd.DataFrame: h_id, l_id, match_weight_old, match_weight_new and 'change'
+                      ('added', 'removed' or 'reweighted'), ordered by h_id.
+    """
+    merged = old[KEYS + ['match_weight']].merge(new[KEYS + ['match_weight']], on=KEYS, how='outer',
+                                                suffixes=('_old', '_new'), indicator=True)
+    change = pd.Series(np.select([merged['_merge'] == 'right_only', merged['_merge'] == 'left_only',
+                                  merged['match_weight_old'] != merged['match_weight_new']],
+                                 ['added', 'removed', 'reweighted'], ''), index=merged.index)
+    diff = merged.drop(columns='_merge').assign(change=change)
+    return _sorted(diff[diff['change'] != ''])
+
+
+def match_table(matches, df_h, df_l):
+    """
+    The matched pairs joined with both wrangled tables, followed by the unmatched records
+    of each, as 4_matching.ipynb writes matched_hollingsworth_and_lundy.csv.
+
+    Parameters:
+        matches (pd.DataFrame): A linkage's matches.
+        df_h (pd.DataFrame): peers.csv, indexed by h_id.
+        df_l (pd.DataFrame): The wrangled peerage, indexed by ID.
+
+    Returns:
+        pd.DataFrame: One row per matched pair or unmatched record.
+    """
+    df_h, df_l = df_h.rename_axis('h_id').reset_index(), df_l.rename_axis('l_id').reset_index()
+    matched = matches.merge(df_h, on='h_id', how='left').merge(df_l, on='l_id', how='left', suffixes=('_h', '_l'))
+    unmatched_h = df_h[~df_h['h_id'].isin(matches['h_id'])]
+    unmatched_l = df_l[~df_l['l_id'].isin(matches['l_id'])]
+    frames = [frame.dropna(axis=1, how='all') for frame in (matched, unmatched_h, unmatched_l)]
+    table = pd.concat(frames, ignore_index=True, sort=False).reindex(columns=matched.columns)
+    return table.astype({key: 'Int64' for key in KEYS})
+
+
+# --- Main ---
+def _read_ids(path):
+    """
+    IDs listed one per line in a file (blank lines ignored).
+    """
+    if path is None:
+        return []
+    with open(path) as f:
+        return [int(line) for line in f if line.strip()]
+
+
+def _output_dir(output):
+    path = output or os.path.join(MATCHED_DIR, datetime.now().strftime("%H%M_%d%m%Y"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def main_build(output=None, workers=1):
+    """
+    Links peers.csv to the wrangled peerage from scratch and saves the linkage and the
+    match table in `output` (a new timestamped folder in ../data/matched by default).
+    """
+    laps = Laps('link')
+    h, l = load_tables()
+    laps.lap('load', rows_out=len(h) + len(l))
+    linkage = Linkage.build(h, l, workers=workers)
+    laps.lap('build', rows_in=len(h) + len(l), rows_out=len(linkage), candidates=len(linkage.candidates))
+    output = _output_dir(output)
+    linkage.save(os.path.join(output, LINKAGE_DIR))
+    table = match_table(linkage.matches, pd.read_csv(PEERS_PATH, low_memory=False, index_col=0),
+                        read_table(PEERAGE_PATH, nullable=False, index_col='ID', low_memory=False))
+    table.to_csv(os.path.join(output, MATCHED_FILE))
+    laps.lap('save', rows_out=len(table))
+    laps.close()
+    print(f"{len(linkage)} matches from {len(linkage.candidates)} candidate pairs, saved to {output}")
+
+
+def main_update(linkage_path, output=None, changed_h=(), changed_l=(), workers=1):
+    """
+    Re-links the records of peers.csv and the wrangled peerage that changed since the
+    linkage at `linkage_path` was saved, and writes the updated linkage, match table and
+    the diff of the matches to `output`.
+    """
+    laps = Laps('relink')
+    linkage = Linkage.load(linkage_path)
+    h, l = load_tables()
+    laps.lap('load', rows_out=len(h) + len(l))
+    updated, diff = linkage.update(h, l, changed_h, changed_l, workers=workers)
+    laps.lap('update', rows_in=updated.report['dirty_h'] + updated.report['dirty_l'], rows_out=len(diff),
+             **updated.report)
+    output = _output_dir(output)
+    updated.save(os.path.join(output, LINKAGE_DIR))
+    table = match_table(updated.matches, pd.read_csv(PEERS_PATH, low_memory=False, index_col=0),
+                        read_table(PEERAGE_PATH, nullable=False, index_col='ID', low_memory=False))
+    table.to_csv(os.path.join(output, MATCHED_FILE))
+    diff.to_csv(os.path.join(output, DIFF_FILE), index=False)
+    laps.lap('save', rows_out=len(table))
+    laps.close()
+    print(updated.report)
+    print(f"{len(diff)} matched pairs added, removed or reweighted; saved to {output}")
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Link Hollingsworth to thepeerage, or re-link only the records "
+                                                    "changed since a saved linkage.")
+    subparsers = argparser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Link from scratch and save the linkage.")
+    update = subparsers.add_parser('update', help="Re-link the records changed since a saved linkage.")
+    update.add_argument('linkage', help=f"A saved linkage, e.g. {MATCHED_DIR}/<HHMM_ddmmYYYY>/{LINKAGE_DIR}.")
+    update.add_argument('--changed-h', default=None,
+                        help="File of peers.csv rows (one per line) to re-link even if unchanged.")
+    update.add_argument('--changed-l', default=None,
+                        help="File of thepeerage IDs (one per line) to re-link even if unchanged.")
+    for subparser in (build, update):
+        subparser.add_argument('--output', default=None,
+                               help=f"Folder to write to (default: a new timestamped folder in {MATCHED_DIR}).")
+        subparser.add_argument('--workers', type=int, default=1, help="Processes for scoring and assignment.")
+        subparser.add_argument('--metrics', default=None,
+                               help=f"Append per-stage metrics to this JSON-lines file (default: ${metrics.METRICS_ENV}, if set).")
+        subparser.add_argument('--profile', default=None,
+                               help=f"Dump a cProfile of each stage into this directory (default: ${metrics.PROFILE_ENV}).")
+    args = argparser.parse_args()
+    metrics.configure(args.metrics, args.profile)
+    if args.command == 'build':
+        main_build(output=args.output, workers=args.workers)
+    else:
+        main_update(args.linkage, output=args.output, changed_h=_read_ids(args.changed_h),
+                    changed_l=_read_ids(args.changed_l), workers=args.workers)
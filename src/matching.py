@@ -0,0 +1,142 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components, min_weight_full_bipartite_matching
+
+# --- Defaults ---
+COMPONENT_BATCH_EDGES = 50000   # Candidate pairs per batch of components sent to a worker.
+DENSE_COMPONENT_CELLS = 4000000  # Larger components are solved without a dense matrix.
+MATCH_COLUMNS = ['h_index', 'l_index', 'match_weight']
+
+
+# --- Sparse Engine ---
+def _solve_components(components):
+    """
+    Solves each component's assignment on its own small dense matrix; runs in a worker
+    process when assign_matches is given several workers.
+
+    Parameters:
+        components (list): (edge ids, h codes, l codes, weights) arrays, one per component.
+
+    Returns:
+        np.ndarray: Edge ids of the matched pairs.
+    """
+    solved = []
+    for edges, h, l, w in components:
+        h_local, h_codes = pd.factorize(h)
+        l_local, l_codes = pd.factorize(l)
+        if len(h_codes) * len(l_codes) > DENSE_COMPONENT_CELLS:
+            solved.append(edges[_sparse_assignment(h_local, l_local, w, len(h_codes), len(l_codes))])
+            continue
+        C = np.zeros((len(h_codes), len(l_codes)))
+        C[h_local, l_local] = -w
+        E = np.full(C.shape, -1)
+        E[h_local, l_local] = edges
+        rows, cols = linear_sum_assignment(C)
+        keep = C[rows, cols] < 0
+        solved.append(E[rows[keep], cols[keep]])
+    return np.concatenate(solved) if solved else np.zeros(0, dtype='int64')
+
+
+def _sparse_assignment(h, l, w, n_h, n_l):
+    """
+    Maximum-weight matching of one large component with a sparse solver. Each h record
+    gets a dummy partner standing for "unmatched", and likewise each l record, with
+    mirrored edges between the dummies, so that a full matching of the doubled graph
+    always exists and its cheapest one picks the heaviest real pairs.
+
+    Returns:
+        np.ndarray: Positions in (h, l, w) of the matched pairs.
+    """
+    n_edges = len(w)
+    shift = 1 + w.max()
+    # Rows: h records, then l dummies. Columns: l records, then h dummies.
+    rows = np.concatenate([h, np.arange(n_h), n_h + np.arange(n_l), n_h + l])
+    cols = np.concatenate([l, n_l + np.arange(n_h), np.arange(n_l), n_l + h])
+    costs = np.concatenate([shift - w, np.full(n_h + n_l + n_edges, shift)])
+    graph = csr_matrix((costs, (rows, cols)), shape=(n_h + n_l, n_l + n_h))
+    row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+    real = (row_ind < n_h) & (col_ind < n_l)
+    pair = pd.Series(np.arange(n_edges), index=pd.MultiIndex.from_arrays([h, l]))
+    return pair.loc[list(zip(row_ind[real], col_ind[real]))].to_numpy()
+
+
+def _batches(components, max_edges):
+    """
+    Groups components into lists of roughly max_edges candidate pairs.
+    """
+    batch, edges = [], 0
+    for component in components:
+        batch.append(component)
+        edges += len(component[0])
+        if edges >= max_edges:
+            yield batch
+            batch, edges = [], 0
+    if batch:
+        yield batch
+
+
+def assign_matches(weights, workers=1, batch_edges=COMPONENT_BATCH_EDGES):
+    """
+    One-to-one matching of maximum total weight over the candidate pairs, without
+    a dense matrix over all records.
+
+    The candidate pairs form a bipartite graph between h and l records. A matching
+    never links two connected components, so each component is solved on its own:
+    components with a single record on one side by taking their best pair, the rest
+    with linear_sum_assignment on a matrix the size of the component (or a sparse
+    solver for very large ones), optionally in a process pool. The total weight is the
+    optimum of one dense linear_sum_assignment over all records, as step 5 of
+    4_matching.ipynb solved it; where several matchings tie, the pairs chosen may differ.
+
+    Parameters:
+        weights (pd.Series): Positive match weight of each candidate pair, indexed by
+                             (h_index, l_index).
+        workers (int): Processes solving the larger components; 1 solves them in this process.
+        batch_edges (int): Candidate pairs per batch of components sent to a worker.
+
+    Returns:
+        pd.DataFrame: The matched pairs, with columns h_index, l_index and match_weight,
+                      ordered by h_index.
+    """
+    weights = weights[weights > 0]
+    h_codes, h_ids = pd.factorize(weights.index.get_level_values(0))
+    l_codes, l_ids = pd.factorize(weights.index.get_level_values(1))
+    w = weights.to_numpy(dtype='float64')
+    n_h, n_l = len(h_ids), len(l_ids)
+
+    graph = coo_matrix((np.ones(len(w)), (h_codes, n_h + l_codes)), shape=(n_h + n_l, n_h + n_l))
+    n_components, labels = connected_components(graph, directed=False)
+    component = labels[h_codes]
+    h_count = np.bincount(labels[:n_h], minlength=n_components)
+    l_count = np.bincount(labels[n_h:], minlength=n_components)
+
+    # Stars (one record on either side) match their heaviest pair; no solver needed.
+    star = ((h_count == 1) | (l_count == 1))[component]
+    star_edges = np.flatnonzero(star)
+    order = star_edges[np.lexsort((-w[star_edges], component[star_edges]))]
+    best = order[np.r_[True, component[order][1:] != component[order][:-1]]] if len(order) else order
+
+    # Everything else is solved one component at a time.
+    rest = np.flatnonzero(~star)
+    rest = rest[np.argsort(component[rest], kind='stable')]
+    bounds = np.flatnonzero(np.r_[True, component[rest][1:] != component[rest][:-1], True])
+    components = [(rest[a:b], h_codes[rest[a:b]], l_codes[rest[a:b]], w[rest[a:b]])
+                  for a, b in zip(bounds[:-1], bounds[1:])]
+    batches = list(_batches(components, batch_edges))
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_solve_components, batches))
+    else:
+        results = [_solve_components(batch) for batch in batches]
+    matched = np.concatenate([best] + results)
+    matches = pd.DataFrame({
+        'h_index': h_ids[h_codes[matched]],
+        'l_index': l_ids[l_codes[matched]],
+        'match_weight': w[matched],
+    })
+    return matches.sort_values('h_index', kind='stable').reset_index(drop=True)
+
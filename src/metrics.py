@@ -0,0 +1,443 @@
+import os
+import re
+import json
+import time
+import bisect
+import argparse
+import cProfile
+import resource
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# --- Defaults ---
+# Scripts record to the JSON-lines file named by METRICS_ENV (and dump a cProfile per
+# stage into PROFILE_ENV) unless configure() is called; pipeline.py sets both for its
+# stages, with RUN_ENV naming the run so records of several processes can be grouped.
+METRICS_ENV = 'PEERAGE_METRICS'
+PROFILE_ENV = 'PEERAGE_PROFILE'
+RUN_ENV = 'PEERAGE_RUN'
+# Upper bounds (seconds) of the fetch latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+
+# --- Memory ---
+def _status_kb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB since the last reset_peak_rss() (or
+    since it started, where the peak cannot be reset).
+    """
+    kb = _status_kb('VmHWM')
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # kB on Linux.
+    return round(kb / 1024, 1)
+
+
+def reset_peak_rss():
+    """
+    Resets the kernel's peak RSS counter to the current RSS (Linux >= 4.0), so the next
+    peak_rss_mb() is the peak of what follows. Returns False where that is not possible.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+# --- Recorder ---
+class MetricsRecorder:
+    """
+    Appends one JSON object per line to a metrics file: a record per finished stage
+    (wall and CPU time, peak RSS, rows in and out, throughput) and per URL class of a
+    crawl (see FetchStats). Stages may nest and may run in several threads; each
+    stage's peak RSS includes the stages nested in it. With `profile_dir`, each
+    outermost stage also runs under cProfile (in the thread that opened it) and its
+    statistics are dumped to '<profile_dir>/<run>_<stage>.prof'.
+
+    Parameters:
+        path (str or None): The JSON-lines file; None keeps records in memory only.
+        profile_dir (str or None): Directory for the cProfile dumps; None disables profiling.
+        run (str or None): Identifier written on every record; by default the value of
+                           RUN_ENV, or the start time and process ID.
+    """
+
+    def __init__(self, path=None, profile_dir=None, run=None):
+        self.path = path
+        self.profile_dir = profile_dir
+        self.run = run or os.environ.get(RUN_ENV) or f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self.records = []
+        self.lock = threading.Lock()
+        self.open_stages = []
+        self.profiling = False
+
+    def record(self, kind, **fields):
+        """
+        Writes one record of the given kind ('stage', 'fetch', ...) with the run, process
+        and time added.
+        """
+        record = {'type': kind, 'run': self.run, 'pid': os.getpid(), 'time': datetime.now().isoformat(timespec='milliseconds'),
+                  **fields}
+        with self.lock:
+            self.records.append(record)
+            if self.path is not None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+        return record
+
+    @contextmanager
+    def stage(self, name, rows_in=None, **fields):
+        """
+        Measures the enclosed block as a stage; the record is written when it exits, also
+        when it raises (with the exception type in 'error').
+
+        Parameters:
+            name (str): Stage name, e.g. 'crawl_person' or 'wrangle.dates'.
+            rows_in (int or None): Rows the stage starts from.
+            **fields: Further figures recorded with the stage.
+
+        Yields:
+            Stage: Set `rows_out` (and any other figure with `update`) before the block ends.
+        """
+        stage = Stage(name, rows_in, fields)
+        with self.lock:
+            # The peak so far belongs to the stages already open; then start afresh.
+            current = peak_rss_mb()
+            for open_stage in self.open_stages:
+                open_stage.peak_rss_mb = max(open_stage.peak_rss_mb, current)
+            resettable = reset_peak_rss()
+            self.open_stages.append(stage)
+            profile = self.profile_dir is not None and not self.profiling
+            self.profiling |= profile
+        profiler = cProfile.Profile() if profile else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        error = None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield stage
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            with self.lock:
+                self.open_stages.remove(stage)
+                stage.peak_rss_mb = max(stage.peak_rss_mb, peak_rss_mb())
+                for open_stage in self.open_stages:
+                    open_stage.peak_rss_mb = max(open_stage.peak_rss_mb, stage.peak_rss_mb)
+                if profile:
+                    self.profiling = False
+            fields = {'stage': name, 'wall_seconds': round(wall, 6), 'cpu_seconds': round(cpu, 6),
+                      'peak_rss_mb': stage.peak_rss_mb, 'peak_rss_scope': 'stage' if resettable else 'process',
+                      'rows_in': stage.rows_in, 'rows_out': stage.rows_out,
+                      'rows_per_second': stage.throughput(wall), **stage.fields}
+            if error is not None:
+                fields['error'] = error
+            if profiler is not None:
+                safe_name = re.sub(r'[^\w.-]+', '_', name)
+                fields['profile'] = os.path.join(self.profile_dir, f"{self.run}_{safe_name}.prof")
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(fields['profile'])
+            self.record('stage', **fields)
+
+    def fetches(self, stats, **fields):
+        """
+        Writes one 'fetch' record per URL class of a FetchStats.
+        """
+        for url_class, summary in stats.summary().items():
+            self.record('fetch', url_class=url_class, **summary, **fields)
+
+
+class Stage:
+    """
+    The figures of a stage being measured; see MetricsRecorder.stage.
+    """
+
+    def __init__(self, name, rows_in=None, fields=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.fields = dict(fields or {})
+        self.peak_rss_mb = 0.0
+
+    def update(self, **fields):
+        """
+        Sets rows_in/rows_out or adds further figures to the stage record.
+        """
+        for key in ('rows_in', 'rows_out'):
+            if key in fields:
+                setattr(self, key, fields.pop(key))
+        self.fields.update(fields)
+
+    def throughput(self, seconds):
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        return round(rows / seconds, 1) if rows is not None and seconds > 0 else None
+
+
+class Laps:
+    """
+    Consecutive stages marked by calls to `lap`, for scripts and notebooks that time a
+    sequence of steps (as print_time_elapsed did in 4_matching.ipynb) rather than blocks.
+    When the recorder has a `profile_dir`, each lap runs under cProfile like an outermost
+    stage and is dumped to '<profile_dir>/<run>_<prefix>.<label>.prof'; `close` stops
+    profiling after the last lap.
+
+    Parameters:
+        prefix (str): Prefix of the stage names, e.g. 'match'.
+        recorder (MetricsRecorder or None): Where to record; the configured recorder if None.
+        echo (bool): Also print '<label> - Time elapsed: <s> seconds' after each lap.
+    """
+
+    def __init__(self, prefix, recorder=None, echo=True):
+        self.prefix = prefix
+        self.recorder = recorder
+        self.echo = echo
+        self.profiler = None
+        self._start()
+
+    def _start(self):
+        recorder = self.recorder or get_recorder()
+        with recorder.lock:
+            profile = recorder.profile_dir is not None and not recorder.profiling
+            recorder.profiling |= profile
+        reset_peak_rss()
+        self.start = time.perf_counter()
+        self.cpu = time.process_time()
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def _stop_profile(self):
+        profiler, self.profiler = self.profiler, None
+        if profiler is not None:
+            profiler.disable()
+            recorder = self.recorder or get_recorder()
+            with recorder.lock:
+                recorder.profiling = False
+        return profiler
+
+    def lap(self, label, rows_in=None, rows_out=None, **fields):
+        """
+        Records the time since the previous lap (or since the Laps was created) as a stage.
+
+        Returns:
+            float: The wall time of the lap in seconds.
+        """
+        profiler = self._stop_profile()
+        wall, cpu = time.perf_counter() - self.start, time.process_time() - self.cpu
+        stage = Stage(label, rows_in, fields)
+        stage.rows_out = rows_out
+        recorder = self.recorder or get_recorder()
+        name = f'{self.prefix}.{label}'
+        if profiler is not None:
+            safe_name = re.sub(r'[^\w.-]+', '_', name)
+            fields['profile'] = os.path.join(recorder.profile_dir, f"{recorder.run}_{safe_name}.prof")
+            os.makedirs(recorder.profile_dir, exist_ok=True)
+            profiler.dump_stats(fields['profile'])
+        recorder.record(
+            'stage', stage=name, wall_seconds=round(wall, 6), cpu_seconds=round(cpu, 6),
+            peak_rss_mb=peak_rss_mb(), rows_in=rows_in, rows_out=rows_out, rows_per_second=stage.throughput(wall),
+            **fields)
+        if self.echo:
+            print(f"{label} - Time elapsed: {wall:.4f} seconds")
+        self._start()
+        return wall
+
+    def close(self):
+        """
+        Stops timing (and profiling) after the last lap.
+        """
+        self._stop_profile()
+
+
+# --- Fetches ---
+def url_class(url):
+    """
+    Default URL class: the last path segment with its numbers replaced by '#', so
+    'https://www.thepeerage.com/p1234.htm' is 'p#.htm'.
+    """
+    return re.sub(r'\d+', '#', urlsplit(url).path.rsplit('/', 1)[-1]) or '/'
+
+
+class FetchStats:
+    """
+    Thread-safe fetch counters per URL class: requests, attempts and retries, final
+    failures, status codes, bytes downloaded, time spent backing off, and a histogram
+    of the latency of every attempt (bucket upper bounds in LATENCY_BUCKETS).
+
+    Parameters:
+        classify (callable): Maps a URL to its class; url_class by default.
+    """
+
+    def __init__(self, classify=url_class):
+        self.classify = classify
+        self.lock = threading.Lock()
+        self.classes = {}
+
+    def _counters(self, url):
+        name = self.classify(url)
+        counters = self.classes.get(name)
+        if counters is None:
+            counters = self.classes[name] = {
+                'requests': 0, 'attempts': 0, 'retries': 0, 'failures': 0, 'bytes': 0, 'backoff_seconds': 0.0,
+                'latency_seconds': 0.0, 'status': {}, 'latency_counts': [0] * (len(LATENCY_BUCKETS) + 1)}
+        return counters
+
+    def attempt(self, url, seconds, status=None, n_bytes=0):
+        """
+        Counts one HTTP attempt; `status` is None when it raised (timeout, reset, ...).
+        """
+        with self.lock:
+            counters = self._counters(url)
+            counters['attempts'] += 1
+            counters['bytes'] += n_bytes
+            counters['latency_seconds'] += seconds
+            counters['latency_counts'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            key = str(status) if status is not None else 'error'
+            counters['status'][key] = counters['status'].get(key, 0) + 1
+
+    def backoff(self, url, seconds):
+        """
+        Counts time slept before retrying a URL.
+        """
+        with self.lock:
+            self._counters(url)['backoff_seconds'] += seconds
+
+    def finished(self, url, attempts, ok):
+        """
+        Counts one fetched URL: the retries it took and whether it finally failed.
+        """
+        with self.lock:
+            counters = self._counters(url)
+            counters['requests'] += 1
+            counters['retries'] += attempts - 1
+            counters['failures'] += int(not ok)
+
+    def summary(self):
+        """
+        Returns {url class: counters}, with the mean latency and the latency bucket holding
+        the median, 90th and 99th percentile attempt.
+        """
+        with self.lock:
+            summary = {}
+            for name, counters in self.classes.items():
+                counts = counters['latency_counts']
+                total = sum(counts)
+                summary[name] = {
+                    **{key: value for key, value in counters.items() if key != 'latency_counts'},
+                    'backoff_seconds': round(counters['backoff_seconds'], 3),
+                    'latency_seconds': round(counters['latency_seconds'], 3),
+                    'latency_mean': round(counters['latency_seconds'] / total, 4) if total else None,
+                    'latency_histogram': {'le': LATENCY_BUCKETS + ['inf'], 'counts': list(counts)},
+                    **{f'latency_p{q}_le': _bucket_quantile(counts, q / 100) for q in (50, 90, 99)},
+                }
+            return summary
+
+
+def _bucket_quantile(counts, q):
+    """
+    Upper bound of the histogram bucket holding the q-quantile, 'inf' for the open bucket.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS + ['inf'], counts):
+        seen += count
+        if seen >= q * total:
+            return bound
+
+
+# --- Module-level recorder ---
+_recorder = None
+
+
+def configure(path=None, profile_dir=None, run=None):
+    """
+    Sets the recorder used by stage(), record() and Laps. Arguments left as None are
+    read from METRICS_ENV, PROFILE_ENV and RUN_ENV.
+
+    Returns:
+        MetricsRecorder: The new recorder.
+    """
+    global _recorder
+    _recorder = MetricsRecorder(path or os.environ.get(METRICS_ENV) or None,
+                                profile_dir or os.environ.get(PROFILE_ENV) or None, run)
+    return _recorder
+
+
+def get_recorder():
+    """
+    The configured recorder, configured from the environment on first use.
+    """
+    return _recorder if _recorder is not None else configure()
+
+
+def stage(name, rows_in=None, **fields):
+    """
+    get_recorder().stage(...): `with stage('wrangle.dates', rows_in=len(df)) as s: ...`.
+    """
+    return get_recorder().stage(name, rows_in=rows_in, **fields)
+
+
+def record(kind, **fields):
+    return get_recorder().record(kind, **fields)
+
+
+def read_metrics(path):
+    """
+    Loads a metrics file written by MetricsRecorder.
+
+    Returns:
+        list: The records, as dicts, in the order they were written.
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarise(records):
+    """
+    One line per stage record, slowest first: wall and CPU seconds, peak RSS, rows and
+    throughput, then the fetch records.
+
+    Returns:
+        str: The summary table.
+    """
+    stages = sorted((r for r in records if r['type'] == 'stage'), key=lambda r: -r['wall_seconds'])
+    lines = [f"{'stage':<40} {'wall s':>9} {'cpu s':>9} {'peak MB':>9} {'rows in':>10} {'rows out':>10} {'rows/s':>11}"]
+    for r in stages:
+        lines.append(f"{r['stage'][:40]:<40} {r['wall_seconds']:>9.2f} {r['cpu_seconds']:>9.2f} {r['peak_rss_mb']:>9.1f} "
+                     f"{r['rows_in'] if r['rows_in'] is not None else '':>10} "
+                     f"{r['rows_out'] if r['rows_out'] is not None else '':>10} "
+                     f"{r['rows_per_second'] if r['rows_per_second'] is not None else '':>11}")
+    for r in (r for r in records if r['type'] == 'fetch'):
+        lines.append(f"fetch {r['url_class']}: {r['requests']} requests, {r['retries']} retries, {r['failures']} failed, "
+                     f"{r['bytes'] / 1e6:.1f} MB, backoff {r['backoff_seconds']:.0f}s, latency mean {r['latency_mean']}s, "
+                     f"p90 <= {r['latency_p90_le']}s")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Summarise a metrics file, slowest stages first.")
+    argparser.add_argument('path', help="JSON-lines metrics file.")
+    argparser.add_argument('--run', default=None, help="Only the records of this run.")
+    args = argparser.parse_args()
+    records = [r for r in read_metrics(args.path) if args.run is None or r['run'] == args.run]
+    print(summarise(records))
@@ -0,0 +1,236 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from dateutil import parser
+
+from date_parsing import build_datetimes
+
+# --- Defaults ---
+DAYS_PER_YEAR = 365.2425
+FIRST_BIRTH_YEAR = 1550
+LAST_BIRTH_YEAR = 1950     # Exclusive.
+BOOTSTRAP_SAMPLES = 1000
+BOOTSTRAP_BATCH = 100      # Bootstrap replicates per task sent to a worker.
+ISO_DATE_PATTERN = r'^(\d{1,4})-(\d{2})-(\d{2})(?:[ T]00:00:00)?$'
+
+
+# --- Ages ---
+def parse_datetimes(values):
+    """
+    Parses born/died datetime columns as written by the wranglers, once per distinct
+    value: ISO dates ('1688-03-12', with or without a midnight time) are built with
+    array operations, anything else falls back to dateutil as 3_eda_of_both.ipynb did.
+
+    Parameters:
+        values (pd.Series): Date strings, or an already typed datetime64 column.
+
+    Returns:
+        pd.Series: datetime64[us], NaT where a value is missing or unparseable.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('datetime64[us]')
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(uniques, dtype=object).astype(str)
+    parts = text.str.extract(ISO_DATE_PATTERN).astype('float64').astype('Int64')
+    dates, _ = build_datetimes(parts[0], parts[1], parts[2])
+    dates = dates.to_numpy(dtype='datetime64[us]')
+
+    for i in np.flatnonzero(parts[0].isna().to_numpy()):
+        try:
+            dates[i] = np.datetime64(parser.parse(text[i]), 'us')
+        except (ValueError, OverflowError):
+            pass
+    parsed = np.where(codes >= 0, dates[np.maximum(codes, 0)], np.datetime64('NaT', 'us'))
+    return pd.Series(parsed, index=values.index, dtype='datetime64[us]')
+
+
+def ages_at_death(born, died):
+    """
+    Exact age at death in years (days / 365.2425), NaN where either date is unknown.
+
+    Parameters:
+        born, died (pd.Series): Birth and death datetimes, as strings or datetime64.
+
+    Returns:
+        pd.Series: Float ages, indexed like `born`.
+    """
+    delta = parse_datetimes(died).to_numpy() - parse_datetimes(born).to_numpy()
+    return pd.Series(delta / np.timedelta64(1, 'D') / DAYS_PER_YEAR, index=born.index)
+
+
+def birth_years(born):
+    """
+    Birth year of a born datetime column, parsed as ages_at_death parses it; <NA> where
+    the date is missing or unparseable.
+    """
+    return parse_datetimes(born).dt.year.astype('Int64')
+
+
+# --- Resampling ---
+def _bootstrap_binned(args):
+    """
+    Binned counts and age sums of bootstrap replicates of one cohort; runs in a worker
+    process when MortalityTable.bootstrap is given several workers.
+
+    Parameters:
+        args (tuple): (bins, ages, number of bins, number of replicates, seed).
+
+    Returns:
+        tuple: (counts, sums), each of shape (replicates, bins).
+    """
+    bins, ages, n_bins, replicates, seed = args
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((replicates, n_bins))
+    sums = np.zeros((replicates, n_bins))
+    for r in range(replicates):
+        drawn = rng.integers(0, len(bins), len(bins))
+        counts[r] = np.bincount(bins[drawn], minlength=n_bins)
+        sums[r] = np.bincount(bins[drawn], weights=ages[drawn], minlength=n_bins)
+    return counts, sums
+
+
+def _window_sums(binned, width):
+    """
+    Sums of every run of `width` consecutive bins along the last axis, from prefix sums.
+    """
+    prefix = np.concatenate([np.zeros(binned.shape[:-1] + (1,)), np.cumsum(binned, axis=-1)], axis=-1)
+    return prefix[..., width:] - prefix[..., :-width]
+
+
+class MortalityTable:
+    """
+    Ages at death of one cohort (e.g. Hollingsworth peers, or thepeerage children of
+    peers), binned once by birth year, from which statistics over sliding birth-year
+    windows of any width are read off prefix sums: the cost is one pass over the people
+    plus one over the windows, whatever the window width or number of widths tried.
+
+    People whose birth year is unknown or outside [start, end) are left out; people
+    with no known age at death are counted in 'born' but not in the age statistics.
+
+    Parameters:
+        years (array-like): Birth year of each person (nullable).
+        ages (array-like): Age at death of each person in years (NaN if unknown).
+        start (int): First birth year binned.
+        end (int): Birth year after the last one binned.
+    """
+
+    def __init__(self, years, ages, start=FIRST_BIRTH_YEAR, end=LAST_BIRTH_YEAR):
+        years = pd.array(years, dtype='Int64').to_numpy(dtype='float64', na_value=np.nan)
+        ages = np.asarray(ages, dtype='float64')
+        inside = (years >= start) & (years < end)
+        self.start, self.end = start, end
+        self.born = np.bincount((years[inside] - start).astype('int64'), minlength=end - start)
+
+        known = inside & ~np.isnan(ages)
+        self.bins = (years[known] - start).astype('int64')
+        self.ages = ages[known]
+        self.count = np.bincount(self.bins, minlength=end - start).astype('float64')
+        self.total = np.bincount(self.bins, weights=self.ages, minlength=end - start)
+        self.squares = np.bincount(self.bins, weights=self.ages ** 2, minlength=end - start)
+
+    @classmethod
+    def from_frame(cls, df, born_column, died_column, start=FIRST_BIRTH_YEAR, end=LAST_BIRTH_YEAR):
+        """
+        Builds the table of a wrangled frame from its born and died datetime columns.
+        """
+        born = parse_datetimes(df[born_column])
+        return cls(birth_years(born), ages_at_death(born, df[died_column]), start, end)
+
+    def _windows(self, width):
+        starts = np.arange(self.start, self.end - width + 1)
+        return pd.DataFrame({'window_start': starts, 'window_end': starts + width})
+
+    def rolling(self, width):
+        """
+        Statistics of each birth-year window [s, s + width), for s from start to end - width.
+
+        Parameters:
+            width (int): Window length in years.
+
+        Returns:
+            pd.DataFrame: window_start, window_end, born (people in the window), n (with a
+                          known age at death), avg_age and std_age (NaN when n < 2).
+        """
+        windows = self._windows(width)
+        n = _window_sums(self.count, width)
+        total = _window_sums(self.total, width)
+        squares = _window_sums(self.squares, width)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / n
+            variance = np.clip(squares - n * mean ** 2, 0, None) / (n - 1)
+        windows['born'] = _window_sums(self.born, width).astype('int64')
+        windows['n'] = n.astype('int64')
+        windows['avg_age'] = mean
+        windows['std_age'] = np.where(n > 1, np.sqrt(variance), np.nan)
+        return windows
+
+    def life_table(self, window_start, width, interval=5, max_age=100):
+        """
+        Life table of the people born in [window_start, window_start + width) with a known
+        age at death, treated as an extinct cohort: l_x is the number alive at exact age
+        x, d_x the deaths in [x, x + interval), q_x = d_x / l_x, L_x the person-years lived
+        in the interval (deaths at its midpoint), T_x the person-years beyond x and
+        e_x = T_x / l_x the life expectancy at x. Deaths at max_age or older are pooled
+        in the last, open interval, whose person-years are the ages actually lived.
+
+        Returns:
+            pd.DataFrame: Indexed by age x, with l_x, d_x, q_x, L_x, T_x and e_x.
+        """
+        chosen = (self.bins >= window_start - self.start) & (self.bins < window_start - self.start + width)
+        ages = self.ages[chosen]
+        x = np.arange(0, max_age + 1, interval)
+        groups = np.minimum(np.floor(np.clip(ages, 0, None) / interval).astype('int64'), len(x) - 1)
+        d = np.bincount(groups, minlength=len(x)).astype('float64')
+        l = d[::-1].cumsum()[::-1]
+        L = (l - d) * interval + d * interval / 2
+        open_ages = ages[groups == len(x) - 1]
+        L[-1] = (open_ages - x[-1]).clip(0, None).sum()
+        T = L[::-1].cumsum()[::-1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table = pd.DataFrame({'l_x': l, 'd_x': d, 'q_x': d / l, 'L_x': L, 'T_x': T, 'e_x': T / l},
+                                 index=pd.Index(x, name='x'))
+        return table
+
+    def bootstrap(self, width, samples=BOOTSTRAP_SAMPLES, confidence=0.95, workers=1, seed=0):
+        """
+        rolling(width) with percentile bootstrap confidence intervals for avg_age: the
+        people of the cohort are resampled with replacement, and each replicate is binned
+        once and windowed with prefix sums. Replicates are drawn in batches, in a process
+        pool with several workers; the seed makes the result independent of `workers`.
+
+        Returns:
+            pd.DataFrame: rolling(width) plus avg_age_low and avg_age_high.
+        """
+        seeds = np.random.SeedSequence(seed).spawn(-(-samples // BOOTSTRAP_BATCH))
+        tasks = [(self.bins, self.ages, len(self.count), min(BOOTSTRAP_BATCH, samples - i * BOOTSTRAP_BATCH), s)
+                 for i, s in enumerate(seeds)]
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_bootstrap_binned, tasks))
+        else:
+            results = [_bootstrap_binned(task) for task in tasks]
+        counts = np.concatenate([counts for counts, _ in results])
+        sums = np.concatenate([sums for _, sums in results])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = _window_sums(sums, width) / _window_sums(counts, width)
+
+        windows = self.rolling(width)
+        alpha = (1 - confidence) / 2
+        # Windows empty in some replicates get their interval from the others.
+        windows['avg_age_low'] = np.nanquantile(means, alpha, axis=0) if len(means) else np.nan
+        windows['avg_age_high'] = np.nanquantile(means, 1 - alpha, axis=0) if len(means) else np.nan
+        return windows
+
+
+def compare_rolling(tables, width, statistic='avg_age'):
+    """
+    One rolling statistic of several cohorts side by side, e.g.
+    compare_rolling({'Hollingsworth': table_h, 'thepeerage': table_l}, 25).
+
+    Returns:
+        pd.DataFrame: Indexed by window_start, one column per cohort.
+    """
+    return pd.DataFrame({name: table.rolling(width).set_index('window_start')[statistic]
+                         for name, table in tables.items()})
+
@@ -0,0 +1,184 @@
+import re
+
+import pandas as pd
+
+# --- Honorifics ---
+# The ranks of 1_thepeerage_wrangler_notebook.ipynb, stripped from both datasets. The
+# peerage titles of 2_hollsingworth_wrangler.ipynb are only stripped from Hollingsworth:
+# in thepeerage 'fullname' they are part of the name ('Earl Grey Smith' keeps its 'EARL').
+# Words may be followed by a dot.
+HONORIFICS = [
+    # Civilian titles
+    'Mr', 'Mrs', 'Ms', 'Miss', 'Mx',
+    'Dr', 'Prof', 'Professor',
+    'Sir', 'Dame', 'Lord', 'Lady',
+    'Rev', 'Reverend', 'Father', 'Fr', 'Pastor',
+    'Rabbi', 'Imam',
+    'Hon', 'Honorable', 'Right Honourable', 'Rt Hon',
+    # Army ranks
+    'Private', 'Pvt',
+    'Corporal', 'Cpl',
+    'Sergeant', 'Sgt',
+    'Lieutenant', 'Lt',
+    'Captain', 'Capt',
+    'Major', 'Maj',
+    'Lieutenant Colonel', 'Lt Col', 'Lt-Col',
+    'Colonel', 'Col',
+    'Brigadier', 'Brigadier General', 'Brigadier-General',
+    'Major General', 'Maj Gen', 'Maj-Gen',
+    'Lieutenant General', 'Lt Gen', 'Lt-Gen',
+    'General', 'Gen',
+    'Field Marshal',
+    # Naval ranks
+    'Seaman', 'Able Seaman', 'AB',
+    'Petty Officer', 'Chief Petty Officer',
+    'Midshipman',
+    'Lieutenant Commander',
+    'Commander',
+    'Captain RN',
+    'Commodore',
+    'Rear Admiral',
+    'Vice Admiral',
+    'Admiral',
+    # Air-Force ranks
+    'Pilot Officer',
+    'Flying Officer',
+    'Flight Lieutenant',
+    'Squadron Leader',
+    'Wing Commander',
+    'Group Captain',
+    'Air Commodore',
+    'Air Vice Marshal', 'Air Vice-Marshal',
+    'Air Marshal',
+    'Air Chief Marshal',
+    'Marshal of the RAF',
+    # Religious / other
+    'Saint', 'St'
+]
+PEERAGE_TITLES = [
+    'Baron', 'Baroness',
+    'Viscount', 'Viscountess', 'Earl',
+    'Marquess', 'Marquis', 'Duke', 'Duchess',
+    'Count', 'Countess',
+]
+
+
+def honorific_pattern(honorifics=HONORIFICS):
+    """
+    Compiles one pattern matching any run of leading honorifics, each followed by
+    whitespace (so a name that is only a title, e.g. the surname 'Earl', is kept).
+    Longer titles are tried first, so 'Lt Col' is removed whole rather than as 'Lt'.
+    """
+    fragments = (r'\s+'.join(re.escape(word) + r'\.?' for word in title.split())
+                 for title in sorted(set(honorifics), key=len, reverse=True))
+    return re.compile(r'^(?:(?:' + '|'.join(fragments) + r')\s+)+', flags=re.IGNORECASE)
+
+
+HONORIFIC_PATTERN = honorific_pattern()
+PEERAGE_HONORIFIC_PATTERN = honorific_pattern(HONORIFICS + PEERAGE_TITLES)
+FORMERLY_PATTERN = re.compile(r'\bformerly\b.*', flags=re.IGNORECASE | re.DOTALL)
+CLEAN_NAME_PATTERN = r'(?:[A-Za-z]+(?: [A-Za-z]+)*)?'  # Already what _clean returns.
+
+
+# --- Vectorised ---
+def _per_unique(names, transform):
+    """
+    Applies a column-wise transform (returning a Series or a DataFrame) to the distinct
+    values of `names` only, and broadcasts the results back; missing names give NaN.
+    """
+    codes, uniques = pd.factorize(names)
+    result = transform(pd.Series(uniques, dtype=object)).reindex(codes)
+    result.index = names.index
+    return result
+
+
+def _strip(names, pattern=HONORIFIC_PATTERN):
+    return (names.str.replace(FORMERLY_PATTERN, '', regex=True).str.strip()
+            .str.replace(pattern, '', regex=True).str.strip())
+
+
+def _clean(names):
+    dirty = ~names.str.fullmatch(CLEAN_NAME_PATTERN, na=True).astype(bool)
+    if not dirty.any():
+        return names
+    names = names.copy()
+    names[dirty] = _clean_all(names[dirty])
+    return names
+
+
+def _clean_all(names):
+    return (names.str.replace(r'\(.*?\)', '', regex=True)
+            .str.normalize('NFKD')
+            .str.replace(r'[-–—]+', ' ', regex=True)
+            .str.replace(r'[^A-Za-z ]+', '', regex=True)
+            .str.replace(r'\s{2,}', ' ', regex=True)
+            .str.strip())
+
+
+def _first_token(names):
+    return names.str.extract(r'^\s*(\S+)', expand=False)
+
+
+def _last_token(names):
+    return names.str.extract(r'(\S+)\s*$', expand=False)
+
+
+def strip_honorifics(names, pattern=HONORIFIC_PATTERN):
+    """
+    Drops any 'formerly ...' suffix and the leading honorifics of each name.
+
+    Parameters:
+        names (pd.Series): Names, e.g. thepeerage 'fullname' or Hollingsworth 'First Names'.
+        pattern (re.Pattern): HONORIFIC_PATTERN, or PEERAGE_HONORIFIC_PATTERN to also
+            strip the peerage titles.
+
+    Returns:
+        pd.Series: The stripped names, indexed like `names`.
+    """
+    return _per_unique(names, lambda names: _strip(names, pattern))
+
+
+def clean_names(names):
+    """
+    Cleans names as both wranglers' clean_string did: no parenthesized content,
+    diacritics or dashes, only ASCII letters and single spaces.
+    """
+    return _per_unique(names, _clean)
+
+
+def split_fullname(fullname):
+    """
+    Name keys of thepeerage 'fullname' column: the stripped, upper-cased name and its
+    first and last tokens, each cleaned.
+
+    Returns:
+        pd.DataFrame: Full_Name, First Forename and Last Surname, indexed like `fullname`.
+    """
+    def keys(names):
+        names = _strip(names).str.upper()
+        return pd.DataFrame({'Full_Name': _clean(names),
+                             'First Forename': _clean(_first_token(names)),
+                             'Last Surname': _clean(_last_token(names))})
+
+    return _per_unique(fullname, keys)
+
+
+def split_forenames_surname(forenames, surname):
+    """
+    Name keys of the Hollingsworth 'First Names' and 'Surname' columns of peersflatfile.tab:
+    both stripped and upper-cased, the first forename and last surname token, each cleaned.
+
+    Returns:
+        pd.DataFrame: Full_Name, First Forename and Last Surname, indexed like `forenames`.
+    """
+    def strip(names):
+        return _strip(names, PEERAGE_HONORIFIC_PATTERN).str.upper()
+
+    forenames = _per_unique(forenames, strip)
+    surname = _per_unique(surname, strip)
+    return pd.DataFrame({
+        'Full_Name': clean_names(forenames + ' ' + surname),
+        'First Forename': _per_unique(forenames, lambda names: _clean(_first_token(names))),
+        'Last Surname': _per_unique(surname, lambda names: _clean(_last_token(names))),
+    }, index=forenames.index)
+
@@ -0,0 +1,128 @@
+import re
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from table_io import read_table
+
+# --- Categories ---
+# A category is flagged when any of its phrases occurs anywhere in the lower-cased
+# narrative, as with `school.lower() in narr.lower()`.
+CLARENDON_SCHOOLS = [
+    'Charterhouse', 'Eton', 'Harrow', 'Merchant Taylor',
+    'Rugby School', 'Shrewsbury School', 'St Paul’s School',
+    'Westminster School', 'Winchester College'
+]
+EDUCATION_CATEGORIES = {
+    'clarendon': CLARENDON_SCHOOLS,
+    'oxford': ['oxford'],
+    'cambridge': ['cambridge'],
+    'univ': ['univ'],
+}
+# Further flags read from the same pass; extend or replace as needed.
+OTHER_CATEGORIES = {
+    'military': ['regiment', 'the army', 'royal navy', 'royal air force', 'guards'],
+    'clergy': ['rector', 'vicar', 'bishop', 'ordained', 'curate'],
+    'law': ['barrister', 'called to the bar', 'solicitor', 'judge'],
+    'parliament': ['member of parliament', 'house of commons'],
+    'killed_in_action': ['killed in action', 'died of wounds'],
+}
+NARRATIVE_CATEGORIES = {**EDUCATION_CATEGORIES, **OTHER_CATEGORIES}
+
+
+def phrase_pattern(phrases):
+    """
+    RE2 pattern matching any of the (lower-cased) phrases as a literal substring.
+    """
+    return '|'.join(re.escape(phrase.lower()) for phrase in sorted(set(phrases), key=len, reverse=True))
+
+
+class NarrativeClassifier:
+    """
+    Flags categories of phrases in a whole narrative column with Arrow's RE2 engine,
+    which compiles a pattern into an automaton and scans text in linear time.
+
+    One pass with the phrases of every category combined finds the narratives that
+    mention anything at all; only those are then tested against each category. So
+    the column is scanned once, and adding categories costs only a scan of the
+    narratives that matched, rather than one `in` test per phrase per person.
+
+    Parameters:
+        categories (dict): Category name -> list of phrases (matched case-insensitively
+                           as substrings).
+    """
+
+    def __init__(self, categories=NARRATIVE_CATEGORIES):
+        self.categories = {category: list(phrases) for category, phrases in categories.items()}
+        self.patterns = {category: phrase_pattern(phrases)
+                         for category, phrases in self.categories.items() if phrases}
+        self.any_pattern = phrase_pattern([phrase for phrases in self.categories.values() for phrase in phrases])
+
+    def classify(self, narr):
+        """
+        Flags a whole narrative column.
+
+        Parameters:
+            narr (pd.Series): Narratives; missing ones match nothing.
+
+        Returns:
+            pd.DataFrame: One int8 indicator column per category, indexed like `narr`.
+        """
+        features = pd.DataFrame({category: np.zeros(len(narr), dtype='int8') for category in self.categories},
+                                index=narr.index)
+        if not self.patterns or not len(narr):
+            return features
+        # Lower-cased by Python, as `narr.lower()` was, rather than by Arrow.
+        lowered = narr.fillna('').astype(str).str.lower().to_numpy(dtype=object)
+        text = pa.array(lowered, type=pa.large_string())
+        hits = pc.match_substring_regex(text, self.any_pattern).to_numpy(zero_copy_only=False)
+        candidates = np.flatnonzero(hits)
+        text = text.take(pa.array(candidates))
+        for category, pattern in self.patterns.items():
+            flags = np.zeros(len(narr), dtype='int8')
+            flags[candidates] = pc.match_substring_regex(text, pattern).to_numpy(zero_copy_only=False)
+            features[category] = flags
+        return features
+
+
+def oxbridge_labels(oxford, cambridge, univ):
+    """
+    The 'oxbridge' column from the oxford/cambridge/univ indicators: 'both', 'oxford',
+    'cambridge' or 'N/A', as education_flags in 0_thepeerage_scraper.py assigns it.
+    """
+    oxford, cambridge, univ = (np.asarray(flag, dtype=bool) for flag in (oxford, cambridge, univ))
+    return np.select([oxford & cambridge, oxford & univ, cambridge & univ], ['both', 'oxford', 'cambridge'], 'N/A')
+
+
+def narrative_features(narr, categories=NARRATIVE_CATEGORIES):
+    """
+    Indicator columns for a narrative column, plus 'oxbridge' when the education
+    categories are included.
+
+    Parameters:
+        narr (pd.Series): The 'narr' column of the raw person table.
+        categories (dict): Category name -> list of phrases.
+
+    Returns:
+        pd.DataFrame: One int8 column per category (and 'oxbridge'), indexed like `narr`.
+    """
+    features = NarrativeClassifier(categories).classify(narr)
+    if {'oxford', 'cambridge', 'univ'} <= set(features.columns):
+        features['oxbridge'] = oxbridge_labels(features['oxford'], features['cambridge'], features['univ'])
+    return features
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Flag narrative categories of the raw person table.")
+    argparser.add_argument('--table', default='../data/thepeerage/raw/entire_thepeerage.tsv',
+                           help="Raw person table (.tsv or .parquet).")
+    argparser.add_argument('--out', default=None,
+                           help="CSV to write the indicator columns to, indexed by ID.")
+    args = argparser.parse_args()
+    raw = read_table(args.table, columns=['ID', 'narr'])
+    features = narrative_features(raw['narr']).set_axis(raw['ID'])
+    print(features.drop(columns='oxbridge').sum().to_string())
+    if args.out is not None:
+        features.to_csv(args.out)
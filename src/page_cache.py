@@ -0,0 +1,61 @@
+import os
+import gzip
+import hashlib
+
+
+class PageCache:
+    """
+    Content-addressed on-disk store of raw pages.
+
+    Each page is gzip-compressed and stored under objects/<first two hex digits>/<sha256>.gz,
+    so identical pages are stored once and a page's address is the hash the crawl manifest
+    already records for it. The manifest (url/page -> sha256) is the index into the cache.
+
+    Parameters:
+        root (str): Directory holding the cache.
+        compresslevel (int): gzip compression level.
+    """
+
+    def __init__(self, root, compresslevel=6):
+        self.root = root
+        self.compresslevel = compresslevel
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+    def path(self, digest):
+        """
+        Returns the location of the object with the given SHA-256 hex digest.
+        """
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}.gz")
+
+    def __contains__(self, digest):
+        return digest is not None and os.path.exists(self.path(digest))
+
+    def put(self, content):
+        """
+        Stores a page, unless an identical page is already stored.
+
+        Parameters:
+            content (bytes): The raw page.
+
+        Returns:
+            str: The SHA-256 hex digest addressing the page.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as fileout:
+                fileout.write(gzip.compress(content, compresslevel=self.compresslevel))
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest):
+        """
+        Loads a page by its SHA-256 hex digest.
+
+        Returns:
+            bytes: The raw page.
+        """
+        with open(self.path(digest), 'rb') as filein:
+            return gzip.decompress(filein.read())
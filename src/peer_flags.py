@@ -0,0 +1,31 @@
+import pandas as pd
+
+
+def peer_membership(peer_types, index):
+    """
+    Pivots the (id, type) rows of british_peers_and_orders.tsv into per-person peer flags
+    with one grouped join, instead of one indexed write per peer row.
+
+    Parameters:
+        peer_types (pd.Series): Type of peer ('duke', 'baronet', ...) indexed by person ID,
+                                one entry per row of the peers table.
+        index (pd.Index): Person IDs to align the flags to (may contain duplicates).
+
+    Returns:
+        pd.DataFrame: Indexed like `index`, with one 0/1 'is_<type>' column per type (in
+                      order of first appearance), 'is_peer', and 'type_of_peer', the
+                      ';'-joined types of each person in peers-table order ('' for non-peers).
+    """
+    types = pd.Series(pd.Categorical(peer_types.to_numpy(), categories=peer_types.unique()), index=peer_types.index)
+    onehot = pd.get_dummies(types, prefix='is', prefix_sep='_', dtype='int64').groupby(level=0).max()
+    onehot['is_peer'] = 1
+    # Most people hold a single title; only those with several need their types joined.
+    multiple = peer_types.index.duplicated(keep=False)
+    type_of_peer = pd.concat([
+        peer_types[~multiple],
+        peer_types[multiple].groupby(level=0, sort=False).agg(';'.join),
+    ])
+
+    flags = onehot.reindex(index, fill_value=0).astype('int64')
+    flags['type_of_peer'] = type_of_peer.reindex(index, fill_value='').to_numpy()
+    return flags
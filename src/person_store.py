@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from table_io import iter_table, wrangled_dtypes, CATEGORICAL_COLUMNS
+
+# --- Global Constants ---
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+CHUNKSIZE = 100_000   # Rows of the wrangled table read at a time while building.
+# The ID -> row index is a direct-address table (one int64 per possible ID) when the
+# largest ID is at most DENSE_FACTOR times the number of people plus DENSE_SLACK, so a
+# lookup is one array read; sparser IDs fall back to a sorted array and a binary search.
+DENSE_FACTOR = 4
+DENSE_SLACK = 1 << 20
+
+
+class PersonStore:
+    """
+    Read-only, memory-mapped column store of the wrangled person table, addressed by
+    thepeerage ID.
+
+    The store is a directory of flat binary files described by meta.json:
+
+    - numeric, boolean and datetime columns: one fixed-width array each (int64, float64,
+      int8, datetime64[us]), plus a validity array where values can be missing;
+    - string columns: a byte heap of UTF-8 strings and an int64 array of offsets into
+      it (string i is heap[offsets[i]:offsets[i + 1]]);
+    - categorical columns: int32 codes and a small list of categories in meta.json;
+    - the ID -> row index (see DENSE_FACTOR).
+
+    Opening maps the files without reading them, so a process can answer a lookup in
+    milliseconds and only the pages it touches are read from disk.
+
+    Parameters:
+        path (str): The store directory, as written by PersonStore.build.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"{path} has store format {self.meta['version']}, expected {FORMAT_VERSION}")
+        self.columns = self.meta['columns']
+        self.index_name = self.meta['index_name']
+        self.ids = self._array('ids', 'int64')
+        self._lookup = self._array('lookup', 'int64')
+        # With a sorted index, _lookup holds the rows in the order of _sorted_ids.
+        self._sorted_ids = self._array('sorted_ids', 'int64') if self.meta['index'] == 'sorted' else None
+        self._maps = {}
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __contains__(self, person_id):
+        return self.rows([person_id])[0] >= 0
+
+    def _array(self, name, dtype):
+        path = os.path.join(self.path, name + '.bin')
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    # --- Lookup ---
+    def rows(self, ids):
+        """
+        Returns the row of each ID, -1 where the ID is not in the store.
+
+        Parameters:
+            ids (array-like): thepeerage IDs.
+
+        Returns:
+            np.ndarray: int64 rows.
+        """
+        ids = np.asarray(ids, dtype='int64')
+        if self.meta['index'] == 'dense':
+            inside = (ids >= 0) & (ids < len(self._lookup))
+            rows = np.full(len(ids), -1, dtype='int64')
+            rows[inside] = self._lookup[ids[inside]]
+            return rows
+        sorted_ids = self._sorted_ids
+        if not len(sorted_ids):
+            return np.full(len(ids), -1, dtype='int64')
+        positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[positions] == ids, self._lookup[positions], -1)
+
+    def contains(self, ids):
+        """
+        Vectorised membership test, e.g. for peers['id'].isin(<all person IDs>).
+
+        Returns:
+            np.ndarray: Boolean array, True where the ID is in the store.
+        """
+        return self.rows(ids) >= 0
+
+    def get(self, person_id, columns=None):
+        """
+        One person's values.
+
+        Returns:
+            dict: Column -> value; None if the ID is not in the store.
+        """
+        frame = self.gather([person_id], columns)
+        return None if frame.empty else frame.iloc[0].to_dict()
+
+    def gather(self, ids, columns=None):
+        """
+        The given columns of the given people, read straight from the mapped files.
+
+        Parameters:
+            ids (array-like): thepeerage IDs; those not in the store are left out.
+            columns (list or None): Columns to gather; all columns if None.
+
+        Returns:
+            pd.DataFrame: One row per ID found, in the order given, indexed by ID.
+        """
+        rows = self.rows(ids)
+        rows = rows[rows >= 0]
+        names = list(self.columns) if columns is None else columns
+        data = {name: self._values(name, rows) for name in names}
+        return pd.DataFrame(data, index=pd.Index(np.asarray(self.ids[rows]), name=self.index_name))
+
+    def column(self, name):
+        """
+        A whole column, in row order.
+        """
+        return self._values(name, np.arange(len(self)))
+
+    def to_frame(self, columns=None):
+        """
+        The whole table (or some of its columns), as read_table would give it.
+        """
+        return self.gather(np.asarray(self.ids), columns)
+
+    # --- Decoding ---
+    def _map(self, name, part, dtype):
+        key = (name, part)
+        if key not in self._maps:
+            self._maps[key] = self._array(f"{name}.{part}", dtype)
+        return self._maps[key]
+
+    def _values(self, name, rows):
+        spec = self.columns[name]
+        kind = spec['kind']
+        if kind == 'string':
+            offsets = self._map(name, 'offsets', 'int64')
+            heap = self._map(name, 'heap', 'uint8')
+            starts, ends = offsets[rows], offsets[rows + 1]
+            values = np.array([bytes(heap[start:end]).decode('utf-8') for start, end in zip(starts, ends)],
+                              dtype=object)
+        elif kind == 'category':
+            codes = np.asarray(self._map(name, 'codes', 'int32')[rows])
+            return pd.Categorical.from_codes(codes, categories=spec['categories'])
+        else:
+            values = np.asarray(self._map(name, 'values', spec['dtype'])[rows])
+        if not spec['nullable'] or kind in ('float', 'datetime'):  # NaN and NaT mark their own gaps.
+            return values if kind != 'bool' else values.astype(bool)
+        valid = np.asarray(self._map(name, 'valid', 'bool')[rows])
+        if kind == 'int':
+            return pd.arrays.IntegerArray(values, ~valid)
+        if kind == 'bool':
+            return pd.arrays.BooleanArray(values.astype(bool), ~valid)
+        values[~valid] = np.nan
+        return values
+
+    # --- Building ---
+    @classmethod
+    def build(cls, frames, path):
+        """
+        Writes a store from the wrangled table, one chunk at a time, then opens it.
+        Column kinds are taken from the first chunk; later chunks are converted to them.
+
+        Parameters:
+            frames (iterable): DataFrames indexed by thepeerage ID, e.g. from iter_table.
+            path (str): The store directory; an existing store there is replaced.
+
+        Returns:
+            PersonStore: The new store.
+        """
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        writer = _StoreWriter(tmp_path)
+        for frame in frames:
+            writer.append(frame)
+        writer.close()
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+
+def _kind(series):
+    """
+    The storage kind of a column: 'int', 'float', 'bool', 'datetime', 'category' or 'string'.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or series.name in CATEGORICAL_COLUMNS:
+        return 'category'
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'int'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'float'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    return 'string'
+
+
+class _StoreWriter:
+    """
+    Appends chunks of the wrangled table to the files of a store being built.
+    """
+
+    DTYPES = {'int': 'int64', 'float': 'float64', 'bool': 'int8', 'datetime': 'datetime64[us]'}
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = None
+        self.index_name = None
+        self.files = {}
+        self.offsets = {}
+        self.categories = {}
+        self.rows = 0
+        self.ids = []
+
+    def _write(self, name, part, array):
+        if (name, part) not in self.files:
+            self.files[(name, part)] = open(os.path.join(self.path, f"{name}.{part}.bin"), 'wb')
+        self.files[(name, part)].write(np.ascontiguousarray(array).tobytes())
+
+    def append(self, frame):
+        if self.columns is None:
+            self.index_name = frame.index.name or 'ID'
+            self.columns = {}
+            for name in frame.columns:
+                kind = _kind(frame[name])
+                self.columns[name] = {'kind': kind, 'dtype': self.DTYPES.get(kind), 'nullable': False}
+                if kind == 'string':
+                    self.offsets[name] = 0
+                    self._write(name, 'offsets', np.zeros(1, dtype='int64'))
+                if kind == 'category':
+                    self.categories[name] = {}
+        self.ids.append(frame.index.to_numpy(dtype='int64'))
+        for name, spec in self.columns.items():
+            series = frame[name]
+            if _kind(series) != spec['kind'] and not series.isna().all():
+                raise ValueError(f"Column {name!r} is {_kind(series)} in rows {self.rows}-{self.rows + len(frame) - 1} "
+                                 f"but {spec['kind']} in the first chunk; read the table with fixed dtypes")
+            missing = series.isna().to_numpy()
+            self._write(name, 'valid', ~missing)
+            spec['nullable'] |= bool(missing.any())
+            kind = spec['kind']
+            if kind == 'string':
+                encoded = [b'' if skip else str(value).encode('utf-8')
+                           for value, skip in zip(series.to_numpy(dtype=object), missing)]
+                lengths = np.fromiter(map(len, encoded), dtype='int64', count=len(encoded))
+                self._write(name, 'offsets', self.offsets[name] + np.cumsum(lengths))
+                self.offsets[name] += int(lengths.sum())
+                self._write(name, 'heap', np.frombuffer(b''.join(encoded), dtype='uint8'))
+            elif kind == 'category':
+                # Chunk codes are mapped to codes of the categories seen in any chunk so far.
+                categories = self.categories[name]
+                local, uniques = pd.factorize(series.astype(object))
+                mapping = np.array([categories.setdefault(value, len(categories)) for value in uniques] + [-1],
+                                   dtype='int32')
+                self._write(name, 'codes', mapping[local])
+            elif kind == 'datetime':
+                self._write(name, 'values', pd.to_datetime(series).to_numpy(dtype='datetime64[us]'))
+            elif kind == 'float':
+                self._write(name, 'values', pd.to_numeric(series).to_numpy(dtype='float64', na_value=np.nan))
+            else:
+                nullable = 'Int64' if kind == 'int' else 'boolean'
+                self._write(name, 'values', series.astype(nullable).to_numpy(dtype=spec['dtype'], na_value=0))
+        self.rows += len(frame)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        for name, spec in self.columns.items():
+            if not spec['nullable']:
+                os.remove(os.path.join(self.path, f"{name}.valid.bin"))
+            if spec['kind'] == 'category':
+                spec['categories'] = list(self.categories[name])
+            if spec['kind'] == 'string' and (name, 'heap') not in self.files:
+                open(os.path.join(self.path, f"{name}.heap.bin"), 'wb').close()
+
+        ids = np.concatenate(self.ids) if self.ids else np.zeros(0, dtype='int64')
+        ids.tofile(os.path.join(self.path, 'ids.bin'))
+        # First row of each ID; later duplicates are only reachable by row.
+        order = np.argsort(ids, kind='stable')
+        sorted_ids, first = np.unique(ids[order], return_index=True)
+        first_rows = order[first]
+        dense = not len(ids) or (ids.min() >= 0 and ids.max() < DENSE_FACTOR * len(sorted_ids) + DENSE_SLACK)
+        if dense:
+            lookup = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype='int64')
+            lookup[sorted_ids] = first_rows
+        else:
+            lookup = first_rows.astype('int64')
+            sorted_ids.tofile(os.path.join(self.path, 'sorted_ids.bin'))
+        lookup.tofile(os.path.join(self.path, 'lookup.bin'))
+
+        meta = {'version': FORMAT_VERSION, 'rows': self.rows, 'index_name': self.index_name,
+                'index': 'dense' if dense else 'sorted', 'duplicate_ids': int(len(ids) - len(sorted_ids)),
+                'columns': self.columns}
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=1)
+
+
+def build_store(table_path, store_path, chunksize=CHUNKSIZE):
+    """
+    Builds a PersonStore from the wrangled table (wrangled_peerage.csv or .parquet),
+    reading it a chunk at a time. A CSV is read with wrangled_dtypes, so every chunk
+    gives each column the same storage kind.
+
+    Returns:
+        PersonStore: The new store.
+    """
+    read_kwargs = {}
+    if not table_path.endswith('.parquet'):
+        # Fixed dtypes, so that pandas does not infer a column's type afresh in each chunk.
+        names = pd.read_csv(table_path, nrows=0).columns
+        read_kwargs = {'index_col': 'ID', 'dtype': wrangled_dtypes(names)}
+    frames = (frame if frame.index.name == 'ID' else frame.set_index('ID')
+              for frame in iter_table(table_path, chunksize, **read_kwargs))
+    return PersonStore.build(frames, store_path)
+
+
+# --- Benchmark ---
+def bench_lookups(store_path, table_path, n_ids=1000, seed=0):
+    """
+    Times opening the store and gathering a few columns for `n_ids` random people,
+    against reading the whole table with read_table first.
+
+    Returns:
+        dict: Seconds for each step.
+    """
+    from table_io import read_table
+    timings = {}
+    start = time.perf_counter()
+    store = PersonStore(store_path)
+    timings['store_open'] = time.perf_counter() - start
+    ids = np.random.default_rng(seed).choice(np.asarray(store.ids), size=min(n_ids, len(store)), replace=False)
+    columns = [name for name in store.columns][:5]
+    start = time.perf_counter()
+    gathered = store.gather(ids, columns)
+    timings['store_gather'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    kwargs = {} if table_path.endswith('.parquet') else {'index_col': 'ID', 'low_memory': False}
+    table = read_table(table_path, **kwargs)
+    timings['table_read'] = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = table.loc[ids, columns]
+    timings['table_gather'] = time.perf_counter() - start
+    assert len(gathered) == len(expected)
+    return timings
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Build or query the memory-mapped person store.")
+    subparsers = argparser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Build a store from the wrangled table.")
+    build.add_argument('table', nargs='?', default='../data/thepeerage/wrangled/wrangled_peerage.csv')
+    build.add_argument('store', nargs='?', default='../data/thepeerage/wrangled/person_store')
+    build.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    get = subparsers.add_parser('get', help="Print the given people.")
+    get.add_argument('ids', type=int, nargs='+')
+    get.add_argument('--store', default='../data/thepeerage/wrangled/person_store')
+    get.add_argument('--columns', nargs='*', default=None)
+    bench = subparsers.add_parser('bench', help="Time lookups in the store against reading the table.")
+    bench.add_argument('table', nargs='?', default='../data/thepeerage/wrangled/wrangled_peerage.csv')
+    bench.add_argument('store', nargs='?', default='../data/thepeerage/wrangled/person_store')
+    bench.add_argument('--ids', type=int, default=1000)
+    args = argparser.parse_args()
+
+    if args.command == 'build':
+        store = build_store(args.table, args.store, chunksize=args.chunksize)
+        print(f"Built {args.store}: {len(store)} people, {len(store.columns)} columns, {store.meta['index']} index")
+    elif args.command == 'get':
+        with pd.option_context('display.max_columns', None, 'display.width', 200):
+            print(PersonStore(args.store).gather(args.ids, args.columns).T)
+    else:
+        for step, seconds in bench_lookups(args.store, args.table, n_ids=args.ids).items():
+            print(f"{step}: {seconds * 1000:.1f} ms")
@@ -0,0 +1,412 @@
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import subprocess
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from metrics import MetricsRecorder, METRICS_ENV, PROFILE_ENV, RUN_ENV
+from linkage import MATCH_PARAMETERS
+
+# --- Global Constants ---
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_DIR = '../data/pipeline'          # State, logs and cached artefacts, relative to src.
+STATE_FILE = os.path.join(PIPELINE_DIR, 'state.json')
+ARTEFACT_DIR = os.path.join(PIPELINE_DIR, 'artefacts')
+LOG_DIR = os.path.join(PIPELINE_DIR, 'logs')
+METRICS_FILE = os.path.join(PIPELINE_DIR, 'metrics.jsonl')  # Stage metrics of every run (see metrics.py).
+PROFILE_DIR = os.path.join(PIPELINE_DIR, 'profiles')       # cProfile dumps, with --profile.
+KEEP_ARTEFACTS = 3        # Cached output sets kept per stage, most recent first.
+HASH_BLOCK = 1 << 20      # Bytes read at a time when hashing files.
+WORKERS = 2               # Stages run at the same time.
+MATCH_OUTPUT_DIR = '../data/matched/pipeline'
+# The linkage 4_matching.ipynb saves next to the matched table (linkage.LINKAGE_DIR, as
+# written by Linkage.save), so `linkage.py update` starts from the run restored.
+LINKAGE_FILES = ['linkage.json', 'h_records.parquet', 'l_records.parquet', 'candidates.parquet',
+                 'features.parquet', 'matches.parquet']
+DEFAULT_TARGETS = ['match']
+
+
+def _path(path):
+    return os.path.normpath(os.path.join(SRC_DIR, path))
+
+
+# --- Stages ---
+class Stage:
+    """
+    One step of the workflow: a script or notebook in src, the files it reads and
+    writes (relative to src), and the parameters it is run with.
+
+    Parameters:
+        name (str): Stage name, used on the command line.
+        script (str): Python script or notebook to run.
+        inputs (list): Files read; produced by other stages or supplied by hand.
+        outputs (list): Files written, cached and restored by the runner.
+        parameters (dict): Command-line options of a script (True for a bare flag), or
+                           variables injected after the cell tagged 'parameters' of a notebook.
+        after (list): Stages that must run first.
+        manual (bool): Run only when named, never as another stage's dependency
+                       (the scraper crawls the live site for days).
+    """
+
+    def __init__(self, name, script, inputs=(), outputs=(), parameters=None, after=(), manual=False):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.parameters = dict(parameters or {})
+        self.after = list(after)
+        self.manual = manual
+
+    def command(self):
+        """
+        Returns the command that runs the stage from src.
+        """
+        if self.script.endswith('.ipynb'):
+            script = os.path.join(PIPELINE_DIR, 'scripts', self.name + '.py')
+            os.makedirs(_path(os.path.dirname(script)), exist_ok=True)
+            with open(_path(script), 'w', encoding='utf-8') as f:
+                f.write(notebook_script(_path(self.script), self.parameters))
+            return [sys.executable, script]
+        arguments = []
+        for key, value in self.parameters.items():
+            if value is True:
+                arguments.append(f"--{key}")
+            elif value is not False and value is not None:
+                arguments += [f"--{key}", str(value)]
+        return [sys.executable, self.script] + arguments
+
+
+def build_stages(match_parameters=None, scrape_update=True):
+    """
+    Declares the workflow: scrape -> wrangle thepeerage, wrangle Hollingsworth (in
+    parallel) -> match, with the exploratory notebook alongside matching.
+
+    thepeerage is wrangled by 1_thepeerage_wrangler_notebook.ipynb, which writes the
+    '_l' columns notebooks 3 and 4 read (1_thepeerage_wrangler.py writes the flagged
+    raw table instead). Hollingsworth is wrangled by 2_hollsingworth_wrangler.py, which
+    writes the same peers.csv as its notebook.
+
+    Parameters:
+        match_parameters (dict): Overrides of MATCH_PARAMETERS.
+        scrape_update (bool): Run the scraper with --update (an incremental recrawl).
+
+    Returns:
+        dict: Stage name -> Stage, in a valid run order.
+    """
+    raw = ['../data/thepeerage/raw/' + name + '.tsv' for name in ('entire_thepeerage', 'british_peers_and_orders',
+                                                                  'sources')]
+    wrangled = ['../data/thepeerage/wrangled/wrangled_peerage.csv', '../data/thepeerage/wrangled/wrangled_peerage.parquet']
+    peers = '../data/hollingsworth/wrangled/peers.csv'
+    stages = [
+        Stage('scrape', '0_thepeerage_scraper.py', outputs=raw, parameters={'update': scrape_update}, manual=True),
+        Stage('wrangle_thepeerage', '1_thepeerage_wrangler_notebook.ipynb', inputs=raw, outputs=wrangled,
+              after=['scrape']),
+        Stage('wrangle_hollingsworth', '2_hollsingworth_wrangler.py',
+              inputs=['../data/hollingsworth/tab/peersflatfile.tab'], outputs=[peers]),
+        Stage('match', '4_matching.ipynb', inputs=[peers] + wrangled,
+              outputs=[os.path.join(MATCH_OUTPUT_DIR, 'matched_hollingsworth_and_lundy.csv')]
+                      + [os.path.join(MATCH_OUTPUT_DIR, 'linkage', name) for name in LINKAGE_FILES],
+              parameters={**MATCH_PARAMETERS, **(match_parameters or {}), 'OUTPUT_DIR': MATCH_OUTPUT_DIR},
+              after=['wrangle_thepeerage', 'wrangle_hollingsworth']),
+        Stage('eda', '3_eda_of_both.ipynb', inputs=[peers] + wrangled, outputs=['FORENAME_COUNT.csv'],
+              after=['wrangle_thepeerage', 'wrangle_hollingsworth']),
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+def notebook_script(path, parameters):
+    """
+    Turns a notebook into a script: its code cells in order, with `parameters` assigned
+    right after the cell tagged 'parameters' (as papermill does), and IPython magics
+    and shell escapes commented out.
+    """
+    with open(path, encoding='utf-8') as f:
+        cells = [cell for cell in json.load(f)['cells'] if cell['cell_type'] == 'code']
+    injected = ''.join(f"{key} = {value!r}\n" for key, value in parameters.items())
+    parts = []
+    for cell in cells:
+        source = ''.join(cell['source'])
+        parts.append(re.sub(r'^(\s*[%!])', r'# \1', source, flags=re.MULTILINE))
+        if 'parameters' in cell.get('metadata', {}).get('tags', []) and injected:
+            parts.append('# Injected by pipeline.py\n' + injected)
+    if injected and not any('parameters' in cell.get('metadata', {}).get('tags', []) for cell in cells):
+        parts.insert(0, '# Injected by pipeline.py\n' + injected)
+    return '\n\n'.join(parts) + '\n'
+
+
+def plan(stages, targets):
+    """
+    Returns the stages needed for the targets in run order: the targets and,
+    transitively, the non-manual stages they run after.
+    """
+    needed = set()
+
+    def visit(name, named):
+        stage = stages[name]
+        if name in needed or (stage.manual and not named):
+            return
+        needed.add(name)
+        for before in stage.after:
+            visit(before, before in targets)
+
+    for name in targets:
+        visit(name, True)
+    return [name for name in stages if name in needed]
+
+
+# --- Fingerprints ---
+def local_modules(script, seen=None):
+    """
+    Returns the script and, recursively, the modules of src it imports.
+    """
+    seen = set() if seen is None else seen
+    if script in seen or not os.path.exists(_path(script)):
+        return seen
+    seen.add(script)
+    with open(_path(script), encoding='utf-8') as f:
+        text = f.read()
+    if script.endswith('.ipynb'):
+        text = '\n'.join(''.join(cell['source']) for cell in json.loads(text)['cells'] if cell['cell_type'] == 'code')
+    for module in re.findall(r'^\s*(?:from|import)\s+(\w+)', text, flags=re.MULTILINE):
+        local_modules(module + '.py', seen)
+    return seen
+
+
+class Fingerprinter:
+    """
+    SHA-256 of files, remembered by (size, modification time) so unchanged inputs of
+    several GB are hashed once. Notebooks are hashed on their code cells only, so
+    rerunning one (which rewrites its outputs) does not change its fingerprint.
+
+    Parameters:
+        known (dict): Path -> [size, mtime_ns, digest], as saved in the state file.
+    """
+
+    def __init__(self, known=None):
+        self.known = dict(known or {})
+        self.lock = threading.Lock()
+
+    def file(self, path):
+        status = os.stat(_path(path))
+        key = [status.st_size, status.st_mtime_ns]
+        with self.lock:
+            cached = self.known.get(path)
+        if cached is not None and cached[:2] == key:
+            return cached[2]
+        digest = hashlib.sha256()
+        if path.endswith('.ipynb'):
+            with open(_path(path), encoding='utf-8') as f:
+                cells = [(cell['cell_type'], ''.join(cell['source'])) for cell in json.load(f)['cells']]
+            digest.update(json.dumps(cells).encode())
+        else:
+            with open(_path(path), 'rb') as f:
+                for block in iter(lambda: f.read(HASH_BLOCK), b''):
+                    digest.update(block)
+        with self.lock:
+            self.known[path] = key + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def stage(self, stage):
+        """
+        Fingerprint of a stage: its code (script and imported modules), parameters and
+        the contents of its inputs.
+        """
+        record = {
+            'name': stage.name,
+            'code': {path: self.file(path) for path in sorted(local_modules(stage.script))},
+            'parameters': stage.parameters,
+            'inputs': {path: self.file(path) for path in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()[:16]
+
+
+# --- Runner ---
+class PipelineRunner:
+    """
+    Runs stages in dependency order, up to `workers` at a time, skipping those whose
+    fingerprint matches the last run and restoring cached outputs of earlier runs with
+    the same fingerprint (e.g. after switching matching weights back).
+
+    Parameters:
+        stages (dict): Stage name -> Stage, from build_stages.
+        workers (int): Stages run at the same time.
+        force (set): Stages run even when cached.
+        profile (bool): Have the scripts dump a cProfile of each of their stages into PROFILE_DIR.
+    """
+
+    def __init__(self, stages, workers=WORKERS, force=(), profile=False):
+        self.stages = stages
+        self.workers = workers
+        self.force = set(force)
+        self.profile = profile
+        # The scripts append their own stage records to the same file under this run ID.
+        self.metrics = MetricsRecorder(_path(METRICS_FILE), run=f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}")
+        self.state = {'files': {}, 'stages': {}}
+        if os.path.exists(_path(STATE_FILE)):
+            with open(_path(STATE_FILE)) as f:
+                self.state = json.load(f)
+        self.fingerprints = Fingerprinter(self.state['files'])
+        self.lock = threading.Lock()
+
+    def _save(self):
+        with self.lock:
+            self.state['files'] = self.fingerprints.known
+            os.makedirs(_path(PIPELINE_DIR), exist_ok=True)
+            with open(_path(STATE_FILE) + '.tmp', 'w') as f:
+                json.dump(self.state, f, indent=1, sort_keys=True)
+            os.replace(_path(STATE_FILE) + '.tmp', _path(STATE_FILE))
+
+    def _artefacts(self, stage, fingerprint):
+        return _path(os.path.join(ARTEFACT_DIR, stage.name, fingerprint))
+
+    def status(self, stage):
+        """
+        Returns (fingerprint, 'cached', 'restorable' or 'stale') for a stage whose
+        inputs exist, or (None, 'waiting') when an input is still to be produced.
+        """
+        if not all(os.path.exists(_path(path)) for path in stage.inputs):
+            return None, 'waiting'
+        fingerprint = self.fingerprints.stage(stage)
+        if stage.name in self.force:
+            return fingerprint, 'stale'
+        last = self.state['stages'].get(stage.name, {})
+        if (last.get('fingerprint') == fingerprint and all(os.path.exists(_path(path)) for path in stage.outputs)
+                and all(self.fingerprints.file(path) == digest for path, digest in last['outputs'].items())):
+            return fingerprint, 'cached'
+        stored = self._artefacts(stage, fingerprint)
+        if all(os.path.exists(os.path.join(stored, str(i))) for i in range(len(stage.outputs))):
+            return fingerprint, 'restorable'
+        return fingerprint, 'stale'
+
+    def _store(self, stage, fingerprint):
+        stored = self._artefacts(stage, fingerprint)
+        os.makedirs(stored, exist_ok=True)
+        for i, path in enumerate(stage.outputs):
+            shutil.copy2(_path(path), os.path.join(stored, str(i)))
+        runs = sorted(os.scandir(os.path.dirname(stored)), key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in runs[KEEP_ARTEFACTS:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _restore(self, stage, fingerprint):
+        stored = self._artefacts(stage, fingerprint)
+        for i, path in enumerate(stage.outputs):
+            os.makedirs(os.path.dirname(_path(path)), exist_ok=True)
+            shutil.copy2(os.path.join(stored, str(i)), _path(path))
+        os.utime(stored)
+
+    def _execute(self, stage, fingerprint):
+        os.makedirs(_path(LOG_DIR), exist_ok=True)
+        for path in stage.outputs:
+            os.makedirs(os.path.dirname(_path(path)), exist_ok=True)
+        log = _path(os.path.join(LOG_DIR, stage.name + '.log'))
+        env = {**os.environ, 'MPLBACKEND': 'Agg',  # Notebook scripts live outside src.
+               'PYTHONPATH': os.pathsep.join(filter(None, [SRC_DIR, os.environ.get('PYTHONPATH')])),
+               METRICS_ENV: _path(METRICS_FILE), RUN_ENV: self.metrics.run}
+        if self.profile:
+            env[PROFILE_ENV] = _path(PROFILE_DIR)
+        with open(log, 'w') as f:
+            subprocess.run(stage.command(), cwd=SRC_DIR, stdout=f, stderr=subprocess.STDOUT, check=True, env=env)
+        missing = [path for path in stage.outputs if not os.path.exists(_path(path))]
+        if missing:
+            raise FileNotFoundError(f"{stage.name} did not write {missing}")
+        self._store(stage, fingerprint)
+
+    def _run(self, name):
+        stage = self.stages[name]
+        fingerprint, status = self.status(stage)
+        if status == 'waiting':
+            missing = [path for path in stage.inputs if not os.path.exists(_path(path))]
+            raise FileNotFoundError(f"{name} is missing inputs {missing}")
+        start = time.perf_counter()
+        with self.metrics.stage(f'pipeline.{name}') as record:
+            if status == 'restorable':
+                self._restore(stage, fingerprint)
+                status = 'restored'
+            elif status == 'stale':
+                self._execute(stage, fingerprint)
+                status = 'ran'
+            record.update(status=status)
+        outputs = {path: self.fingerprints.file(path) for path in stage.outputs}
+        with self.lock:
+            self.state['stages'][name] = {'fingerprint': fingerprint, 'outputs': outputs,
+                                          'seconds': round(time.perf_counter() - start, 3)}
+        self._save()
+        return status
+
+    def run(self, names):
+        """
+        Runs the named stages (in plan order), each once its predecessors in `names` are done.
+
+        Returns:
+            dict: Stage name -> 'cached', 'restored', 'ran', 'failed' or 'skipped'
+                  (a predecessor failed).
+        """
+        results = {}
+        pending = list(names)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    before = [b for b in self.stages[name].after if b in names]
+                    if any(results.get(b) in ('failed', 'skipped') for b in before):
+                        results[name] = 'skipped'
+                        pending.remove(name)
+                        print(f"[{name}] skipped")
+                    elif all(b in results for b in before):
+                        print(f"[{name}] starting")
+                        running[pool.submit(self._run, name)] = name
+                        pending.remove(name)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except subprocess.CalledProcessError as error:
+                        results[name] = 'failed'
+                        print(f"[{name}] failed with exit status {error.returncode}, "
+                              f"see {os.path.join(LOG_DIR, name + '.log')}")
+                    except Exception as error:
+                        results[name] = 'failed'
+                        print(f"[{name}] failed: {error}")
+                    else:
+                        print(f"[{name}] {results[name]}")
+        return results
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Run the workflow, reusing cached stage outputs when nothing upstream changed.")
+    argparser.add_argument('stages', nargs='*', default=DEFAULT_TARGETS,
+                           help="Stages to bring up to date (with the stages they depend on); 'scrape' "
+                                "only runs when named. Default: match.")
+    argparser.add_argument('--workers', type=int, default=WORKERS, help="Stages run at the same time.")
+    argparser.add_argument('--force', nargs='*', default=[], help="Stages to rerun even when cached.")
+    argparser.add_argument('--dry-run', action='store_true', help="Only print the plan and each stage's status.")
+    argparser.add_argument('--profile', action='store_true',
+                           help=f"Dump a cProfile of every script stage into {PROFILE_DIR}.")
+    for key, value in MATCH_PARAMETERS.items():
+        argparser.add_argument('--' + key.lower().replace('_', '-'), type=float, default=value,
+                               help=f"Matching parameter {key} (default {value}).")
+    args = argparser.parse_args()
+
+    stages = build_stages({key: getattr(args, key.lower()) for key in MATCH_PARAMETERS})
+    unknown = set(args.stages) - set(stages)
+    if unknown:
+        argparser.error(f"unknown stages {sorted(unknown)}; choose from {list(stages)}")
+    names = plan(stages, args.stages)
+    runner = PipelineRunner(stages, workers=args.workers, force=args.force, profile=args.profile)
+    if args.dry_run:
+        for name in names:
+            print(f"{name}: {runner.status(stages[name])[1]}")
+    else:
+        results = runner.run(names)
+        sys.exit(1 if any(result in ('failed', 'skipped') for result in results.values()) else 0)
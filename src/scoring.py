@@ -0,0 +1,136 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from jellyfish import jaro_winkler_similarity
+
+# --- Defaults ---
+STRING_COLUMNS = ['forename', 'surname']
+# Score column -> (year column, score when either year is missing), as in 4_matching.ipynb.
+YEAR_SCORES = {'year_score': ('born_year', 0.0), 'died_year_score': ('died_year', np.nan)}
+CHUNK_SIZE = 1000000       # Candidate pairs scored at a time.
+KERNEL_BATCH = 20000       # Distinct name pairs per Jaro-Winkler batch sent to a worker.
+NAME_PAIR_CACHE = 5000000  # Distinct name pairs whose scores are kept between chunks.
+
+
+# --- Kernel ---
+def _jaro_winkler_batch(pairs):
+    """
+    Jaro-Winkler similarity of each (left name, right name) pair; runs in a worker
+    process when score_candidates is given several workers.
+    """
+    return [jaro_winkler_similarity(left, right) for left, right in pairs]
+
+
+def year_score(left_years, right_years, missing):
+    """
+    1 for equal years, falling linearly to 0 ten years apart; `missing` where either is absent.
+    """
+    return np.where(np.isnan(left_years) | np.isnan(right_years), missing,
+                    (1 - np.abs(left_years - right_years) / 10).clip(0, 1))
+
+
+class NameColumn:
+    """
+    One name column of both tables, interned: every record holds the code of its name
+    in a vocabulary of distinct names, so a similarity is computed once per distinct
+    (left name, right name) pair however many record pairs share it.
+
+    Parameters:
+        left (pd.Series): The column in the left table.
+        right (pd.Series): The column in the right table.
+    """
+
+    def __init__(self, left, right):
+        self.left_codes, self.left_names = pd.factorize(left)
+        self.right_codes, self.right_names = pd.factorize(right)
+        self.cache = {}
+
+    def scores(self, left_positions, right_positions, pool=None):
+        """
+        Jaro-Winkler similarity of the names of the given record pairs, 0 where either
+        name is missing (the recordlinkage default).
+
+        Parameters:
+            left_positions, right_positions (np.ndarray): Record positions in each table.
+            pool (ProcessPoolExecutor or None): Pool to run the kernel in.
+
+        Returns:
+            np.ndarray: One score per record pair.
+        """
+        left, right = self.left_codes[left_positions], self.right_codes[right_positions]
+        valid = (left >= 0) & (right >= 0)
+        keys = left[valid].astype('int64') * len(self.right_names) + right[valid]
+        distinct, inverse = np.unique(keys, return_inverse=True)
+
+        known = np.array([self.cache.get(key, np.nan) for key in distinct.tolist()], dtype='float64')
+        todo = distinct[np.isnan(known)]
+        if len(todo):
+            left_todo, right_todo = np.divmod(todo, len(self.right_names))
+            pairs = list(zip(self.left_names[left_todo], self.right_names[right_todo]))
+            batches = [pairs[i:i + KERNEL_BATCH] for i in range(0, len(pairs), KERNEL_BATCH)]
+            results = pool.map(_jaro_winkler_batch, batches) if pool is not None else map(_jaro_winkler_batch, batches)
+            computed = np.fromiter((score for batch in results for score in batch), dtype='float64', count=len(pairs))
+            known[np.isnan(known)] = computed
+            if len(self.cache) + len(todo) > NAME_PAIR_CACHE:
+                self.cache.clear()
+            self.cache.update(zip(todo.tolist(), computed.tolist()))
+
+        scores = np.zeros(len(left_positions))
+        scores[valid] = known[inverse]
+        return scores
+
+
+def score_candidates(candidates, df_left, df_right, string_columns=STRING_COLUMNS, year_scores=YEAR_SCORES,
+                     chunk_size=CHUNK_SIZE, workers=1, keep=None):
+    """
+    Builds the `features` frame of step 3 of 4_matching.ipynb: a Jaro-Winkler score per
+    name column and the year scores, for every candidate pair.
+
+    Names are interned per table and each distinct name pair is scored once (in batches,
+    in a process pool with several workers); year scores are positional gathers from
+    NumPy arrays. Candidates are scored a chunk at a time, and with `keep` only the pairs
+    passing it are retained from each chunk, which bounds memory to one chunk plus the
+    survivors.
+
+    Parameters:
+        candidates (pd.MultiIndex): (left label, right label) candidate pairs.
+        df_left, df_right (pd.DataFrame): The two tables, indexed by those labels.
+        string_columns (list): Name columns compared with Jaro-Winkler.
+        year_scores (dict): Score column -> (year column, score when a year is missing).
+        chunk_size (int): Candidate pairs scored at a time.
+        workers (int): Processes running the string kernel; 1 runs it in this process.
+        keep (callable or None): Maps a chunk of features to a boolean mask of pairs to keep.
+
+    Returns:
+        pd.DataFrame: Indexed by the (kept) candidate pairs, with '<column>_score' for
+                      each string column and the year score columns.
+    """
+    names = {column: NameColumn(df_left[column], df_right[column]) for column in string_columns}
+    years = {label: (df_left[column].to_numpy(dtype='float64', na_value=np.nan),
+                     df_right[column].to_numpy(dtype='float64', na_value=np.nan), missing)
+             for label, (column, missing) in year_scores.items()}
+    left_positions = df_left.index.get_indexer(candidates.get_level_values(0))
+    right_positions = df_right.index.get_indexer(candidates.get_level_values(1))
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        chunks = []
+        for start in range(0, len(candidates), chunk_size):
+            left, right = left_positions[start:start + chunk_size], right_positions[start:start + chunk_size]
+            chunk = pd.DataFrame(index=candidates[start:start + chunk_size])
+            for column, interned in names.items():
+                chunk[f'{column}_score'] = interned.scores(left, right, pool)
+            for label, (left_years, right_years, missing) in years.items():
+                chunk[label] = year_score(left_years[left], right_years[right], missing)
+            if keep is not None:
+                chunk = chunk[np.asarray(keep(chunk), dtype=bool)]
+            chunks.append(chunk)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if not chunks:
+        columns = [f'{column}_score' for column in string_columns] + list(year_scores)
+        return pd.DataFrame(columns=columns, index=candidates[:0], dtype='float64')
+    return pd.concat(chunks)
+
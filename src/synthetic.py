@@ -0,0 +1,464 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+from narrative import EDUCATION_CATEGORIES, NARRATIVE_CATEGORIES, narrative_features
+
+# --- Defaults ---
+PEOPLE_PER_PAGE = 10           # People on one p<page>.htm page of thepeerage.com.
+FIRST_YEAR, LAST_YEAR = 1450, 1990
+LAST_DEATH_YEAR = 2024         # People dying later are still alive: no death date.
+PEER_FRACTION = 0.05           # People holding at least one title.
+FATHER_RATE, MOTHER_RATE = 0.75, 0.5
+DANGLING_CHILD_RATE = 0.01     # Child links to IDs that are not in the table.
+HOLLINGSWORTH_EXTRA = 0.1      # Hollingsworth rows with no counterpart in thepeerage.
+HOLLINGSWORTH_YEARS = (1550, 1940)
+SOURCES_PER_PAGE = 50
+
+FORENAMES = {
+    'M': ['John', 'William', 'Thomas', 'George', 'James', 'Charles', 'Henry', 'Robert', 'Richard', 'Edward',
+          'Francis', 'Arthur', 'Frederick', 'Alexander', 'David', 'Hugh', 'Edmund', 'Walter', 'Archibald',
+          'Algernon', 'Ralph', 'Humphrey', 'Philip', 'Nicholas', 'Christopher', 'Anthony', 'Peter', 'Michael',
+          'Gerald', 'Reginald', 'Cecil', 'Lionel', 'Roger', 'Geoffrey', 'Gilbert', 'Jasper', 'Rupert', 'Aubrey',
+          'Evelyn', 'Patrick', 'Andrew', 'Samuel', 'Benjamin', 'Stephen', 'Matthew', 'Lancelot', 'René', 'José'],
+    'F': ['Mary', 'Elizabeth', 'Anne', 'Jane', 'Margaret', 'Catherine', 'Frances', 'Charlotte', 'Sarah',
+          'Louisa', 'Caroline', 'Harriet', 'Emily', 'Georgiana', 'Isabella', 'Alice', 'Lucy', 'Susan', 'Eleanor',
+          'Dorothy', 'Agnes', 'Joan', 'Helen', 'Victoria', 'Augusta', 'Constance', 'Cecilia', 'Rose', 'Violet',
+          'Edith', 'Evelyn', 'Sophia', 'Henrietta', 'Maria', 'Amelia', 'Penelope', 'Diana', 'Julia', 'Grace',
+          'Matilda', 'Beatrice', 'Winifred', 'Honora', 'Zoë', 'Hélène', 'Renée', 'Marië', 'Ethel'],
+}
+SYLLABLES = ['ash', 'ber', 'cav', 'den', 'dish', 'ford', 'grey', 'ham', 'how', 'ing', 'ley', 'lyn', 'mont', 'mor',
+             'nor', 'ton', 'pel', 'per', 'ris', 'ros', 'sel', 'shaw', 'stan', 'tal', 'ter', 'thw', 'ver', 'wick',
+             'wood', 'worth', 'bot', 'car', 'dal', 'fitz', 'gar', 'har', 'kel', 'lan', 'mer', 'wal']
+HONORIFICS = ['Sir', 'Lt Col', 'Rev.', 'Hon.', 'Capt.', 'Dr.', 'Lady', 'Admiral']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+# Share of born/died strings written in each form, from the true date: '{d}', '{month}'
+# and '{y}', '{y1}' the next year and '{yy1}' its last two digits (old/new style years).
+DATE_FORMATS = {
+    '{d} {month} {y}': 0.36,
+    '{month} {y}': 0.08,
+    '{y}': 0.2,
+    'circa {y}': 0.12,
+    'before {y}': 0.04,
+    'after {d} {month} {y}': 0.02,
+    '{y}/{yy1}': 0.03,
+    '{d} {month} {y}/{yy1}': 0.02,
+    '{y} or {y1}': 0.01,
+    'say {y}': 0.005,
+    'unknown': 0.005,
+    '': 0.1,
+}
+# Types of british_peers_and_orders.tsv (TYPES_OF_LORD of the scraper), with their share
+# of title holders and, for the peerage ranks, the style and Hollingsworth parent code.
+PEER_TYPES = {
+    'baronet': 0.3, 'baron': 0.22, 'earl': 0.1, 'viscount': 0.06, 'marquess': 0.03, 'duke': 0.02,
+    'life_peer': 0.08, 'baron_by_writ': 0.03, 'law_lord': 0.02, 'scot_law_lord': 0.01, 'jacobite': 0.02,
+    'feudal': 0.06, 'clan_chief': 0.05,
+}
+PEERAGE_STYLES = {'duke': ('Duke', 'D'), 'marquess': ('Marquess', 'M'), 'earl': ('Earl', 'E'),
+                  'viscount': ('Viscount', 'V'), 'baron': ('Baron', 'B')}
+HOLLINGSWORTH_COLUMNS = ['Surname', 'First Names', 'Title', 'peers_Sex', 'B Day', 'B Month', 'B Year', 'B Acc',
+                         'D Day', 'D Month', 'D Year', 'D Acc', 'Parent', 'Parental Title']
+# Narrative sentences; the category phrases of narrative.py are mixed in at random.
+FILLER = ['He was the son of', 'She married', 'He was educated at', 'He held the office of',
+          'He fought in the', 'She was the daughter of', 'He was appointed', 'on 12 March 1702',
+          'Sir John Smith, 1st Bt.', 'and had issue', 'He lived at', 'in Dorset, England.']
+
+
+def synthetic_narratives(n_people, seed=0, rng=None):
+    """
+    Builds narratives of 3 to 12 filler sentences, a few of which mention phrases of
+    the categories (schools, universities, regiments, ...); 30% of people have none ('N/A').
+    """
+    rng = np.random.default_rng(seed) if rng is None else rng
+    phrases = [phrase for values in NARRATIVE_CATEGORIES.values() for phrase in values]
+    phrases += ['Oxford University', 'University of Cambridge', 'Christ Church, Oxford']
+    sentences = np.array(FILLER + [f'He was at {phrase}.' for phrase in phrases], dtype=object)
+    weights = np.r_[np.full(len(FILLER), 20.0), np.ones(len(phrases))]
+    lengths = rng.integers(3, 13, n_people)
+    picks = rng.choice(sentences, size=lengths.sum(), p=weights / weights.sum())
+    narr = pd.Series([' '.join(chunk) for chunk in np.split(picks, np.cumsum(lengths)[:-1])], dtype=object)
+    narr[rng.random(n_people) < 0.3] = 'N/A'
+    return narr
+
+
+def _zipf_choice(rng, values, size, exponent=1.0):
+    weights = 1.0 / np.arange(1, len(values) + 1) ** exponent
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+def _ordinal(n):
+    suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f'{n}{suffix}'
+
+
+def date_strings(year, month, day, forms):
+    """
+    Writes dates as thepeerage does once the scraper has lower-cased them ('12 march 1700',
+    'circa 1700', '1700/01', ...), in one form of DATE_FORMATS per date.
+
+    Parameters:
+        year, month, day (np.ndarray): The dates; rows with a missing year give ''.
+        forms (np.ndarray): Index into DATE_FORMATS of each date.
+
+    Returns:
+        np.ndarray: The date strings (object).
+    """
+    out = np.full(len(year), '', dtype=object)
+    known = ~np.isnan(year)
+    for i, template in enumerate(DATE_FORMATS):
+        rows = np.flatnonzero((forms == i) & known)
+        if not len(rows) or not template:
+            continue
+        out[rows] = [template.format(d=d, month=MONTHS[m - 1].lower(), y=y, y1=y + 1, yy1=f'{(y + 1) % 100:02d}')
+                     for d, m, y in zip(day[rows].astype('int64'), month[rows].astype('int64'),
+                                        year[rows].astype('int64'))]
+    return out
+
+
+# --- Generator ---
+class SyntheticGenealogy:
+    """
+    A seeded synthetic population shaped like the project's inputs, for benchmarking and
+    trying the pipeline without crawling thepeerage.com:
+
+    - `raw`: rows of entire_thepeerage.tsv (PERSON_FIELDS), with messy lower-cased
+      born/died strings, honorifics, diacritics and ';'-joined child links (some dangling);
+    - `peers`: rows of british_peers_and_orders.tsv (type, id), some people holding
+      several titles and a few IDs missing from `raw`;
+    - `sources`: rows of sources.tsv;
+    - `hollingsworth`: rows of peersflatfile.tab for the children of peers (and extra
+      people thepeerage does not have), with noisy dates and spellings and some duplicates;
+    - `true_matches`: the thepeerage ID behind each Hollingsworth row (<NA> for the extras);
+    - `pages()`: thepeerage-style HTML pages of `div.itp` blocks that parse back to `raw`.
+
+    The same seed and size always give the same data.
+
+    Parameters:
+        n_people (int): Number of people in thepeerage tables.
+        seed (int): Seed of the random generator.
+    """
+
+    def __init__(self, n_people, seed=0):
+        self.n_people = n_people
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._people(rng)
+        self._families(rng)
+        self._titles(rng)
+        self.raw = self._raw_table(rng)
+        self.hollingsworth, self.true_matches = self._hollingsworth(rng)
+
+    # --- People ---
+    def _people(self, rng):
+        n = self.n_people
+        self.ids = np.cumsum(rng.integers(1, 4, n)) + 10000
+        self.gender = np.where(rng.random(n) < 0.52, 'M', 'F').astype(object)
+        # More people are recorded in later centuries.
+        self.born_year = np.floor(FIRST_YEAR + (LAST_YEAR - FIRST_YEAR) * rng.beta(2.5, 1.3, n))
+        self.born_month = rng.integers(1, 13, n).astype('float64')
+        self.born_day = rng.integers(1, 29, n).astype('float64')
+        age = np.where(rng.random(n) < 0.15, rng.integers(0, 6, n), np.clip(rng.normal(62, 17, n), 6, 100))
+        died_year = self.born_year + np.floor(age)
+        self.died_year = np.where(died_year <= LAST_DEATH_YEAR, died_year, np.nan)
+        self.died_month = rng.integers(1, 13, n).astype('float64')
+        self.died_day = rng.integers(1, 29, n).astype('float64')
+
+        forenames = np.empty(n, dtype=object)
+        for gender, names in FORENAMES.items():
+            rows = np.flatnonzero(self.gender == gender)
+            first = _zipf_choice(rng, names, len(rows), exponent=0.8)
+            middle = _zipf_choice(rng, names, len(rows), exponent=0.8)
+            has_middle = rng.random(len(rows)) < 0.35
+            forenames[rows] = np.where(has_middle, first + ' ' + middle, first)
+        self.forenames = forenames
+
+        n_surnames = max(200, n // 40)
+        parts = rng.integers(0, len(SYLLABLES), (n_surnames * 2, 3))
+        lengths = rng.integers(2, 4, n_surnames * 2)
+        pool = pd.unique(np.array([''.join(SYLLABLES[p] for p in row[:k]).capitalize()
+                                   for row, k in zip(parts, lengths)], dtype=object))[:n_surnames]
+        self.surname = _zipf_choice(rng, pool, n, exponent=0.6)
+        double = rng.random(n) < 0.02
+        self.surname[double] = self.surname[double] + '-' + _zipf_choice(rng, pool, int(double.sum()), 0.6)
+
+    def _families(self, rng):
+        """
+        Gives people fathers and mothers born 18 to 50 years before them; children take
+        their father's surname.
+        """
+        n = self.n_people
+        self.father = np.full(n, -1)
+        self.mother = np.full(n, -1)
+        for gender, parent, rate in [('M', self.father, FATHER_RATE), ('F', self.mother, MOTHER_RATE)]:
+            candidates = np.flatnonzero(self.gender == gender)
+            candidates = candidates[np.argsort(self.born_year[candidates], kind='stable')]
+            years = self.born_year[candidates]
+            wanted = self.born_year - rng.integers(18, 51, n)
+            chosen = np.searchsorted(years, wanted, side='right') - 1 - rng.integers(0, 3, n)
+            ok = (chosen >= 0) & (rng.random(n) < rate)
+            chosen = np.clip(chosen, 0, None)
+            ok &= years[chosen] <= self.born_year - 15
+            parent[ok] = candidates[chosen[ok]]
+
+        # Surnames descend from the father's line: follow fathers to the first ancestor
+        # that does not pass his surname on (pointer jumping, log(depth) steps).
+        inherits = (self.father >= 0) & (rng.random(n) < 0.9)
+        root = np.where(inherits, self.father, np.arange(n))
+        while True:
+            jumped = root[root]
+            if np.array_equal(jumped, root):
+                break
+            root = jumped
+        self.surname = self.surname[root]
+
+    def _titles(self, rng):
+        """
+        Draws the title holders (mostly men born before 1930), their types and the
+        peerage style of the title shown after their name.
+        """
+        n = self.n_people
+        eligible = np.flatnonzero((self.born_year < 1930) & (rng.random(n) < np.where(self.gender == 'M', 1.0, 0.1)))
+        holders = rng.choice(eligible, size=min(len(eligible), int(n * PEER_FRACTION)), replace=False)
+        types = list(PEER_TYPES)
+        weights = np.array(list(PEER_TYPES.values()))
+        first = rng.choice(len(types), size=len(holders), p=weights / weights.sum())
+        second_holders = holders[rng.random(len(holders)) < 0.1]
+        second = rng.choice(len(types), size=len(second_holders), p=weights / weights.sum())
+        rows = pd.DataFrame({'type': np.array(types, dtype=object)[np.r_[first, second]],
+                             'position': np.r_[holders, second_holders]}).drop_duplicates()
+
+        self.peer_type = np.full(n, '', dtype=object)
+        self.peer_type[rows['position'].to_numpy()[::-1]] = rows['type'].to_numpy()[::-1]
+        title = np.full(n, 'N/A', dtype=object)
+        ordinals = rng.integers(1, 13, n)
+        for peer_type, (style, _) in PEERAGE_STYLES.items():
+            held = np.flatnonzero(self.peer_type == peer_type)
+            title[held] = [f'{_ordinal(k)} {style} of {place}' for k, place in zip(ordinals[held], self.surname[held])]
+        baronets = np.flatnonzero(self.peer_type == 'baronet')
+        title[baronets] = [f'{_ordinal(k)} Bt.' for k in ordinals[baronets]]
+        self.title = title
+
+        # As the crawl lists them: one index page per type, and a few stale IDs.
+        peers = pd.DataFrame({'type': rows['type'].to_numpy(), 'id': self.ids[rows['position'].to_numpy()]})
+        stale = pd.DataFrame({'type': rng.choice(types, size=max(1, len(peers) // 200)),
+                              'id': self.ids[-1] + rng.integers(1, 1000, max(1, len(peers) // 200))})
+        order = {peer_type: i for i, peer_type in enumerate(types)}
+        peers = pd.concat([peers, stale], ignore_index=True)
+        self.peers = peers.sort_values('type', key=lambda t: t.map(order), kind='stable').reset_index(drop=True)
+
+    # --- thepeerage ---
+    def _raw_table(self, rng):
+        n = self.n_people
+        weights = np.array(list(DATE_FORMATS.values()))
+        born = date_strings(self.born_year, self.born_month, self.born_day,
+                            rng.choice(len(weights), size=n, p=weights / weights.sum()))
+        died = date_strings(self.died_year, self.died_month, self.died_day,
+                            rng.choice(len(weights), size=n, p=weights / weights.sum()))
+
+        fullname = self.forenames + ' ' + self.surname
+        prefixed = rng.random(n) < 0.04
+        fullname[prefixed] = _zipf_choice(rng, HONORIFICS, int(prefixed.sum())) + ' ' + fullname[prefixed]
+        formerly = rng.random(n) < 0.005
+        fullname[formerly] = fullname[formerly] + ' formerly ' + self.surname[rng.integers(0, n, int(formerly.sum()))]
+
+        # Children are listed in order of birth on each parent's entry.
+        parents = np.r_[self.father, self.mother]
+        children = np.r_[np.arange(n), np.arange(n)]
+        linked = parents >= 0
+        edges = pd.DataFrame({'parent': parents[linked], 'child': self.ids[children[linked]].astype(str),
+                              'year': self.born_year[children[linked]]})
+        dangling = rng.choice(n, size=int(n * DANGLING_CHILD_RATE))
+        edges = pd.concat([edges, pd.DataFrame({'parent': dangling,
+                                                'child': (self.ids[-1] + 1000 + np.arange(len(dangling))).astype(str),
+                                                'year': np.inf})])
+        edges = edges.sort_values(['parent', 'year'], kind='stable')
+        child = np.full(n, 'N/A', dtype=object)
+        joined = edges.groupby('parent', sort=False)['child'].agg(';'.join)
+        child[joined.index.to_numpy()] = joined.to_numpy()
+
+        narr = synthetic_narratives(n, rng=rng)
+        education = narrative_features(narr, EDUCATION_CATEGORIES)
+        edited = rng.random(n) < 0.8
+        lastedit = np.where(edited, pd.Series(pd.to_datetime('2003-01-01') + pd.to_timedelta(
+            rng.integers(0, 8000, n), unit='D')).dt.strftime('%d %b %Y').to_numpy(dtype=object), 'N/A')
+        n_sources = rng.integers(0, 4, n)
+        source_ids = rng.integers(1, max(2, n // 20), n_sources.sum())
+        sources = [';'.join(f'S{s}' for s in chunk)
+                   for chunk in np.split(source_ids, np.cumsum(n_sources)[:-1])]
+
+        return pd.DataFrame({
+            'Page': ((self.ids - 1) // PEOPLE_PER_PAGE + 1).astype(str),
+            'ID': self.ids.astype(str),
+            'fullname': fullname,
+            'title': self.title,
+            'gender': self.gender,
+            'born': np.where(born == '', 'N/A', born),
+            'died': np.where(died == '', 'N/A', died),
+            'narr': narr.to_numpy(),
+            'clarendon': education['clarendon'].to_numpy(dtype='int64'),
+            'oxbridge': education['oxbridge'].to_numpy(),
+            'child': child,
+            'lastedit': lastedit,
+            'sources': sources,
+        })
+
+    @property
+    def sources(self):
+        """
+        Rows of sources.tsv for every source ID cited in `raw`.
+        """
+        cited = self.raw['sources'].str.split(';').explode()
+        ids = np.sort(cited[cited.fillna('') != ''].str[1:].astype('int64').unique())
+        return pd.DataFrame({'Page': (ids - 1) // SOURCES_PER_PAGE + 1, 'SourceID': [f'S{i}' for i in ids],
+                             'Source': [f'[S{i}] Synthetic source {i}.' for i in ids]})
+
+    def person_html(self, row, person):
+        """
+        The `div.itp` block of one person, as laid out on thepeerage.com person pages.
+
+        Parameters:
+            row (int): Position of the person in `raw`.
+            person (dict): That row of `raw`.
+        """
+        name = person['fullname'] + ('' if person['title'] == 'N/A' else ', ' + person['title'])
+        traits = [person['gender'], '#' + person['ID']]
+        for prefix, column, month in [('b.', 'born', self.born_month), ('d.', 'died', self.died_month)]:
+            if person[column] != 'N/A':
+                # Month names are capitalised on the site; the scraper lower-cases them.
+                month_name = MONTHS[int(month[row]) - 1]
+                traits.append(f'{prefix} {person[column].replace(month_name.lower(), month_name)}')
+        html = [f'<div class="itp" id="i{person["ID"]}">',
+                f'<h2 class="sn sect-sn"><a name="i{person["ID"]}"></a>{name}<sup>1</sup></h2>',
+                f'<div class="sinfo sect-ls">{", ".join(traits)}</div>']
+        if person['narr'] != 'N/A':
+            html.append(f'<div class="narr">{person["narr"]}</div>')
+        if person['child'] != 'N/A':
+            html.append(f'<p>Children of {person["fullname"]}</p><ul>')
+            for child in person['child'].split(';'):
+                page = (int(child) - 1) // PEOPLE_PER_PAGE + 1
+                html.append(f'<li><a href="p{page}.htm#i{child}">Child {child}</a></li>')
+            html.append('</ul>')
+        for source in filter(None, person['sources'].split(';')):
+            page = (int(source[1:]) - 1) // SOURCES_PER_PAGE + 1
+            html.append(f'<a href="s{page}.htm#{source.lower()}">{source}</a>')
+        if person['lastedit'] != 'N/A':
+            html.append(f'<p>Last Edited=<span class="field-le-value">{person["lastedit"]}</span></p>')
+        html.append('</div>')
+        return '\n'.join(html)
+
+    def pages(self, limit=None):
+        """
+        Yields (page, content) for the person pages holding the first `limit` people (all
+        if None), as the bytes the crawler would have fetched.
+        """
+        stop = len(self.raw) if limit is None else min(limit, len(self.raw))
+        pages = self.raw['Page'].to_numpy()
+        bounds = np.flatnonzero(np.r_[True, pages[1:] != pages[:-1], True])
+        bounds = bounds[:np.searchsorted(bounds, stop) + 1]
+        people = self.raw.iloc[:bounds[-1]].to_dict('records')
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            body = '\n'.join(self.person_html(row, people[row]) for row in range(start, end))
+            content = (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>thePeerage.com - Page {pages[start]}'
+                       f'</title></head><body><div id="content">{body}</div></body></html>')
+            yield int(pages[start]), content.encode('utf-8')
+
+    # --- Hollingsworth ---
+    def _hollingsworth(self, rng):
+        """
+        peersflatfile.tab rows for the children of peers born in HOLLINGSWORTH_YEARS, plus
+        people thepeerage lacks, with missing and shifted date parts, spelling variants
+        and repeated rows.
+        """
+        n = self.n_people
+        ranked = np.isin(self.peer_type, list(PEERAGE_STYLES))
+        parent = np.where((self.father >= 0) & ranked[np.maximum(self.father, 0)], self.father, -1)
+        rows = np.flatnonzero((parent >= 0) & (self.born_year >= HOLLINGSWORTH_YEARS[0])
+                              & (self.born_year <= HOLLINGSWORTH_YEARS[1]))
+        n_extra = int(len(rows) * HOLLINGSWORTH_EXTRA) if ranked.any() else 0
+        extra = rng.integers(0, n, n_extra)
+        h = len(rows) + n_extra
+
+        surname = np.r_[self.surname[rows], self.surname[rng.permutation(extra)]]
+        misspelt = np.flatnonzero(rng.random(h) < 0.03)
+        cut = [rng.integers(1, max(2, len(name))) for name in surname[misspelt]]
+        surname[misspelt] = [name[:k] + name[k + 1:] if len(name) > 3 else name for name, k in zip(surname[misspelt], cut)]
+        forenames = np.r_[self.forenames[rows], self.forenames[extra]]
+        styled = rng.random(h) < 0.1
+        forenames[styled] = 'Hon. ' + forenames[styled]
+        gender = np.r_[self.gender[rows], self.gender[extra]]
+
+        def noisy(year, month, day):
+            year = year.copy()
+            shifted = rng.random(len(year)) < 0.05
+            year[shifted] += rng.choice([-1, 1], int(shifted.sum()))
+            vague = rng.random(len(year)) < 0.25
+            return (np.where(vague | np.isnan(year), np.nan, day), np.where(vague | np.isnan(year), np.nan, month), year,
+                    np.where(np.isnan(year), None, np.where(vague, rng.choice(['1', '2', '3'], len(year)),
+                                                            np.where(rng.random(len(year)) < 0.8, 'y', 'x'))))
+
+        people = np.r_[rows, extra]
+        born_year = np.r_[self.born_year[rows], rng.integers(*HOLLINGSWORTH_YEARS, n_extra).astype('float64')]
+        b_day, b_month, b_year, b_acc = noisy(born_year, self.born_month[people], self.born_day[people])
+        d_day, d_month, d_year, d_acc = noisy(np.r_[self.died_year[rows], born_year[len(rows):] + 60],
+                                              self.died_month[people], self.died_day[people])
+
+        parents = np.r_[parent[rows], rng.choice(np.flatnonzero(ranked), n_extra)] if n_extra else parent[rows]
+        codes = np.array([PEERAGE_STYLES[t][1] for t in self.peer_type[parents]], dtype=object)
+        ordinals = rng.integers(1, 13, h)
+        parent_text = [f'{surname} {k}{code}' for surname, k, code in zip(self.surname[parents], ordinals, codes)]
+        parental_title = [f'{PEERAGE_STYLES[t][0]} of {place}' for t, place in zip(self.peer_type[parents],
+                                                                                  self.surname[parents])]
+        flatfile = pd.DataFrame({
+            'Surname': surname, 'First Names': forenames, 'Title': np.where(rng.random(h) < 0.05, 'Hon', None),
+            'peers_Sex': np.where(gender == 'M', 'M', 'F'),
+            'B Day': b_day, 'B Month': b_month, 'B Year': b_year, 'B Acc': b_acc,
+            'D Day': d_day, 'D Month': d_month, 'D Year': d_year, 'D Acc': d_acc,
+            'Parent': parent_text, 'Parental Title': parental_title,
+        }, columns=HOLLINGSWORTH_COLUMNS)
+        true_matches = pd.array(np.r_[self.ids[rows], np.zeros(n_extra, dtype='int64')], dtype='Int64')
+        true_matches[len(rows):] = pd.NA
+
+        # Some people appear on more than one row of the flat file.
+        repeated = rng.choice(h, size=h // 30)
+        order = np.r_[np.arange(h), repeated]
+        order = order[rng.permutation(len(order))]
+        return flatfile.iloc[order].reset_index(drop=True), pd.Series(true_matches[order], name='ID')
+
+    # --- Output ---
+    def write(self, data_dir, pages=False):
+        """
+        Writes the tables where the project reads them under `data_dir` (e.g. '../data'):
+        thepeerage/raw/*.tsv, hollingsworth/tab/peersflatfile.tab and, with pages=True,
+        the person pages to thepeerage/raw/pages/p<page>.htm.
+        """
+        raw_dir = os.path.join(data_dir, 'thepeerage', 'raw')
+        tab_dir = os.path.join(data_dir, 'hollingsworth', 'tab')
+        for directory in [raw_dir, tab_dir, os.path.join(data_dir, 'thepeerage', 'bad_stuff'),
+                          os.path.join(data_dir, 'thepeerage', 'wrangled'), os.path.join(data_dir, 'hollingsworth', 'wrangled')]:
+            os.makedirs(directory, exist_ok=True)
+        self.raw.to_csv(os.path.join(raw_dir, 'entire_thepeerage.tsv'), sep='\t', index=False)
+        self.peers.to_csv(os.path.join(raw_dir, 'british_peers_and_orders.tsv'), sep='\t', index=False)
+        self.sources.to_csv(os.path.join(raw_dir, 'sources.tsv'), sep='\t', index=False)
+        self.hollingsworth.to_csv(os.path.join(tab_dir, 'peersflatfile.tab'), sep='\t', index=False,
+                                  encoding='Windows-1252', errors='replace')
+        if pages:
+            os.makedirs(os.path.join(raw_dir, 'pages'), exist_ok=True)
+            for page, content in self.pages():
+                with open(os.path.join(raw_dir, 'pages', f'p{page}.htm'), 'wb') as f:
+                    f.write(content)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Write a synthetic thepeerage/Hollingsworth dataset.")
+    argparser.add_argument('data_dir', help="Directory laid out like ../data to write the tables to.")
+    argparser.add_argument('--people', type=int, default=10000, help="Number of people in thepeerage tables.")
+    argparser.add_argument('--seed', type=int, default=0, help="Seed of the generator.")
+    argparser.add_argument('--pages', action='store_true', help="Also write the HTML person pages.")
+    args = argparser.parse_args()
+    data = SyntheticGenealogy(args.people, seed=args.seed)
+    data.write(args.data_dir, pages=args.pages)
+    print(f"{len(data.raw)} people, {len(data.peers)} peer rows, {len(data.hollingsworth)} Hollingsworth rows "
+          f"written to {args.data_dir}")
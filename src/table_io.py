@@ -0,0 +1,279 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# --- Schemas ---
+# Raw tables written by 0_thepeerage_scraper.py. Low-cardinality and heavily repeated
+# string columns are stored as plain strings and dictionary-encoded by Parquet.
+RAW_PERSON_SCHEMA = pa.schema([
+    ('Page', pa.int32()),
+    ('ID', pa.int64()),
+    ('fullname', pa.string()),
+    ('title', pa.string()),
+    ('gender', pa.string()),
+    ('born', pa.string()),
+    ('died', pa.string()),
+    ('narr', pa.string()),
+    ('clarendon', pa.int8()),
+    ('oxbridge', pa.string()),
+    ('child', pa.string()),
+    ('lastedit', pa.string()),
+    ('sources', pa.string()),
+])
+PEER_SCHEMA = pa.schema([('type', pa.string()), ('id', pa.int64())])
+SOURCE_SCHEMA = pa.schema([('Page', pa.int32()), ('SourceID', pa.string()), ('Source', pa.string())])
+
+# Types of the derived columns in the wrangled tables, by column name with any '_l'/'_h'
+# suffix removed. Columns not listed here (and not 'is_*' flags) keep their inferred type.
+WRANGLED_TYPES = {
+    'ID': pa.int64(),
+    'Page': pa.int32(),
+    'clarendon': pa.int8(),
+    'born_year': pa.int64(),
+    'born_month': pa.int8(),
+    'born_day': pa.int64(),
+    'is_synthetic_birthdate': pa.bool_(),
+    'born_accuracy': pa.int8(),
+    'born_datetime': pa.timestamp('us'),
+    'born_datetime_str': pa.string(),
+    'died_year': pa.int64(),
+    'died_month': pa.int8(),
+    'died_day': pa.int64(),
+    'is_synthetic_dieddate': pa.bool_(),
+    'is_synthetic_deathdate': pa.bool_(),
+    'died_accuracy': pa.int8(),
+    'died_datetime': pa.timestamp('us'),
+    'died_datetime_str': pa.string(),
+}
+
+# Hollingsworth's accuracy columns hold letter codes ('x', 'y', ...), not thepeerage's
+# integer accuracy.
+SUFFIXED_TYPES = {
+    'born_accuracy_h': pa.string(),
+    'died_accuracy_h': pa.string(),
+}
+
+# Columns read back as pandas categoricals. 'sources' is not one: nearly every person cites
+# a different list, so it stays a string column (Parquet still dictionary-encodes it on disk).
+CATEGORICAL_COLUMNS = ['gender', 'oxbridge', 'type', 'type_of_peer',
+                       'Gender_l', 'Gender_h', 'Extracted Parental Peerage_l', 'Extracted Parental Peerage_h']
+
+# Strings pandas.read_csv treats as missing by default, so both formats agree on nulls.
+NULL_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+               '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# Arrow integer and boolean columns become pandas nullable dtypes rather than float/object.
+PANDAS_TYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+
+# --- Writing ---
+def tsv_to_parquet(tsv_path, parquet_path, schema, block_size=64 << 20):
+    """
+    Converts a raw TSV written by the scraper to Parquet in streaming batches, so the
+    whole table is never held in memory.
+
+    Parameters:
+        tsv_path (str): The TSV to convert.
+        parquet_path (str): Where to write the Parquet file.
+        schema (pyarrow.Schema): Explicit column types of the TSV.
+        block_size (int): Bytes of TSV parsed per batch.
+    """
+    reader = pacsv.open_csv(
+        tsv_path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        parse_options=pacsv.ParseOptions(delimiter='\t', newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(column_types=schema, null_values=NULL_VALUES,
+                                             strings_can_be_null=True, include_columns=schema.names)
+    )
+    with pq.ParquetWriter(parquet_path, schema, compression='zstd') as writer:
+        for batch in reader:
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+
+
+def wrangled_type(name):
+    """
+    Returns the Arrow type for a wrangled column, or None to keep the inferred type.
+    """
+    if name in SUFFIXED_TYPES:
+        return SUFFIXED_TYPES[name]
+    base = name[:-2] if name.endswith(('_l', '_h')) else name
+    if base in WRANGLED_TYPES:
+        return WRANGLED_TYPES[base]
+    if base.startswith('is_'):
+        return pa.int8()
+    return None
+
+
+def wrangled_dtypes(names):
+    """
+    read_csv dtypes that give a wrangled CSV the same column types in every chunk:
+    integer and boolean columns of WRANGLED_TYPES as pandas nullable dtypes, and every
+    other column as strings.
+
+    Parameters:
+        names (list): The columns of the CSV.
+
+    Returns:
+        dict: Column -> dtype.
+    """
+    dtypes = {}
+    for name in names:
+        target = wrangled_type(name)
+        dtypes[name] = PANDAS_TYPES.get(target, str) if target is not None else str
+    return dtypes
+
+
+def wrangled_table(df):
+    """
+    Converts a wrangled DataFrame (including its index) to Arrow, casting the known
+    columns to the types in WRANGLED_TYPES.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    for i, field in enumerate(table.schema):
+        target = wrangled_type(field.name)
+        if target is not None and field.type != target:
+            table = table.set_column(i, pa.field(field.name, target), table.column(i).cast(target))
+    return table
+
+
+def write_parquet(df, path):
+    """
+    Writes a wrangled DataFrame (including its index) to Parquet, casting the known
+    columns to the types in WRANGLED_TYPES.
+
+    Parameters:
+        df (pandas.DataFrame): The table to write.
+        path (str): Where to write the Parquet file.
+    """
+    pq.write_table(wrangled_table(df), path, compression='zstd')
+
+
+class ParquetAppender:
+    """
+    Writes a wrangled table to Parquet one chunk at a time, as write_parquet would write
+    the whole table. The schema is fixed by the first chunk, with columns that are empty
+    there typed as strings; later chunks are cast to it.
+
+    Parameters:
+        path (str): Where to write the Parquet file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, df):
+        table = wrangled_table(df)
+        if self.writer is None:
+            schema = pa.schema([pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                                for field in table.schema], metadata=table.schema.metadata)
+            self.writer = pq.ParquetWriter(self.path, schema, compression='zstd')
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# --- Reading ---
+def read_table(path, columns=None, nullable=True, **read_csv_kwargs):
+    """
+    Reads a table written as either Parquet or CSV/TSV. Given a path without an extension,
+    the Parquet file is preferred when it exists and is not older than the CSV. With Parquet only the requested columns
+    are loaded (plus the index), so readers that do not need e.g. `narr` never load it.
+
+    Parameters:
+        path (str): The file to read, or its path without extension.
+        columns (list or None): Columns to load; all columns if None.
+        nullable (bool): Read Parquet integer/boolean columns as pandas nullable dtypes;
+                         if False they come back as float/object, as read_csv gives them.
+        **read_csv_kwargs: Passed to pandas.read_csv for CSV/TSV files.
+
+    Returns:
+        pandas.DataFrame: The table.
+    """
+    path = _resolve(path)
+    if path.endswith('.parquet'):
+        names = pq.read_schema(path).names
+        read_dictionary = [name for name in CATEGORICAL_COLUMNS if name in names]
+        table = pq.read_table(path, columns=columns, use_pandas_metadata=True, read_dictionary=read_dictionary)
+        return _to_pandas(table, nullable)
+    return pd.read_csv(path, **_csv_kwargs(path, columns, read_csv_kwargs))
+
+
+def iter_table(path, chunksize, columns=None, nullable=True, **read_csv_kwargs):
+    """
+    Reads a table like read_table, but as DataFrames of at most `chunksize` rows, so only
+    one chunk is in memory at a time. Chunks are indexed by row number in the file
+    (unless `index_col` is given for a CSV/TSV).
+
+    Parameters:
+        path (str): The file to read, or its path without extension.
+        chunksize (int): Rows per chunk.
+        columns (list or None): Columns to load; all columns if None.
+        nullable (bool): As for read_table.
+        **read_csv_kwargs: Passed to pandas.read_csv for CSV/TSV files.
+
+    Yields:
+        pandas.DataFrame: The next chunk of the table.
+    """
+    path = _resolve(path)
+    if path.endswith('.parquet'):
+        names = pq.read_schema(path).names
+        parquet = pq.ParquetFile(path, read_dictionary=[name for name in CATEGORICAL_COLUMNS if name in names])
+        start = 0
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=columns, use_pandas_metadata=True):
+            df = _to_pandas(pa.Table.from_batches([batch]), nullable)
+            if isinstance(df.index, pd.RangeIndex):
+                df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield df
+        return
+    with pd.read_csv(path, chunksize=chunksize, **_csv_kwargs(path, columns, read_csv_kwargs)) as reader:
+        yield from reader
+
+
+def _resolve(path):
+    """
+    Given a path without an extension, picks the Parquet file when it exists and is not
+    older than the CSV.
+    """
+    if not os.path.splitext(path)[1]:
+        parquet_path, csv_path = path + '.parquet', path + '.csv'
+        use_parquet = os.path.exists(parquet_path) and (
+            not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path))
+        path = parquet_path if use_parquet else csv_path
+    return path
+
+
+def _to_pandas(table, nullable):
+    df = table.to_pandas(types_mapper=PANDAS_TYPES.get if nullable else None)
+    # Missing strings are None coming out of Arrow but np.nan coming out of read_csv.
+    for name in df.columns[df.dtypes == object]:
+        values = df[name].to_numpy(copy=True)
+        values[pd.isna(values)] = np.nan
+        df[name] = values
+    return df
+
+
+def _csv_kwargs(path, columns, read_csv_kwargs):
+    if path.endswith('.tsv'):
+        read_csv_kwargs.setdefault('sep', '\t')
+    if columns is not None:
+        read_csv_kwargs['usecols'] = lambda name: name in columns or name == read_csv_kwargs.get('index_col')
+    return read_csv_kwargs
@@ -0,0 +1,25 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+# The modules live in src and import each other by name, as the scripts run from there.
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture(scope='session')
+def scraper(tmp_path_factory):
+    """
+    The 0_thepeerage_scraper module, imported from a scratch directory so the log folder
+    it creates on import ('../logging') lands there.
+    """
+    workdir = tmp_path_factory.mktemp('scraper') / 'src'
+    workdir.mkdir()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        return importlib.import_module('0_thepeerage_scraper')
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,102 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from blocking import BIN_TOLERANCE, DEFAULT_PASSES, MULTI_VALUED, BlockingIndex, blocking_report
+
+
+def reference_pairs(df_left, df_right, passes=DEFAULT_PASSES, tolerance=BIN_TOLERANCE, multi_valued=MULTI_VALUED):
+    """
+    The candidate pairs of BlockingIndex (without max_block_pairs) built one record at a
+    time: every key tuple a record can take, with each value of a multi-valued key and,
+    on the left, each neighbouring bin, looked up in a dict of right records.
+    """
+    def values(value, key, widen):
+        if pd.isna(value):
+            return []
+        if key in multi_valued:
+            return [part.strip() for part in value.split(';') if part.strip()]
+        if key in tolerance:
+            spread = tolerance[key] if widen else 0
+            return [int(value) + offset for offset in range(-spread, spread + 1)]
+        return [value]
+
+    def tuples(row, keys, widen):
+        return set(product(*[values(row[key], key, widen) for key in keys]))
+
+    pairs = set()
+    for keys in passes:
+        right = {}
+        for label, row in df_right.iterrows():
+            for key_tuple in tuples(row, keys, widen=False):
+                right.setdefault(key_tuple, []).append(label)
+        for label, row in df_left.iterrows():
+            for key_tuple in tuples(row, keys, widen=True):
+                pairs.update((label, right_label) for right_label in right.get(key_tuple, []))
+    return pairs
+
+
+def keys_table(n, seed, index_name):
+    """
+    A table of blocking keys shaped like add_blocking_keys output: a few phonetic codes,
+    decade bins, missing values and ';'-joined parental titles.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.array(['SNT', 'JAN', 'WALAN', 'HAR', 'GRY', np.nan], dtype=object)
+    titles = np.array(['baron', 'earl', 'baron;earl', 'duke; viscount', '', np.nan], dtype=object)
+    died = rng.integers(165, 195, n).astype('float64')
+    died[rng.random(n) < 0.2] = np.nan
+    return pd.DataFrame({
+        'surname_code': rng.choice(codes, n),
+        'forename_code': rng.choice(codes, n),
+        'year_bin': rng.integers(160, 190, n),
+        'died_year_bin': died,
+        'parental_peerage': rng.choice(titles, n),
+    }, index=pd.Index(rng.permutation(n) * 3 + 1, name=index_name))
+
+
+def test_multi_valued_record_matches_each_title_in_each_bin():
+    # 'a;b;c' in bin 180 meets (a, 180), (b, 180), (c, 180) and (a, 179) on the right,
+    # but not (d, 180) or (a, 178).
+    left = pd.DataFrame({'parental_peerage': ['a;b;c', 'b', np.nan], 'year_bin': [180, 181, 180]},
+                        index=pd.Index(['x', 'y', 'z'], name='left'))
+    right = pd.DataFrame({'parental_peerage': ['a', 'b', 'c', 'a', 'd', 'a'],
+                          'year_bin': [180, 180, 180, 179, 180, 178]},
+                         index=pd.Index(range(6), name='right'))
+    passes = [('parental_peerage', 'year_bin')]
+    candidates = BlockingIndex(passes=passes).index(left, right)
+    expected = {('x', 0), ('x', 1), ('x', 2), ('x', 3), ('y', 1)}
+    assert set(candidates) == expected == reference_pairs(left, right, passes=passes)
+    assert list(candidates.names) == ['left', 'right']
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_blocking_index_matches_reference(seed):
+    left, right = keys_table(400, seed, 'h'), keys_table(600, seed + 10, 'l')
+    candidates = BlockingIndex().index(left, right)
+    assert candidates.is_unique
+    assert set(candidates) == reference_pairs(left, right)
+
+
+def test_empty_tables_give_no_pairs():
+    left = keys_table(50, 0, 'h')
+    for df_left, df_right in [(left.iloc[:0], left), (left, left.iloc[:0]), (left.iloc[:0], left.iloc[:0])]:
+        index = BlockingIndex()
+        assert len(index.index(df_left, df_right)) == 0
+        assert [report['pairs'] for report in index.report] == [0] * len(DEFAULT_PASSES)
+
+
+def test_max_block_pairs_skips_large_blocks():
+    left, right = keys_table(400, 2, 'h'), keys_table(600, 3, 'l')
+    index = BlockingIndex(max_block_pairs=5)
+    capped = set(index.index(left, right))
+    assert capped < reference_pairs(left, right)
+    assert sum(report['skipped_blocks'] for report in index.report) > 0
+
+
+def test_blocking_report_recall():
+    candidates = pd.MultiIndex.from_tuples([(1, 1), (1, 2), (2, 2)])
+    report = blocking_report(candidates, 2, 4, true_pairs=pd.MultiIndex.from_tuples([(1, 1), (2, 3)]))
+    assert report == {'pairs': 3, 'reduction_ratio': 1 - 3 / 8, 'true_pairs': 2, 'found': 1, 'recall': 0.5}
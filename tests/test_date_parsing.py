@@ -0,0 +1,119 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from date_parsing import (MAX_EXACT, DateParseCache, add_date_columns, build_datetimes, iso_dates, parse_date_column,
+                          parse_dates)
+from synthetic import SyntheticGenealogy
+
+# Example strings for each rule in the parse_dates docstring, with the expected
+# (year, month, day, is_synthetic).
+DATE_RULE_CASES = [
+    (None, (np.nan, np.nan, np.nan, False)),
+    ('', (np.nan, np.nan, np.nan, False)),
+    ('   ', (np.nan, np.nan, np.nan, False)),
+    ('unknown', (np.nan, np.nan, np.nan, False)),
+    ('before 1700', (np.nan, np.nan, np.nan, False)),
+    ('after 12 March 1700', (np.nan, np.nan, np.nan, False)),
+    ('circa 1700', (1700, 7, 1, True)),
+    ('circa before 1700', (1700, 7, 1, True)),
+    ('1464/65', (1465, 1, 1, True)),
+    ('1464/5', (1465, 1, 1, True)),
+    ('1464/1470', (1470, 1, 1, True)),
+    ('1699 / 1700', (1700, 1, 1, True)),
+    ('12 March 1700/01', (1701, 3, 12, False)),
+    ('45 March 1700/01', (1701, 3, 16, True)),
+    ('March 1700/01', (1701, 3, 16, True)),
+    ('February 1703/4', (1704, 2, 15, True)),
+    ('1700 or 1701', (1701, 7, 1, True)),
+    ('circa 1700/01', (1701, 7, 1, True)),
+    ('1700/', (1700, 7, 1, True)),
+    ('abc/def', (np.nan, np.nan, np.nan, False)),
+    ('12 March 1700', (1700, 3, 12, False)),
+    ('12 march 1700 or 1701', (1701, 3, 12, False)),
+    ('March 1700', (1700, 3, 16, True)),
+    ('1700 March', (1700, 3, 16, True)),
+    ('April 1700', (1700, 4, 15, True)),
+    ('February 1700', (1700, 2, 14, True)),
+    ('February 1704', (1704, 2, 15, True)),
+    ('February 2000', (2000, 2, 15, True)),
+    ('March', (np.nan, np.nan, np.nan, False)),
+    ('1850', (1850, 7, 1, True)),
+    ('3 1850', (1850, 7, 3, False)),
+    ('c. 3 1850', (1850, 7, 1, True)),
+    ('31 February 1850', (1850, 2, 31, False)),
+    ('1850.0', (0, 7, 1850, False)),
+]
+RULE_IDS = [repr(value) for value, _ in DATE_RULE_CASES]
+
+
+def reference(value):
+    """
+    parse_dates, with absurdly large numbers unparseable as in parse_date_column.
+    """
+    parsed = parse_dates(value)
+    if any(isinstance(part, int) and abs(part) >= MAX_EXACT for part in parsed[:3]):
+        return (np.nan, np.nan, np.nan, False)
+    return parsed
+
+
+def same(expected, got):
+    return all(pd.isnull(a) == pd.isnull(b) and (pd.isnull(a) or a == b) for a, b in zip(expected, got))
+
+
+@pytest.mark.parametrize('value, expected', DATE_RULE_CASES, ids=RULE_IDS)
+def test_parse_dates_rules(value, expected):
+    assert same(expected, reference(value))
+
+
+@pytest.mark.parametrize('value, expected', DATE_RULE_CASES, ids=RULE_IDS)
+def test_parse_date_column_rules(value, expected):
+    got = next(parse_date_column(pd.Series([value], dtype=object)).itertuples(index=False))
+    assert same(expected, got)
+
+
+def test_parse_date_column_matches_parse_dates():
+    raw = SyntheticGenealogy(3000, seed=3).raw
+    values = pd.Series(pd.concat([raw['born'], raw['died']]).dropna().unique(), dtype=object)
+    values = pd.concat([values, pd.Series(['99999999999999999999', '1700/99999999999999999999'])],
+                       ignore_index=True)
+    parsed = parse_date_column(values)
+    mismatches = [(value, reference(value), tuple(got))
+                  for value, got in zip(values, parsed.itertuples(index=False)) if not same(reference(value), got)]
+    assert mismatches == []
+
+
+def test_add_date_columns_through_cache():
+    df = pd.DataFrame({'born': ['12 march 1700', None, '12 march 1700', 'circa 1650', '31 february 1850']})
+    cache = DateParseCache()
+    invalid = add_date_columns(df, 'born', 'is_synthetic_birthdate', cache)
+    assert invalid == 1
+    assert df['born_year'].astype('float64').fillna(0).tolist() == [1700, 0, 1700, 1650, 1850]
+    assert df['born_datetime_str'].fillna('').tolist() == ['12-03-1700', '', '12-03-1700', '01-07-1650', '']
+    assert df['is_synthetic_birthdate'].tolist() == [False, False, False, True, False]
+    assert df['born_datetime'].isna().tolist() == [False, True, False, False, True]
+
+
+def create_datetime(year, month, day):
+    # 1_thepeerage_wrangler.py before build_datetimes.
+    if pd.isnull(year) or pd.isnull(month) or pd.isnull(day):
+        return pd.NaT
+    try:
+        y, m, d = int(year), int(month), int(day)
+        return datetime(y, m, d) if y < 1678 else pd.Timestamp(year=y, month=m, day=d)
+    except ValueError:
+        return pd.NaT
+
+
+@pytest.mark.parametrize('first_year', [1700, 1600, 2300, 5], ids=['inside', 'before', 'after', 'year 5'])
+def test_iso_dates_match_object_column_csv(first_year):
+    frame = pd.DataFrame({'year': [first_year, 1801, 1802, np.nan, 1850],
+                          'month': [1, 2, 2, 3, 12], 'day': [2, 28, 30, 4, 31]})
+    expected = frame.apply(lambda row: create_datetime(row['year'], row['month'], row['day']), axis=1)
+    datetimes, _ = build_datetimes(frame['year'].astype('Int64'), frame['month'].astype('Int64'),
+                                   frame['day'].astype('Int64'))
+    assert (pd.DataFrame({'date': iso_dates(datetimes)}).to_csv(index=False)
+            == pd.DataFrame({'date': expected}).to_csv(index=False))
+    assert iso_dates(datetimes, times=True)[0].endswith(' 00:00:00')
@@ -0,0 +1,120 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch_engine import FetchEngine
+
+
+# --- Fixture Server ---
+class FixtureServer:
+    """
+    Local stand-in for thepeerage.com: a threaded http.server on 127.0.0.1 serving fixture
+    pages, so the engine can be checked without the network. Some paths can fail first:
+    answer 503 a number of times, or drop the connection without an answer. Every
+    request's path and arrival time are recorded.
+
+    Parameters:
+        pages (dict): Path (e.g. '/p1.htm') -> page content; other paths answer 404.
+        fail_with_503 (dict): Path -> number of 503 answers before the page is served.
+        drop_connection (dict): Path -> number of connections dropped before the page is served.
+    """
+
+    def __init__(self, pages, fail_with_503=None, drop_connection=None):
+        self.pages = pages
+        self.failures = {path: ('503', count) for path, count in (fail_with_503 or {}).items()}
+        self.failures.update({path: ('drop', count) for path, count in (drop_connection or {}).items()})
+        self.requests = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append((self.path, time.monotonic()))
+                    failure, remaining = server.failures.get(self.path, (None, 0))
+                    if remaining:
+                        server.failures[self.path] = (failure, remaining - 1)
+                if remaining and failure == 'drop':
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                if remaining:
+                    self.send_error(503)
+                elif self.path in server.pages:
+                    content = server.pages[self.path]
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# --- Tests ---
+N_PAGES = 40
+PAGES = {f'/p{page}.htm': f'<html>page {page}</html>'.encode() for page in range(1, N_PAGES + 1)}
+RATE = 20
+
+
+@pytest.fixture(scope='module')
+def crawl():
+    """
+    A crawl of the fixture pages by four workers, with /p3.htm answering 503 twice and
+    /p7.htm dropping its first connection.
+    """
+    with FixtureServer(PAGES, fail_with_503={'/p3.htm': 2}, drop_connection={'/p7.htm': 1}) as server:
+        jobs = [(page, f"{server.url}/p{page}.htm") for page in range(1, N_PAGES + 1)]
+        with FetchEngine({}, concurrency=4, requests_per_second=RATE, max_retries=4, backoff_factor=0.01,
+                         timeout=5) as engine:
+            results = list(engine.fetch_many(jobs))
+    return server, results
+
+
+def test_results_in_job_order(crawl):
+    _, results = crawl
+    assert [result.key for result in results] == list(range(1, N_PAGES + 1))
+    assert [result.content for result in results] == list(PAGES.values())
+    assert all(result.status_code == 200 for result in results)
+
+
+def test_global_rate_limit(crawl):
+    server, _ = crawl
+    times = sorted(arrival for _, arrival in server.requests)
+    assert len(times) == N_PAGES + 3
+    # The bucket holds one token: no two requests closer than 1/RATE on average.
+    assert (len(times) - 1) / (times[-1] - times[0]) <= RATE * 1.05
+
+
+def test_failing_pages_retried_until_served(crawl):
+    server, results = crawl
+    attempts = {result.url[len(server.url):]: result.attempts for result in results}
+    assert attempts.pop('/p3.htm') == 3
+    assert attempts.pop('/p7.htm') == 2
+    assert set(attempts.values()) == {1}
+
+
+def test_give_up_on_and_max_retries():
+    with FixtureServer({}, fail_with_503={'/busy.htm': 5}) as server:
+        with FetchEngine({}, requests_per_second=100, max_retries=3, backoff_factor=0.01, timeout=5) as engine:
+            missing, busy = engine.fetch_many([('missing', f"{server.url}/missing.htm"),
+                                               ('busy', f"{server.url}/busy.htm")], give_up_on=(404,))
+    assert (missing.content, missing.status_code, missing.attempts) == (None, 404, 1)
+    assert (busy.content, busy.status_code, busy.attempts) == (None, 503, 3)
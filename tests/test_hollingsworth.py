@@ -0,0 +1,105 @@
+import datetime
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hollingsworth import (DUPLICATE_KEYS, OUTPUT_COLUMNS, GenderLookup, datetime_strings, extract_parental_peerage,
+                           historic_datetimes, wrangle_peers)
+from synthetic import SyntheticGenealogy
+
+# --- 2_hollsingworth_wrangler.ipynb ---
+NOTEBOOK_PARENT_PATTERN = r'''(?ix)                  # i → ignore case, x → free-spacing
+        (?:\bKing\b|\bQueen\b)       # royal styles (anywhere in the string)
+    |                                # – OR –
+        (?<=\d)                      # only immediately after a digit …
+        (?:Bs|Ds|Ms|Vs|Cs|B|D|M|V|E) # … the peerage abbreviations
+'''
+NOTEBOOK_MAPPING = {
+    "D":  "duke",        "DS": "duke",
+    "M":  "marquess",    "MS": "marquess",
+    "E":  "earl",        "CS": "earl",
+    "V":  "viscount",    "VS": "viscount",
+    "B":  "baron",       "BS": "baroness",
+}
+
+
+def notebook_parental_peerage(parent):
+    extracted = parent.str.findall(NOTEBOOK_PARENT_PATTERN).str.join(";")
+    mask = extracted.isin(["d", "e", "v"])
+    extracted[mask] = extracted[mask].str.upper()
+    pattern = re.compile(rf"\b({'|'.join(sorted(NOTEBOOK_MAPPING, key=len, reverse=True))})\b", flags=re.I)
+    return extracted.str.replace(pattern, lambda m: NOTEBOOK_MAPPING[m.group(0).upper()], regex=True)
+
+
+def parse_historic(d):
+    # expect d like "DD-MM-YYYY", but guard zeros or bad parses
+    try:
+        return datetime.datetime.strptime(d, "%d-%m-%Y")
+    except Exception:
+        return pd.NaT
+
+
+def notebook_datetimes(day, month, year):
+    days = day.fillna(0).astype(int).astype(str).str.zfill(2)
+    months = month.fillna(0).astype(int).astype(str).str.zfill(2)
+    years = year.fillna(0).astype(int).astype(str).str.zfill(4)
+    return (days + '-' + months + '-' + years).map(parse_historic)
+
+
+# --- Tests ---
+@pytest.fixture(scope='module')
+def flatfile():
+    return SyntheticGenealogy(3000, seed=5).hollingsworth
+
+
+def test_parental_peerage_matches_notebook(flatfile):
+    parent = pd.concat([flatfile['Parent'], pd.Series(
+        ['King George III', 'Queen Anne', 'Fordcav 2B', '3Ms', 'Smith 2d', 'Jones 4e 5Bs', 'no peerage', np.nan])],
+        ignore_index=True)
+    expected = notebook_parental_peerage(parent).replace('', np.nan)
+    pd.testing.assert_series_equal(extract_parental_peerage(parent), expected, check_dtype=False)
+    assert extract_parental_peerage(parent).iloc[-8:-1].tolist() == [
+        'King', 'Queen', 'baron', 'marquess', 'duke', 'earl;baroness', np.nan]
+
+
+@pytest.mark.parametrize('years', [(1700, 1750), (1500, 1750), (1700, 2300)], ids=['inside', 'before', 'after'])
+def test_datetime_strings_match_notebook_csv(years):
+    # The notebook's object column wrote '00:00:00' on every date when one fell outside 1677-2262.
+    day = pd.Series([1, 0, 31, np.nan, 29, 12], dtype='float64')
+    month = pd.Series([2, 5, 4, 3, 2, 12], dtype='float64')
+    year = pd.Series([years[0], 1701, 1702, 1703, 1704, years[1]], dtype='float64')
+    expected = pd.DataFrame({'date': notebook_datetimes(day, month, year)}).to_csv(index=False)
+    got = pd.DataFrame({'date': datetime_strings(historic_datetimes(day, month, year))}).to_csv(index=False)
+    assert got == expected
+
+
+def test_flatfile_dates_match_notebook_csv(flatfile):
+    for prefix in ['B', 'D']:
+        columns = [flatfile[f'{prefix} {part}'] for part in ('Day', 'Month', 'Year')]
+        expected = pd.DataFrame({'date': notebook_datetimes(*columns)}).to_csv(index=False)
+        got = pd.DataFrame({'date': datetime_strings(historic_datetimes(*columns))}).to_csv(index=False)
+        assert got == expected
+
+
+def test_wrangle_peers(flatfile):
+    peers = wrangle_peers(flatfile)
+    assert list(peers.columns) == list(OUTPUT_COLUMNS.values())
+    assert len(peers) == len(flatfile.drop_duplicates(subset=DUPLICATE_KEYS))
+    assert peers['First Forename_h'].dropna().str.fullmatch(r'[A-Z ]+').all()
+
+
+def test_gender_lookup_asks_once_per_name():
+    class Detector:
+        calls = []
+
+        def get_gender(self, name):
+            self.calls.append(name)
+            return {'JOHN': 'male', 'MARY': 'female'}.get(name, 'unknown')
+
+    lookup = GenderLookup(Detector())
+    answers = lookup(pd.Series(['JOHN', 'MARY', 'JOHN', None, 'ALEX']))
+    assert answers.tolist()[:3] == ['male', 'female', 'male'] and pd.isna(answers[3]) and answers[4] == 'unknown'
+    lookup(pd.Series(['MARY', 'JOHN']))
+    assert Detector.calls == ['JOHN', 'MARY', 'ALEX'] and len(lookup) == 3
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from blocking import add_blocking_keys
+from date_parsing import DateParseCache
+from hollingsworth import extract_parental_peerage
+from linkage import KEYS, SCORE_COLUMNS, Linkage, _pairs, prepare_table
+from names import split_forenames_surname, split_fullname
+from synthetic import SyntheticGenealogy
+
+
+def linkage_tables(n_people, seed):
+    """
+    Prepared h and l tables from a synthetic dataset, indexed by h_id and l_id.
+    """
+    data = SyntheticGenealogy(n_people, seed=seed)
+    flatfile = data.hollingsworth
+    keys = split_forenames_surname(flatfile['First Names'], flatfile['Surname'])
+    df_h = pd.DataFrame({
+        'First Forename_h': keys['First Forename'], 'Last Surname_h': keys['Last Surname'],
+        'born_year_h': flatfile['B Year'], 'died_year_h': flatfile['D Year'],
+        'Extracted Parental Peerage_h': extract_parental_peerage(flatfile['Parent']),
+    })
+    people = data.raw.mask(data.raw == 'N/A').set_index(data.raw['ID'].astype('int64'))
+    keys, cache = split_fullname(people['fullname']), DateParseCache()
+    rng = np.random.default_rng(seed)
+    df_l = pd.DataFrame({
+        'First Forename_l': keys['First Forename'], 'Last Surname_l': keys['Last Surname'],
+        'born_year_l': cache.parse(people['born'])['year'].to_numpy(),
+        'died_year_l': cache.parse(people['died'])['year'].to_numpy(),
+        'Extracted Parental Peerage_l': rng.choice(np.array(['baron', 'earl', None], dtype=object), len(people)),
+    }, index=people.index)
+    return prepare_table(df_h, 'h').rename_axis('h_id'), prepare_table(df_l, 'l').rename_axis('l_id')
+
+
+def assert_same_as_build(updated, full):
+    assert len(_pairs(full.candidates).symmetric_difference(_pairs(updated.candidates))) == 0
+    assert full.features[KEYS].equals(updated.features[KEYS])
+    values = [linked.features[SCORE_COLUMNS + ['weight']].to_numpy(dtype='float64') for linked in (full, updated)]
+    np.testing.assert_allclose(values[1], values[0], rtol=0, atol=1e-12)
+    assert np.isclose(updated.matches['match_weight'].sum(), full.matches['match_weight'].sum())
+
+
+# --- Tests ---
+@pytest.fixture(scope='module')
+def tables():
+    return linkage_tables(2000, seed=3)
+
+
+@pytest.fixture(scope='module')
+def linkage(tables):
+    h, l = tables
+    # Built without some thepeerage records, which the recrawl then adds back.
+    return Linkage.build(h, l.iloc[len(l) // 50:])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_update_matches_full_build(tables, linkage, workers):
+    h, l = tables
+    recrawled = l.copy()
+    rng = np.random.default_rng(0)
+    changed = rng.choice(l.index, 40, replace=False)
+    recrawled.loc[changed, 'surname'] = l['surname'].to_numpy()[rng.integers(len(l), size=40)]
+    recrawled = recrawled.drop(rng.choice(recrawled.index.difference(changed), 20, replace=False))
+    add_blocking_keys(recrawled, 'Extracted Parental Peerage_l')
+    updated, diff = linkage.update(h, recrawled, workers=workers)
+    assert_same_as_build(updated, Linkage.build(h, recrawled))
+    assert updated.report['dirty_l'] >= 40
+    assert set(diff['change']) <= {'added', 'removed', 'reweighted'}
+
+
+def test_update_without_changes_keeps_everything(tables, linkage):
+    h, l = tables
+    l = l.iloc[len(l) // 50:]
+    updated, diff = linkage.update(h, l)
+    assert updated.report['dirty_h'] == updated.report['dirty_l'] == updated.report['pairs_resolved'] == 0
+    assert diff.empty
+    pd.testing.assert_frame_equal(updated.matches, linkage.matches)
+
+
+def test_update_relinks_named_records(tables, linkage):
+    h, l = tables
+    l = l.iloc[len(l) // 50:]
+    updated, diff = linkage.update(h, l, changed_h=h.index[:5])
+    assert updated.report['dirty_h'] == 5 and updated.report['dirty_l'] == 0
+    assert_same_as_build(updated, Linkage.build(h, l))
+
+
+def test_save_and_load(tmp_path, linkage):
+    path = str(tmp_path / 'linkage')
+    linkage.save(path)
+    loaded = Linkage.load(path)
+    assert loaded.params == linkage.params
+    for name in ['candidates', 'features', 'matches']:
+        pd.testing.assert_frame_equal(getattr(loaded, name), getattr(linkage, name))
+    pd.testing.assert_series_equal(loaded.l_records, linkage.l_records, check_names=False)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import linear_sum_assignment
+
+import matching
+from matching import MATCH_COLUMNS, assign_matches
+
+
+def dense_assignment(weights):
+    """
+    The original step 5 of 4_matching.ipynb: one dense (n_h x n_l) cost matrix over
+    every candidate record, solved with linear_sum_assignment. Non-candidate pairs
+    cost 0, so only pairs with positive weight are kept.
+    """
+    h_ids = weights.index.get_level_values(0).unique()
+    l_ids = weights.index.get_level_values(1).unique()
+    h_map = {h: i for i, h in enumerate(h_ids)}
+    l_map = {l: j for j, l in enumerate(l_ids)}
+
+    C = np.zeros((len(h_ids), len(l_ids)), float)
+    for (h, l), w in weights.items():
+        C[h_map[h], l_map[l]] = -w
+
+    row_ind, col_ind = linear_sum_assignment(C)
+    matches = [
+        (h_ids[i], l_ids[j], -C[i, j])
+        for i, j in zip(row_ind, col_ind)
+        if -C[i, j] > 0
+    ]
+    return pd.DataFrame(matches, columns=MATCH_COLUMNS)
+
+
+def candidate_weights(n_h=300, n_l=400, n_pairs=1200, seed=0):
+    """
+    Random positive weights over candidate pairs, forming many small components, a few
+    stars and some larger components, as blocking by decade and name does.
+    """
+    rng = np.random.default_rng(seed)
+    h = rng.integers(0, n_h, n_pairs)
+    l = (h * n_l // n_h + rng.integers(-3, 4, n_pairs)) % n_l
+    weights = pd.Series(rng.random(n_pairs), index=pd.MultiIndex.from_arrays([h * 7 + 1, l * 5 + 2]))
+    return weights[~weights.index.duplicated()]
+
+
+def pairs(matches):
+    return set(zip(matches['h_index'], matches['l_index']))
+
+
+def assert_same_matching(weights, matches):
+    dense = dense_assignment(weights)
+    assert matches['match_weight'].sum() == pytest.approx(dense['match_weight'].sum())
+    assert pairs(matches) == pairs(dense)  # Continuous random weights never tie.
+    assert matches['h_index'].is_unique and matches['l_index'].is_unique
+    assert pairs(matches) <= set(weights.index)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_assign_matches_matches_dense_assignment(seed):
+    weights = candidate_weights(seed=seed)
+    matches = assign_matches(weights)
+    assert list(matches.columns) == MATCH_COLUMNS
+    assert matches['h_index'].is_monotonic_increasing
+    assert_same_matching(weights, matches)
+
+
+def test_sparse_solver_matches_dense_assignment(monkeypatch):
+    monkeypatch.setattr(matching, 'DENSE_COMPONENT_CELLS', 0)
+    weights = candidate_weights(seed=3)
+    assert_same_matching(weights, assign_matches(weights))
+
+
+def test_workers_match_dense_assignment():
+    weights = candidate_weights(seed=4)
+    assert_same_matching(weights, assign_matches(weights, workers=2, batch_edges=50))
+
+
+def test_non_positive_weights_are_never_matched():
+    weights = pd.Series([0.5, 0.0, -1.0], index=pd.MultiIndex.from_tuples([(1, 1), (2, 2), (3, 3)]))
+    assert pairs(assign_matches(weights)) == {(1, 1)}
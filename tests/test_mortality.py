@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mortality import FIRST_BIRTH_YEAR, LAST_BIRTH_YEAR, MortalityTable, ages_at_death, birth_years
+
+
+def rolling_avg_age_loop(birth_year, age, width, start=FIRST_BIRTH_YEAR, end=LAST_BIRTH_YEAR):
+    """
+    The original compute_rolling_avg_age of 3_eda_of_both.ipynb: one mask over all people
+    per window.
+    """
+    results = []
+    for s in range(start, end - width + 1):
+        mask = (birth_year >= s) & (birth_year < s + width)
+        results.append({'window_start': s, 'window_end': s + width, 'avg_age': age[mask].mean()})
+    return pd.DataFrame(results)
+
+
+@pytest.fixture(scope='module')
+def cohort():
+    rng = np.random.default_rng(0)
+    n = 5000
+    # Sparse early centuries leave empty windows; some years fall outside the table.
+    birth_year = pd.Series(np.floor(1500 + 480 * rng.beta(3, 1.2, n)), dtype='Int64')
+    birth_year[rng.random(n) < 0.05] = pd.NA
+    age = pd.Series(rng.gamma(6, 9, n))
+    age[rng.random(n) < 0.1] = np.nan
+    return birth_year, age
+
+
+@pytest.mark.parametrize('width', [1, 10, 25, 50])
+def test_rolling_matches_loop(cohort, width):
+    birth_year, age = cohort
+    fast = MortalityTable(birth_year, age).rolling(width)
+    slow = rolling_avg_age_loop(birth_year, age, width)
+    assert fast['window_start'].tolist() == slow['window_start'].tolist()
+    np.testing.assert_allclose(fast['avg_age'], slow['avg_age'].astype('float64'), rtol=1e-9)
+
+
+def test_rolling_std_and_counts(cohort):
+    birth_year, age = cohort
+    windows = MortalityTable(birth_year, age).rolling(25).set_index('window_start')
+    for s in [1600, 1750, 1900]:
+        inside = (birth_year >= s) & (birth_year < s + 25)
+        assert windows.loc[s, 'born'] == inside.sum()
+        assert windows.loc[s, 'n'] == age[inside.fillna(False)].notna().sum()
+        assert windows.loc[s, 'std_age'] == pytest.approx(age[inside.fillna(False)].std(), rel=1e-9)
+
+
+def test_bootstrap_does_not_depend_on_workers(cohort):
+    birth_year, age = cohort
+    table = MortalityTable(birth_year, age)
+    one = table.bootstrap(50, samples=250, workers=1)
+    two = table.bootstrap(50, samples=250, workers=2)
+    pd.testing.assert_frame_equal(one, two)
+    known = one['n'] > 10
+    assert (one.loc[known, 'avg_age_low'] <= one.loc[known, 'avg_age']).all()
+    assert (one.loc[known, 'avg_age'] <= one.loc[known, 'avg_age_high']).all()
+
+
+def test_birth_years_and_ages_use_one_parser():
+    born = pd.Series(['12 March 1688', '1700-01-02', '1600-01-02 00:00:00', None, 'unknown'])
+    died = pd.Series(['12 March 1748', '1750-01-02', '1660-07-02', '1700-01-01', '1750-01-01'])
+    assert birth_years(born).tolist() == [1688, 1700, 1600, pd.NA, pd.NA]
+    ages = ages_at_death(born, died)
+    assert ages[:3].round(1).tolist() == [60.0, 50.0, 60.5]
+    assert ages[3:].isna().all()
+    table = MortalityTable.from_frame(pd.DataFrame({'born': born, 'died': died}), 'born', 'died')
+    assert table.born.sum() == 3 and table.count.sum() == 3
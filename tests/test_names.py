@@ -0,0 +1,154 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from names import (HONORIFIC_PATTERN, HONORIFICS, PEERAGE_HONORIFIC_PATTERN, clean_names, split_forenames_surname,
+                   split_fullname, strip_honorifics)
+
+# --- The wranglers before names.py ---
+# One title each: thepeerage with its ranks and a word boundary, Hollingsworth with its
+# own list and no 'formerly'.
+NOTEBOOK_HONORIFIC_PATTERN = re.compile(
+    r'^(?:' + '|'.join(r'\s+'.join(re.escape(word) + r'\.?' for word in title.split())
+                       for title in HONORIFICS) + r')\b\s*', flags=re.IGNORECASE)
+HOLLINGSWORTH_NOTEBOOK_HONORIFICS = [
+    'Mr', 'Mrs', 'Ms', 'Miss', 'Dr', 'Prof', 'Sir', 'Dame', 'Lord', 'Lady',
+    'Baron', 'Baroness', 'Viscount', 'Viscountess', 'Earl', 'Marquess', 'Marquis',
+    'Duke', 'Duchess', 'Count', 'Countess', 'Rev', 'Reverend', 'Hon', 'Honorable',
+    'Rt Hon', 'Right Honourable', 'Major', 'Colonel', 'Capt', 'Captain', 'Lt', 'Lt Col',
+    'Lt-Col', 'Lt\\.', 'Brigadier', 'Brigadier-General', 'General', 'Field Marshal',
+    'Wing Commander', 'Squadron Leader', 'Saint', 'St'
+]
+HOLLINGSWORTH_NOTEBOOK_PATTERN = re.compile(
+    r'^(?:' + '|'.join(re.escape(title) for title in HOLLINGSWORTH_NOTEBOOK_HONORIFICS)
+    + r')\.?\s+', flags=re.IGNORECASE)
+
+
+def clean_string(s):
+    """
+    clean_string, as both wranglers defined it.
+    """
+    if pd.isna(s):
+        return s
+    s = re.sub(r'\(.*?\)', '', s)
+    s = unicodedata.normalize('NFKD', s)
+    s = re.sub(r'[-–—]+', ' ', s)
+    s = re.sub(r'[^A-Za-z ]+', '', s)
+    return re.sub(r'\s{2,}', ' ', s).strip()
+
+
+def notebook_fullname_keys(fullname):
+    """
+    Full_Name, First Forename and Last Surname of one thepeerage 'fullname', as
+    1_thepeerage_wrangler_notebook.ipynb computed them.
+    """
+    if pd.isna(fullname):
+        return fullname, fullname, fullname
+    name = re.split(r'\bformerly\b', fullname, flags=re.IGNORECASE)[0].strip()
+    name = NOTEBOOK_HONORIFIC_PATTERN.sub('', name).strip().upper()
+    tokens = name.split()
+    return (clean_string(name), clean_string(tokens[0]) if tokens else None,
+            clean_string(tokens[-1]) if tokens else None)
+
+
+def notebook_forenames_surname_keys(forenames, surname):
+    """
+    Full_Name, First Forename and Last Surname of one Hollingsworth row, as
+    2_hollsingworth_wrangler.ipynb computed them.
+    """
+    if pd.isna(forenames) or pd.isna(surname):
+        return None, None, None
+    forenames = HOLLINGSWORTH_NOTEBOOK_PATTERN.sub('', forenames).strip().upper()
+    surname = HOLLINGSWORTH_NOTEBOOK_PATTERN.sub('', surname).strip().upper()
+    return (clean_string(forenames + ' ' + surname), clean_string(forenames.split(' ')[0]),
+            clean_string(surname.split(' ')[-1]))
+
+
+def strip_honorific(name, pattern):
+    """
+    strip_honorifics one name at a time.
+    """
+    if pd.isna(name):
+        return name
+    name = re.split(r'\bformerly\b', name, flags=re.IGNORECASE)[0].strip()
+    return pattern.sub('', name).strip()
+
+
+# --- Fixtures ---
+FORENAMES = ['John', 'Mary', 'Anne', 'Édouard', 'Jean-Luc', 'William', 'Earl', 'Grey', 'Ælfred', 'Zoë (Zoe)']
+SURNAMES = ['Smith', 'Grey', 'de la Pole', 'Ó Brien', 'Count', 'Duke-Jones', 'Fitz–Roy']
+# Titles both notebooks strip the same way: one title, followed by a space, not the
+# start of a longer title.
+SHARED_TITLES = ['', 'Sir ', 'Lady ', 'Dr ', 'Rev ', 'Capt ', 'Major ', 'Mrs ', 'Hon ', 'Saint ']
+PEERAGE_TITLES = ['Earl ', 'Duke ', 'Count ', 'Baroness ']
+
+
+def sample_names(titles, n=3000, seed=0, formerly=True, forenames=FORENAMES):
+    rng = np.random.default_rng(seed)
+    forenames = [' '.join(rng.choice(forenames, rng.integers(1, 3), replace=False)) for _ in range(n)]
+    surnames = list(rng.choice(SURNAMES, n))
+    prefixes = list(rng.choice(titles, n))
+    suffixes = [' formerly Jones' if formerly and x < 0.05 else '' for x in rng.random(n)]
+    return forenames, surnames, prefixes, suffixes
+
+
+def assert_same_keys(keys, reference):
+    reference = pd.DataFrame(list(reference), columns=keys.columns, index=keys.index)
+    same = (keys == reference) | (keys.isna() & reference.isna())
+    assert keys[~same.all(axis=1)].empty, reference[~same.all(axis=1)]
+
+
+# --- Tests ---
+@pytest.mark.parametrize('pattern', [HONORIFIC_PATTERN, PEERAGE_HONORIFIC_PATTERN], ids=['thepeerage', 'peerage'])
+def test_strip_and_clean_match_scalar(pattern):
+    forenames, surnames, prefixes, suffixes = sample_names(SHARED_TITLES + PEERAGE_TITLES + ['Rt Hon Sir ', 'Lt Col '])
+    names = pd.Series([p + f + ' ' + s + x for f, s, p, x in zip(forenames, surnames, prefixes, suffixes)] + [None, ''],
+                      dtype=object)
+    stripped = strip_honorifics(names, pattern)
+    reference = names.map(lambda name: strip_honorific(name, pattern))
+    pd.testing.assert_series_equal(stripped.fillna('<NA>'), reference.fillna('<NA>'), check_dtype=False)
+    pd.testing.assert_series_equal(clean_names(stripped).fillna('<NA>'), reference.map(clean_string).fillna('<NA>'),
+                                   check_dtype=False)
+
+
+def test_split_fullname_matches_notebook():
+    forenames, surnames, prefixes, suffixes = sample_names(SHARED_TITLES + PEERAGE_TITLES)
+    fullname = pd.Series([p + f + ' ' + s + x for f, s, p, x in zip(forenames, surnames, prefixes, suffixes)] + [None],
+                         dtype=object)
+    assert_same_keys(split_fullname(fullname), fullname.map(notebook_fullname_keys))
+
+
+def test_split_forenames_surname_matches_notebook():
+    # Hollingsworth strips 'Earl' too, so a titled 'Earl' forename would be a run of titles.
+    forenames, surnames, prefixes, _ = sample_names(SHARED_TITLES + PEERAGE_TITLES, formerly=False,
+                                                    forenames=[name for name in FORENAMES if name != 'Earl'])
+    forenames = pd.Series([p + f for f, p in zip(forenames, prefixes)], dtype=object)
+    surnames = pd.Series(surnames, dtype=object)
+    reference = [notebook_forenames_surname_keys(f, s) for f, s in zip(forenames, surnames)]
+    assert_same_keys(split_forenames_surname(forenames, surnames), reference)
+
+
+# Where names.py differs from the notebooks on purpose.
+@pytest.mark.parametrize('fullname, keys', [
+    ('Earl Grey Smith', ('EARL GREY SMITH', 'EARL', 'SMITH')),    # Peerage titles are names in thepeerage.
+    ('Rt Hon Sir John Smith', ('JOHN SMITH', 'JOHN', 'SMITH')),   # A run of titles.
+    ('Lt Col John Smith', ('JOHN SMITH', 'JOHN', 'SMITH')),       # The longest title, not 'Lt'.
+    ('Dr. John Smith', ('JOHN SMITH', 'JOHN', 'SMITH')),          # The notebook left '.' as forename.
+    ('Sir', ('SIR', 'SIR', 'SIR')),                               # A lone title is kept.
+])
+def test_split_fullname_changes(fullname, keys):
+    assert tuple(split_fullname(pd.Series([fullname])).iloc[0]) == keys
+
+
+@pytest.mark.parametrize('forenames, surname, keys', [
+    ('Earl Grey', 'Smith', ('GREY SMITH', 'GREY', 'SMITH')),
+    ('Lt Col John', 'Smith', ('JOHN SMITH', 'JOHN', 'SMITH')),
+    ('Commander John', 'Smith', ('JOHN SMITH', 'JOHN', 'SMITH')),  # A rank from the thepeerage list.
+    ('John formerly Jack', 'Smith', ('JOHN SMITH', 'JOHN', 'SMITH')),
+    ('John  Henry', 'Smith', ('JOHN HENRY SMITH', 'JOHN', 'SMITH')),  # Tokens split on runs of whitespace.
+])
+def test_split_forenames_surname_changes(forenames, surname, keys):
+    assert tuple(split_forenames_surname(pd.Series([forenames]), pd.Series([surname])).iloc[0]) == keys
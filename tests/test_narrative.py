@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from narrative import CLARENDON_SCHOOLS, EDUCATION_CATEGORIES, NARRATIVE_CATEGORIES, NarrativeClassifier, \
+    narrative_features
+from synthetic import synthetic_narratives
+
+
+def test_education_matches_scraper(scraper):
+    narr = synthetic_narratives(5000, seed=1)
+    narr[:3] = ['Educated at ETON and Oxford University.', 'At St Paul’s School, then Cambridge univ.', np.nan]
+    features = narrative_features(narr, EDUCATION_CATEGORIES)
+    flags = [scraper.education_flags(text, CLARENDON_SCHOOLS) if isinstance(text, str) else (0, 'N/A')
+             for text in narr]
+    assert features['clarendon'].tolist() == [clarendon for clarendon, _ in flags]
+    assert features['oxbridge'].tolist() == [oxbridge for _, oxbridge in flags]
+    assert features['clarendon'].tolist()[:3] == [1, 1, 0]
+    assert features['oxbridge'].tolist()[:3] == ['oxford', 'cambridge', 'N/A']
+
+
+def test_categories_match_substring_tests():
+    narr = synthetic_narratives(3000, seed=2)
+    features = NarrativeClassifier().classify(narr)
+    for category, phrases in NARRATIVE_CATEGORIES.items():
+        expected = [int(any(phrase.lower() in text.lower() for phrase in phrases)) for text in narr]
+        assert features[category].tolist() == expected, category
+
+
+def test_empty_categories_and_column():
+    assert NarrativeClassifier({'none': []}).classify(pd.Series(['eton'])).to_dict('list') == {'none': [0]}
+    empty = narrative_features(pd.Series([], dtype=object))
+    assert empty.empty and 'oxbridge' in empty.columns
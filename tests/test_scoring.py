@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+import recordlinkage
+
+import scoring
+from scoring import YEAR_SCORES, score_candidates
+
+
+def compare_features(candidates, df_left, df_right):
+    """
+    The original step 3 of 4_matching.ipynb: recordlinkage.Compare computes a Jaro-Winkler
+    score for every candidate pair, then the year scores are looked up by label.
+    """
+    compare = recordlinkage.Compare()
+    compare.string('forename', 'forename', method='jarowinkler', threshold=None, label='forename_score')
+    compare.string('surname', 'surname', method='jarowinkler', threshold=None, label='surname_score')
+    features = compare.compute(candidates, df_left, df_right)
+    for label, (column, missing) in YEAR_SCORES.items():
+        left = df_left.loc[features.index.get_level_values(0), column].values
+        right = df_right.loc[features.index.get_level_values(1), column].values
+        features[label] = np.where(pd.isna(left) | pd.isna(right), missing, (1 - np.abs(left - right) / 10).clip(0, 1))
+    return features
+
+
+def table(n, seed, index_name):
+    rng = np.random.default_rng(seed)
+    names = np.array(['JOHN', 'JON', 'MARY', 'MARIE', 'WILLIAM', 'WILHELM', 'GREY', 'GRAY', None], dtype=object)
+    born = rng.integers(1600, 1700, n).astype('float64')
+    died = born + rng.integers(20, 80, n)
+    born[rng.random(n) < 0.1] = np.nan
+    died[rng.random(n) < 0.3] = np.nan
+    return pd.DataFrame({'forename': rng.choice(names, n), 'surname': rng.choice(names, n),
+                         'born_year': born, 'died_year': died},
+                        index=pd.Index(rng.permutation(n) * 2 + 5, name=index_name))
+
+
+@pytest.fixture(scope='module')
+def tables():
+    df_left, df_right = table(300, 0, 'h'), table(400, 1, 'l')
+    rng = np.random.default_rng(2)
+    candidates = pd.MultiIndex.from_arrays([rng.choice(df_left.index, 3000), rng.choice(df_right.index, 3000)],
+                                           names=['h', 'l']).unique()
+    return candidates, df_left, df_right
+
+
+def assert_same_features(reference, scored):
+    assert list(scored.index) == list(reference.index)
+    np.testing.assert_allclose(scored[reference.columns].to_numpy(), reference.to_numpy(), atol=1e-12)
+
+
+@pytest.mark.parametrize('chunk_size, workers', [(scoring.CHUNK_SIZE, 1), (257, 1), (500, 2)])
+def test_score_candidates_matches_compare(tables, chunk_size, workers):
+    candidates, df_left, df_right = tables
+    reference = compare_features(candidates, df_left, df_right)
+    assert_same_features(reference, score_candidates(candidates, df_left, df_right, chunk_size=chunk_size,
+                                                     workers=workers))
+
+
+def test_name_pair_cache_eviction(tables, monkeypatch):
+    monkeypatch.setattr(scoring, 'NAME_PAIR_CACHE', 10)
+    candidates, df_left, df_right = tables
+    reference = compare_features(candidates, df_left, df_right)
+    assert_same_features(reference, score_candidates(candidates, df_left, df_right, chunk_size=100))
+
+
+def test_keep_filters_each_chunk(tables):
+    candidates, df_left, df_right = tables
+    reference = compare_features(candidates, df_left, df_right)
+    keep = lambda features: features['surname_score'] >= 0.9
+    assert_same_features(reference[keep(reference)], score_candidates(candidates, df_left, df_right,
+                                                                      chunk_size=300, keep=keep))
+    none = score_candidates(candidates, df_left, df_right, keep=lambda features: features['surname_score'] > 1)
+    assert none.empty and list(none.columns) == list(reference.columns)
@@ -0,0 +1,68 @@
+import pytest
+
+from synthetic import SyntheticGenealogy
+from narrative import CLARENDON_SCHOOLS
+
+# div.itp blocks the synthetic pages do not produce.
+EDGE_CASES = {
+    'extra classes and whitespace': '''
+        <div class="itp  first" id="i1"><h2 class=" sn   sect-sn "><a name="i1"></a>John Smith, 1st Baron Smith<sup>1</sup></h2>
+        <div class="sinfo sect-ls">M, #1, b. 12 March 1801, d. circa 1870</div></div>''',
+    'unmatched multi-class blocks': '''
+        <div class="itp" id="i2"><h2 class="sn sect-sn extra">Jane Doe</h2>
+        <div class="sinfo sect-ls extra">F, #2</div><div class="narr note">She was at Eton.</div></div>''',
+    'nested tags, comments and scripts': '''
+        <div class="itp" id="i3"><h2 class="sn sect-sn"><a href="p1.htm#i3"><b>Mary</b> Jones</a>,<sup><a href="s1.htm#s9">S9</a></sup> Lady Jones</h2>
+        <div class="sinfo sect-ls">F<!-- hidden, m -->, #3<script>var b = "d. never";</script></div>
+        <div class="narr">She&nbsp;was educated at <i>Harrow</i> and<!-- x --> Oxford University.<style>p {}</style></div>
+        <span class="field-le-value"> 01 Jan 2020 </span></div>''',
+    'no name, info or narrative': '<div class="itp" id="i4"><p>Nothing here.</p></div>',
+    'children and sources': '''
+        <div class="itp" id="i5"><h2 class="sn sect-sn">Tom Brown</h2><div class="sinfo sect-ls">M, #5</div>
+        <p>Children</p><ul><li><a href="p1.htm#i6">Child 6</a></li><li>Unlinked child</li><li><a href='p1.htm#i7'>Child 7</a></li></ul>
+        <ul><li><a href="p1.htm#i8">Not a child</a></li></ul>
+        <a href="s1.htm#s1">S1</a><a href="s1.htm">not a source</a><a>S2</a></div>''',
+    'nested itp blocks': '''
+        <div class="itp" id="i9"><h2 class="sn sect-sn">Outer</h2>
+        <div class="itp" id="i10"><h2 class="sn sect-sn">Inner, Sir</h2><div class="sinfo sect-ls">#10</div></div></div>''',
+}
+
+
+def page(body, charset='utf-8'):
+    meta = f'<meta charset="{charset}">' if charset else ''
+    return f'<!DOCTYPE html><html><head>{meta}</head><body>{body}</body></html>'
+
+
+@pytest.fixture(scope='module')
+def synthetic_pages():
+    return list(SyntheticGenealogy(1500, seed=2).pages())
+
+
+def test_synthetic_pages(scraper, synthetic_pages):
+    people = 0
+    for number, content in synthetic_pages:
+        rows = scraper.person_rows(number, content, CLARENDON_SCHOOLS, 'bs4')
+        assert rows == scraper.person_rows(number, content, CLARENDON_SCHOOLS, 'lxml')
+        people += len(rows)
+    assert people == 1500
+
+
+@pytest.mark.parametrize('name', EDGE_CASES)
+def test_edge_cases(scraper, name):
+    content = page(EDGE_CASES[name]).encode('utf-8')
+    rows = scraper.person_rows(7, content, CLARENDON_SCHOOLS, 'bs4')
+    assert rows
+    assert rows == scraper.person_rows(7, content, CLARENDON_SCHOOLS, 'lxml')
+
+
+@pytest.mark.parametrize('charset', ['utf-8', 'windows-1252', None])
+def test_encodings(scraper, charset):
+    content = page(EDGE_CASES['nested tags, comments and scripts'].replace('Mary', 'Mære'),
+                   charset).encode(charset or 'windows-1252')
+    assert scraper.person_rows(1, content, CLARENDON_SCHOOLS, 'bs4') == scraper.person_rows(1, content, CLARENDON_SCHOOLS, 'lxml')
+
+
+def test_page_without_people(scraper):
+    content = page('<div id="content"><p>No such page.</p></div>').encode('utf-8')
+    assert scraper.person_rows(1, content, CLARENDON_SCHOOLS, 'bs4') == []
+    assert scraper.person_rows(1, content, CLARENDON_SCHOOLS, 'lxml') == []
@@ -0,0 +1,33 @@
+import json
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from person_store import PersonStore
+from table_io import iter_table, read_table, write_parquet
+
+PEOPLE = pd.DataFrame({'sources': ['S1;S2', 'S1', None, 'S3;S1'], 'gender': ['M', 'F', 'M', None]},
+                      index=pd.Index([10001, 10002, 10003, 10004], name='ID'))
+
+
+def test_sources_read_back_as_strings(tmp_path):
+    path = str(tmp_path / 'people.parquet')
+    write_parquet(PEOPLE, path)
+    for df in [read_table(path), pd.concat(iter_table(path, chunksize=3))]:
+        assert df['sources'].dtype == object
+        assert df['sources'].fillna('<NA>').tolist() == ['S1;S2', 'S1', '<NA>', 'S3;S1']
+        assert isinstance(df['gender'].dtype, pd.CategoricalDtype)
+    # Dictionary encoding is kept in the file itself.
+    assert 'RLE_DICTIONARY' in pq.ParquetFile(path).metadata.row_group(0).column(0).encodings
+
+
+def test_person_store_keeps_sources_as_strings(tmp_path):
+    path = str(tmp_path / 'people.parquet')
+    write_parquet(PEOPLE, path)
+    store = PersonStore.build(iter_table(path, chunksize=3, index_col='ID'), str(tmp_path / 'store'))
+    with open(os.path.join(store.path, 'meta.json')) as f:
+        columns = json.load(f)['columns']
+    assert columns['sources']['kind'] == 'string' and 'categories' not in columns['sources']
+    assert columns['gender']['kind'] == 'category'
+    assert store.get(10004)['sources'] == 'S3;S1'